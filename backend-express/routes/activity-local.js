@@ -5,6 +5,7 @@ const path = require('path');
 const readline = require('readline');
 const fs_stream = require('fs');
 const os = require('os');
+const { applyRecord, lastSnapshot } = require('../services/snapshotCodec');
 
 // Get data directory from environment or use default
 const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../../data-collector/activity_data');
@@ -63,12 +64,13 @@ router.get('/daily-summary/:date', async (req, res) => {
       const data = await fs.readFile(jsonlFile, 'utf-8');
       const lines = data.trim().split('\n').filter(l => l.trim());
       
-      if (lines.length === 0) {
+      // The last snapshot contains cumulative data for the entire day
+      const dailySummary = lastSnapshot(lines);
+      
+      if (!dailySummary) {
         return res.status(404).json({ error: 'No data available for this date' });
       }
       
-      // The last snapshot contains cumulative data for the entire day
-      const dailySummary = JSON.parse(lines[lines.length - 1]);
       res.json(dailySummary);
     } catch (fileError) {
       if (fileError.code === 'ENOENT') {
@@ -98,7 +100,10 @@ router.get('/today', async (req, res) => {
       const data = await fs.readFile(jsonlFile, 'utf-8');
       const lines = data.trim().split('\n').filter(l => l.trim());
       
-      if (lines.length === 0) {
+      // Use the last snapshot as the current state
+      const lastState = lastSnapshot(lines);
+      
+      if (!lastState) {
         return res.json({
           timestamp: new Date().toISOString(),
           system: {
@@ -122,10 +127,7 @@ router.get('/today', async (req, res) => {
         });
       }
       
-      // Use the last snapshot as the current state
-      const lastSnapshot = JSON.parse(lines[lines.length - 1]);
-      
-      res.json(lastSnapshot);
+      res.json(lastState);
     } catch (fileError) {
       if (fileError.code === 'ENOENT') {
         // If no JSONL file exists yet, return empty structure
@@ -180,6 +182,7 @@ router.get('/raw-data/:date', async (req, res) => {
     try {
       const records = [];
       let lineNumber = 0;
+      let state = null;
       
       const fileStream = fs_stream.createReadStream(jsonlFile);
       const rl = readline.createInterface({
@@ -188,13 +191,15 @@ router.get('/raw-data/:date', async (req, res) => {
       });
       
       for await (const line of rl) {
-        if (lineNumber >= offset && lineNumber < offset + limit) {
-          try {
-            const record = JSON.parse(line);
-            records.push(record);
-          } catch (parseError) {
-            console.warn(`Failed to parse line ${lineNumber}:`, parseError.message);
+        // Every line is replayed so delta records can be returned as full snapshots
+        try {
+          state = applyRecord(state, JSON.parse(line));
+          if (lineNumber >= offset && lineNumber < offset + limit) {
+            records.push(state);
           }
+        } catch (parseError) {
+          state = null;
+          console.warn(`Failed to parse line ${lineNumber}:`, parseError.message);
         }
         lineNumber++;
         
@@ -239,14 +244,13 @@ router.get('/current', async (req, res) => {
       const data = await fs.readFile(jsonlFile, 'utf-8');
       const lines = data.trim().split('\n');
       
-      if (lines.length === 0) {
+      const currentSnapshot = lastSnapshot(lines);
+      
+      if (!currentSnapshot) {
         return res.json({ error: 'No data available yet' });
       }
       
-      const lastLine = lines[lines.length - 1];
-      const lastSnapshot = JSON.parse(lastLine);
-      
-      res.json(lastSnapshot);
+      res.json(currentSnapshot);
     } catch (fileError) {
       if (fileError.code === 'ENOENT') {
         res.status(404).json({ error: 'No activity data available for today yet' });
@@ -297,9 +301,9 @@ router.get('/stats', async (req, res) => {
         const data = await fs.readFile(jsonlFile, 'utf-8');
         const lines = data.trim().split('\n').filter(l => l.trim());
         
-        if (lines.length === 0) continue;
+        const summary = lastSnapshot(lines);
         
-        const summary = JSON.parse(lines[lines.length - 1]);
+        if (!summary) continue;
         
         daysWithData++;
         stats.totalMonitoringHours += summary.system.aggregates.overallMonitoringHours || 0;
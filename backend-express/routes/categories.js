@@ -2,6 +2,7 @@ const express = require('express');
 const router = express.Router();
 const fs = require('fs').promises;
 const path = require('path');
+const { rebuildSnapshots } = require('../services/snapshotCodec');
 
 // Path to category config file
 const CATEGORY_CONFIG_FILE = path.join(__dirname, '../data/category_config.json');
@@ -113,30 +114,23 @@ async function getAllApplications() {
       const content = await fs.readFile(filePath, 'utf8');
       const lines = content.trim().split('\n').filter(line => line.trim());
       
-      for (const line of lines) {
-        try {
-          const entry = JSON.parse(line);
-          
-          // Get from main apps
-          if (entry.apps && Array.isArray(entry.apps)) {
-            for (const app of entry.apps) {
-              if (app.title && app.title.trim()) {
-                applications.add(app.title.trim());
-              }
+      for (const entry of rebuildSnapshots(lines)) {
+        // Get from main apps
+        if (entry.apps && Array.isArray(entry.apps)) {
+          for (const app of entry.apps) {
+            if (app.title && app.title.trim()) {
+              applications.add(app.title.trim());
             }
           }
-          
-          // Get from background apps
-          if (entry.backgroundApps && entry.backgroundApps.apps && Array.isArray(entry.backgroundApps.apps)) {
-            for (const app of entry.backgroundApps.apps) {
-              if (app.title && app.title.trim()) {
-                applications.add(app.title.trim());
-              }
+        }
+        
+        // Get from background apps
+        if (entry.backgroundApps && entry.backgroundApps.apps && Array.isArray(entry.backgroundApps.apps)) {
+          for (const app of entry.backgroundApps.apps) {
+            if (app.title && app.title.trim()) {
+              applications.add(app.title.trim());
             }
           }
-        } catch (parseError) {
-          // Skip invalid JSON lines
-          continue;
         }
       }
     }
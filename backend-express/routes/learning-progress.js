@@ -3,6 +3,7 @@ const router = express.Router();
 const fs = require('fs').promises;
 const path = require('path');
 const os = require('os');
+const { lastSnapshot: rebuildLastSnapshot } = require('../services/snapshotCodec');
 
 // Get data directory from environment or use default
 const DATA_DIR = process.env.DATA_DIR || path.join(__dirname, '../../data-collector/activity_data');
@@ -51,82 +52,78 @@ function extractCourseFromTitle(windowTitle, focusSwitch) {
 }
 
 /**
- * Parse JSONL file and extract course data
+ * Read the day's browser focus switches.
+ * The collector appends every focus switch to focus_<date>_<user>.jsonl, while
+ * snapshots only keep the most recent ones, so the event file is preferred.
  */
-async function parseCoursesFromJSONL(jsonlFile) {
+async function readBrowserFocusSwitches(jsonlFile) {
+  const focusFile = path.join(path.dirname(jsonlFile), path.basename(jsonlFile).replace(/^activity_/, 'focus_'));
+
   try {
-    const data = await fs.readFile(jsonlFile, 'utf-8');
-    const lines = data.trim().split('\n').filter(l => l.trim());
-    
-    if (lines.length === 0) {
-      return [];
-    }
-    
-    // Use the last snapshot which contains cumulative data
-    const lastSnapshot = JSON.parse(lines[lines.length - 1]);
-    
-    const coursesMap = {};
-    
-    // Find browser apps and extract course info from focusSwitches
-    if (lastSnapshot.apps && Array.isArray(lastSnapshot.apps)) {
-      for (const app of lastSnapshot.apps) {
-        // Check if it's a browser app
-        if (app.category === 'Browsers' && app.focusSwitches && Array.isArray(app.focusSwitches)) {
-          for (const focusSwitch of app.focusSwitches) {
-            const courseName = extractCourseFromTitle(focusSwitch.window_title, focusSwitch);
-            
-            if (courseName) {
-              if (!coursesMap[courseName]) {
-                coursesMap[courseName] = {
-                  courseName,
-                  totalHours: 0,
-                  sessions: [],
-                  status: 'in-progress',
-                  category: 'Online Learning',
-                  platform: focusSwitch.window_title.toLowerCase().includes('udemy') ? 'Udemy' : 'Other'
-                };
-              }
-              
-              coursesMap[courseName].totalHours += focusSwitch.totalHours || 0;
-              coursesMap[courseName].sessions.push({
-                date: focusSwitch.from,
-                duration: focusSwitch.totalHours || 0,
-                title: focusSwitch.window_title
-              });
-            }
-          }
+    const data = await fs.readFile(focusFile, 'utf-8');
+    const switches = [];
+    for (const line of data.split('\n')) {
+      if (!line.trim()) continue;
+      try {
+        const event = JSON.parse(line);
+        if (event.category === 'Browsers') {
+          switches.push(event);
         }
+      } catch (parseError) {
+        // Skip a partially written line
       }
     }
+    return switches;
+  } catch (error) {
+    if (error.code !== 'ENOENT') throw error;
+  }
+
+  // Older days have no event file - fall back to the last snapshot
+  const data = await fs.readFile(jsonlFile, 'utf-8');
+  const lines = data.trim().split('\n').filter(l => l.trim());
+  const lastSnapshot = rebuildLastSnapshot(lines);
+  if (!lastSnapshot) {
+    return [];
+  }
+
+  const apps = [
+    ...(Array.isArray(lastSnapshot.apps) ? lastSnapshot.apps : []),
+    ...(lastSnapshot.backgroundApps && lastSnapshot.backgroundApps.apps ? lastSnapshot.backgroundApps.apps : [])
+  ];
+  return apps
+    .filter(app => app.category === 'Browsers' && Array.isArray(app.focusSwitches))
+    .flatMap(app => app.focusSwitches);
+}
+
+/**
+ * Parse JSONL file and extract course data
+ */
+async function parseCoursesFromJSONL(jsonlFile) {
+  try {
+    const coursesMap = {};
     
-    // Check background apps as well
-    if (lastSnapshot.backgroundApps && lastSnapshot.backgroundApps.apps) {
-      for (const app of lastSnapshot.backgroundApps.apps) {
-        if (app.category === 'Browsers' && app.focusSwitches && Array.isArray(app.focusSwitches)) {
-          for (const focusSwitch of app.focusSwitches) {
-            const courseName = extractCourseFromTitle(focusSwitch.window_title, focusSwitch);
-            
-            if (courseName) {
-              if (!coursesMap[courseName]) {
-                coursesMap[courseName] = {
-                  courseName,
-                  totalHours: 0,
-                  sessions: [],
-                  status: 'in-progress',
-                  category: 'Online Learning',
-                  platform: focusSwitch.window_title.toLowerCase().includes('udemy') ? 'Udemy' : 'Other'
-                };
-              }
-              
-              coursesMap[courseName].totalHours += focusSwitch.totalHours || 0;
-              coursesMap[courseName].sessions.push({
-                date: focusSwitch.from,
-                duration: focusSwitch.totalHours || 0,
-                title: focusSwitch.window_title
-              });
-            }
-          }
+    for (const focusSwitch of await readBrowserFocusSwitches(jsonlFile)) {
+      if (!focusSwitch.window_title) continue;
+      const courseName = extractCourseFromTitle(focusSwitch.window_title, focusSwitch);
+      
+      if (courseName) {
+        if (!coursesMap[courseName]) {
+          coursesMap[courseName] = {
+            courseName,
+            totalHours: 0,
+            sessions: [],
+            status: 'in-progress',
+            category: 'Online Learning',
+            platform: focusSwitch.window_title.toLowerCase().includes('udemy') ? 'Udemy' : 'Other'
+          };
         }
+        
+        coursesMap[courseName].totalHours += focusSwitch.totalHours || 0;
+        coursesMap[courseName].sessions.push({
+          date: focusSwitch.from,
+          duration: focusSwitch.totalHours || 0,
+          title: focusSwitch.window_title
+        });
       }
     }
     
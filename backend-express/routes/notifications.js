@@ -1,39 +1,30 @@
 const express = require('express');
 const router = express.Router();
-const fs = require('fs').promises;
 const path = require('path');
+const { readNotifications, appendRecord } = require('../services/notificationJournal');
 
-// Path to notification history file
-const NOTIFICATION_FILE = path.join(__dirname, '../../data-collector/notification_history.json');
+// Path to the notification journal written by the data collector
+const NOTIFICATION_FILE = path.join(__dirname, '../../data-collector/notification_history.jsonl');
 
 // Get all notifications
 router.get('/', async (req, res) => {
   try {
     const unreadOnly = req.query.unreadOnly === 'true';
     const limit = req.query.limit ? parseInt(req.query.limit) : undefined;
-    
-    // Check if file exists
-    try {
-      await fs.access(NOTIFICATION_FILE);
-    } catch {
-      // File doesn't exist yet, return empty array
-      return res.json([]);
-    }
-    
-    // Read notifications
-    const data = await fs.readFile(NOTIFICATION_FILE, 'utf-8');
-    let notifications = JSON.parse(data);
-    
+
+    // Read notifications (newest first)
+    let notifications = await readNotifications(NOTIFICATION_FILE);
+
     // Filter by unread if requested
     if (unreadOnly) {
       notifications = notifications.filter(n => !n.read);
     }
-    
+
     // Apply limit if requested
     if (limit) {
       notifications = notifications.slice(0, limit);
     }
-    
+
     res.json(notifications);
   } catch (error) {
     console.error('Error reading notifications:', error);
@@ -44,21 +35,11 @@ router.get('/', async (req, res) => {
 // Get unread notification count
 router.get('/unread-count', async (req, res) => {
   try {
-    // Check if file exists
-    try {
-      await fs.access(NOTIFICATION_FILE);
-    } catch {
-      // File doesn't exist yet, return 0
-      return res.json({ count: 0 });
-    }
-    
-    // Read notifications
-    const data = await fs.readFile(NOTIFICATION_FILE, 'utf-8');
-    const notifications = JSON.parse(data);
-    
+    const notifications = await readNotifications(NOTIFICATION_FILE);
+
     // Count unread
     const unreadCount = notifications.filter(n => !n.read).length;
-    
+
     res.json({ count: unreadCount });
   } catch (error) {
     console.error('Error counting unread notifications:', error);
@@ -70,22 +51,17 @@ router.get('/unread-count', async (req, res) => {
 router.put('/:id/read', async (req, res) => {
   try {
     const notificationId = req.params.id;
-    
-    // Read notifications
-    const data = await fs.readFile(NOTIFICATION_FILE, 'utf-8');
-    const notifications = JSON.parse(data);
-    
-    // Find and mark as read
+
+    const notifications = await readNotifications(NOTIFICATION_FILE);
     const notification = notifications.find(n => n.id === notificationId);
     if (!notification) {
       return res.status(404).json({ error: 'Notification not found' });
     }
-    
+
+    // Record the change instead of rewriting the file
+    await appendRecord(NOTIFICATION_FILE, { op: 'read', id: notificationId });
     notification.read = true;
-    
-    // Save back
-    await fs.writeFile(NOTIFICATION_FILE, JSON.stringify(notifications, null, 2));
-    
+
     res.json({ success: true, notification });
   } catch (error) {
     console.error('Error marking notification as read:', error);
@@ -96,16 +72,14 @@ router.put('/:id/read', async (req, res) => {
 // Mark all notifications as read
 router.put('/mark-all-read', async (req, res) => {
   try {
-    // Read notifications
-    const data = await fs.readFile(NOTIFICATION_FILE, 'utf-8');
-    const notifications = JSON.parse(data);
-    
-    // Mark all as read
-    notifications.forEach(n => n.read = true);
-    
-    // Save back
-    await fs.writeFile(NOTIFICATION_FILE, JSON.stringify(notifications, null, 2));
-    
+    const notifications = await readNotifications(NOTIFICATION_FILE);
+
+    // Covers every notification up to the newest one read here (timestamps are the collector's local time)
+    const before = notifications.reduce((latest, n) => (n.timestamp > latest ? n.timestamp : latest), '');
+    if (before) {
+      await appendRecord(NOTIFICATION_FILE, { op: 'read_all', before });
+    }
+
     res.json({ success: true, count: notifications.length });
   } catch (error) {
     console.error('Error marking all notifications as read:', error);
@@ -117,22 +91,15 @@ router.put('/mark-all-read', async (req, res) => {
 router.delete('/:id', async (req, res) => {
   try {
     const notificationId = req.params.id;
-    
-    // Read notifications
-    const data = await fs.readFile(NOTIFICATION_FILE, 'utf-8');
-    let notifications = JSON.parse(data);
-    
-    // Filter out the notification
-    const originalLength = notifications.length;
-    notifications = notifications.filter(n => n.id !== notificationId);
-    
-    if (notifications.length === originalLength) {
+
+    const notifications = await readNotifications(NOTIFICATION_FILE);
+    if (!notifications.some(n => n.id === notificationId)) {
       return res.status(404).json({ error: 'Notification not found' });
     }
-    
-    // Save back
-    await fs.writeFile(NOTIFICATION_FILE, JSON.stringify(notifications, null, 2));
-    
+
+    // Tombstone record
+    await appendRecord(NOTIFICATION_FILE, { op: 'delete', id: notificationId });
+
     res.json({ success: true });
   } catch (error) {
     console.error('Error deleting notification:', error);
@@ -0,0 +1,77 @@
+/**
+ * Notification Journal
+ *
+ * Mirrors data-collector/notification_journal.py. notification_history.jsonl
+ * holds one record per line: {"op": "add", "notification": {...}},
+ * {"op": "read", "id"}, {"op": "read_all", "before": <ISO timestamp>} and
+ * {"op": "delete", "id"}. Changes are appended, never rewritten; the
+ * collector compacts the file, starting it with a {"op": "compacted"} header
+ * (ignored here, since the whole file is replayed on every read).
+ */
+
+const fs = require('fs').promises;
+
+const MAX_NOTIFICATIONS = 100;
+
+function applyRecord(notifications, record) {
+  switch (record.op) {
+    case 'add': {
+      const notification = record.notification || {};
+      if (notification.id === undefined || notifications.has(notification.id)) return;
+      notifications.set(notification.id, { ...notification });
+      if (notifications.size > MAX_NOTIFICATIONS) {
+        notifications.delete(notifications.keys().next().value);
+      }
+      break;
+    }
+    case 'read': {
+      const notification = notifications.get(record.id);
+      if (notification) notification.read = true;
+      break;
+    }
+    case 'read_all':
+      for (const notification of notifications.values()) {
+        if ((notification.timestamp || '') <= (record.before || '')) notification.read = true;
+      }
+      break;
+    case 'delete':
+      notifications.delete(record.id);
+      break;
+    default:
+      break;
+  }
+}
+
+/**
+ * Replay the journal. Returns the notifications newest first ([] if the
+ * file does not exist yet).
+ */
+async function readNotifications(journalFile) {
+  let data;
+  try {
+    data = await fs.readFile(journalFile, 'utf-8');
+  } catch (error) {
+    if (error.code === 'ENOENT') return [];
+    throw error;
+  }
+
+  const notifications = new Map();
+  for (const line of data.split('\n')) {
+    if (!line.trim()) continue;
+    try {
+      applyRecord(notifications, JSON.parse(line));
+    } catch {
+      // Torn or unreadable line
+    }
+  }
+  return Array.from(notifications.values()).reverse();
+}
+
+async function appendRecord(journalFile, record) {
+  await fs.appendFile(journalFile, JSON.stringify(record) + '\n', 'utf-8');
+}
+
+module.exports = {
+  readNotifications,
+  appendRecord
+};
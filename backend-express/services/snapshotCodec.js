@@ -0,0 +1,140 @@
+/**
+ * Activity JSONL Snapshot Codec
+ *
+ * Mirrors data-collector/snapshot_codec.py. Each line of an activity_*.jsonl
+ * file is either a full 'checkpoint' snapshot or a 'delta' holding only what
+ * changed since the previous line. Lines without a recordType (written before
+ * delta encoding) are full snapshots.
+ *
+ * Never JSON.parse the last line and treat it as the current state - use
+ * rebuildSnapshots() / lastSnapshot() instead.
+ */
+
+const RECORD_TYPE_KEY = 'recordType';
+const DELTA = 'delta';
+const DELTA_PREFIX = `{"${RECORD_TYPE_KEY}": "${DELTA}"`;
+
+const isObject = (value) => value !== null && typeof value === 'object' && !Array.isArray(value);
+
+function applyValue(state, patch) {
+  if (isObject(state) && isObject(patch)) {
+    return applyObject(state, patch);
+  }
+  if (Array.isArray(state) && isObject(patch)) {
+    if ('$append' in patch) {
+      return state.slice(patch.$drop || 0).concat(patch.$append);
+    }
+    if ('$keyed' in patch) {
+      return applyKeyedList(state, patch);
+    }
+  }
+  return patch;
+}
+
+function applyObject(state, patch) {
+  const result = { ...state };
+  for (const key of patch.$delete || []) {
+    delete result[key];
+  }
+  for (const [key, change] of Object.entries(patch)) {
+    if (key === '$delete') continue;
+    result[key] = key in result ? applyValue(result[key], change) : change;
+  }
+  return result;
+}
+
+function applyKeyedList(state, patch) {
+  const itemKey = patch.$keyed;
+  const items = new Map(state.map(item => [item[itemKey], item]));
+  for (const [id, change] of Object.entries(patch.$items || {})) {
+    if (items.has(id)) {
+      items.set(id, applyObject(items.get(id), change));
+    } else if (isObject(change) && change[itemKey] === id) {
+      items.set(id, change);
+    } else {
+      // A change to an item this state never had - the delta was made against another state
+      throw new Error(`Delta refers to missing list item '${id}'`);
+    }
+  }
+  const order = '$order' in patch ? patch.$order : state.map(item => item[itemKey]);
+  return order.map(id => {
+    if (!items.has(id)) {
+      throw new Error(`Delta refers to missing list item '${id}'`);
+    }
+    return items.get(id);
+  });
+}
+
+/**
+ * Return the full snapshot obtained by applying one record to the previous state
+ */
+function applyRecord(state, record) {
+  if (record[RECORD_TYPE_KEY] !== DELTA) {
+    const snapshot = { ...record };
+    delete snapshot[RECORD_TYPE_KEY];
+    return snapshot;
+  }
+  if (!state) {
+    throw new Error('Delta record without a preceding checkpoint');
+  }
+  const snapshot = applyObject(state, record.changes || {});
+  snapshot.timestamp = record.timestamp;
+  return snapshot;
+}
+
+/**
+ * Rebuild every full snapshot from JSONL lines.
+ * A line that cannot be parsed, or a delta that does not fit the state it is
+ * applied to (e.g. because the line before it was lost), breaks the delta
+ * chain, so deltas are skipped until the next checkpoint.
+ */
+function* rebuildSnapshots(lines) {
+  let state = null;
+  for (const line of lines) {
+    if (!line.trim()) continue;
+    let record;
+    try {
+      record = JSON.parse(line);
+    } catch (parseError) {
+      state = null;
+      continue;
+    }
+    if (!state && record[RECORD_TYPE_KEY] === DELTA) continue;
+    try {
+      state = applyRecord(state, record);
+    } catch (applyError) {
+      state = null;
+      continue;
+    }
+    yield state;
+  }
+}
+
+/**
+ * Rebuild the latest state from JSONL lines (null when there is none)
+ */
+function lastSnapshot(lines) {
+  // Only replay from the last checkpoint; the collector always writes recordType first
+  let start = lines.length - 1;
+  while (start > 0 && (!lines[start].trim() || lines[start].startsWith(DELTA_PREFIX))) {
+    start--;
+  }
+
+  let result = null;
+  for (const snapshot of rebuildSnapshots(lines.slice(start))) {
+    result = snapshot;
+  }
+  if (!result && start > 0) {
+    // Last checkpoint was unreadable - fall back to a full replay
+    for (const snapshot of rebuildSnapshots(lines)) {
+      result = snapshot;
+    }
+  }
+  return result;
+}
+
+module.exports = {
+  applyRecord,
+  rebuildSnapshots,
+  lastSnapshot
+};
@@ -0,0 +1,122 @@
+"""
+In-process response cache for the API routers
+
+Endpoint results are cached per endpoint and query parameters for one
+collection interval (COLLECTION_INTERVAL_SECONDS), since the underlying data
+only changes once per collector tick. Concurrent requests for the same key
+share one computation (single-flight), so N dashboard tabs refreshing at once
+run the aggregation once.
+
+Collectors record each tick in the collector_ticks collection; the cache
+checks it at most every CACHE_TICK_POLL_SECONDS and drops every entry when a
+new tick has been written. Keys include client-supplied parameters (cursors,
+field lists), so the cache holds at most CACHE_MAX_ENTRIES entries, evicting
+the least recently used, and drops expired entries whenever it stores one.
+"""
+import asyncio
+import functools
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.database import get_collection
+
+logger = logging.getLogger(__name__)
+
+TICKS_COLLECTION = "collector_ticks"
+
+
+class ResponseCache:
+    """TTL cache with single-flight computation and tick-driven invalidation"""
+
+    def __init__(self, ttl_seconds: float, tick_poll_seconds: float = 2.0, max_entries: int = 1000):
+        self.ttl_seconds = ttl_seconds
+        self.tick_poll_seconds = tick_poll_seconds
+        self.max_entries = max(1, max_entries)
+        # key -> (expires_at, generation, value), least recently used first
+        self._entries: Dict[tuple, tuple] = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._generation = 0
+        self._last_tick = None
+        self._next_tick_check = 0.0
+        self._tick_check: Optional[asyncio.Task] = None
+
+    def invalidate(self):
+        """Drop every cached entry; computations already running are not stored"""
+        self._generation += 1
+        self._entries.clear()
+
+    async def _check_last_tick(self):
+        try:
+            doc = await get_collection(TICKS_COLLECTION).find_one({}, sort=[("last_tick", -1)])
+        except Exception as e:
+            logger.debug(f"Could not read collector ticks: {e}")
+            return
+        last_tick = doc.get("last_tick") if doc else None
+        if last_tick != self._last_tick:
+            self._last_tick = last_tick
+            self.invalidate()
+
+    async def check_for_new_tick(self):
+        """Invalidate the cache if a collector wrote a tick since the last check (rate limited and shared)"""
+        now = time.monotonic()
+        if now >= self._next_tick_check and (self._tick_check is None or self._tick_check.done()):
+            self._next_tick_check = now + self.tick_poll_seconds
+            self._tick_check = asyncio.ensure_future(self._check_last_tick())
+        # Requests arriving while a check runs wait for it rather than reading stale entries
+        if self._tick_check is not None and not self._tick_check.done():
+            await asyncio.shield(self._tick_check)
+
+    async def get_or_compute(self, key: tuple, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for key, computing it once for all concurrent callers"""
+        await self.check_for_new_tick()
+
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic() and entry[1] == self._generation:
+            self._entries.move_to_end(key)
+            return entry[2]
+
+        task = self._inflight.get(key)
+        if task is None:
+            generation = self._generation
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+
+            def store(finished: asyncio.Task):
+                self._inflight.pop(key, None)
+                if not finished.cancelled() and finished.exception() is None and generation == self._generation:
+                    self._store(key, generation, finished.result())
+
+            task.add_done_callback(store)
+
+        # A caller that disconnects must not cancel the computation for the others
+        return await asyncio.shield(task)
+
+    def _store(self, key: tuple, generation: int, value: Any):
+        now = time.monotonic()
+        for expired_key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[expired_key]
+        self._entries[key] = (now + self.ttl_seconds, generation, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache(
+    ttl_seconds=float(os.getenv("COLLECTION_INTERVAL_SECONDS", 30)),
+    tick_poll_seconds=float(os.getenv("CACHE_TICK_POLL_SECONDS", 2)),
+    max_entries=int(os.getenv("CACHE_MAX_ENTRIES", 1000))
+)
+
+
+def cached_endpoint(func: Callable[..., Awaitable[Any]]):
+    """Cache an async endpoint's result in response_cache, keyed by endpoint and parameters"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        params = tuple(sorted((name, tuple(value) if isinstance(value, list) else value) for name, value in kwargs.items()))
+        key = (func.__module__, func.__qualname__, args, params)
+        return await response_cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,253 @@
+"""
+Index registry derived from query shapes
+
+Every query a router or collector runs against MongoDB is listed in
+QUERY_SHAPES with an example filter and sort. derive_indexes() turns each
+shape into a compound index (equality fields, then sort fields, then range
+fields) and drops indexes that are a prefix of another one on the same
+collection. ensure_indexes() creates the missing ones at startup, and
+find_collection_scans() explains every shape and reports the ones that still
+fall back to a collection scan.
+
+Add a shape here whenever a new query is written.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_USER = ObjectId("68dd3c18a48c28b2bb1aa6b2")
+_SAMPLE_TIME = datetime(2000, 1, 1)
+
+# Operators that make a filter field a range (or multi-value) predicate
+_RANGE_OPERATORS = {"$gt", "$gte", "$lt", "$lte", "$in", "$nin", "$ne", "$exists"}
+
+QUERY_SHAPES = [
+    # backend/app/routers/application_activity.py
+    {
+        "source": "application_activity.get_current_applications",
+        "collection": "application_activity",
+        "filter": {"is_active": True},
+        "sort": [("timestamp", -1), ("_id", -1)]
+    },
+    {
+        "source": "application_activity.get_application_snapshots (keyset pages)",
+        "collection": "application_activity",
+        "filter": {"timestamp": {"$gte": _SAMPLE_TIME}},
+        "sort": [("timestamp", -1), ("_id", -1)]
+    },
+    {
+        "source": "application_activity stats",
+        "collection": "application_activity",
+        "filter": {"timestamp": {"$gte": _SAMPLE_TIME}},
+        "sort": [("timestamp", -1)]
+    },
+    {
+        "source": "application_activity.get_focused_window",
+        "collection": "application_activity",
+        "filter": {"is_focused": True, "is_active": True},
+        "sort": [("timestamp", -1)]
+    },
+    {
+        "source": "app_monitor usage bucket upsert",
+        "collection": "application_usage_buckets",
+        "filter": {"bucket_start": _SAMPLE_TIME, "application": "app"}
+    },
+    {
+        "source": "application_activity summary and top-memory-usage (usage buckets)",
+        "collection": "application_usage_buckets",
+        "filter": {"bucket_start": {"$gte": _SAMPLE_TIME}}
+    },
+    {
+        "source": "cache.ResponseCache.check_for_new_tick",
+        "collection": "collector_ticks",
+        "filter": {},
+        "sort": [("last_tick", -1)]
+    },
+    # data-collector/collector.py
+    {
+        "source": "collector.update_app_time_tracking upsert",
+        "collection": "app_time_tracking",
+        "filter": {"user_id": "user", "date": _SAMPLE_TIME, "hour": 0, "application": "app"}
+    },
+    {
+        "source": "collector.reconcile_summaries (app_time_tracking)",
+        "collection": "app_time_tracking",
+        "filter": {"user_id": "user", "date": _SAMPLE_TIME}
+    },
+    {
+        "source": "collector.reconcile_summaries (system_metrics)",
+        "collection": "system_metrics",
+        "filter": {"user_id": "user", "timestamp": {"$gte": _SAMPLE_TIME, "$lt": _SAMPLE_TIME}}
+    },
+    {
+        "source": "collector.store_summaries (daily_summary)",
+        "collection": "daily_summary",
+        "filter": {"user_id": "user", "date": _SAMPLE_TIME}
+    },
+    {
+        "source": "collector.store_summaries (hourly_summary)",
+        "collection": "hourly_summary",
+        "filter": {"user_id": "user", "date": _SAMPLE_TIME, "hour": 0}
+    },
+    # backend/app/routers/work_patterns.py
+    {
+        "source": "work_patterns.get_work_sessions",
+        "collection": "work_sessions",
+        "filter": {"user_id": _SAMPLE_USER, "task_type": "deep_work", "start_time": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    {
+        "source": "work_patterns.get_task_switching_analysis",
+        "collection": "task_switches",
+        "filter": {"user_id": _SAMPLE_USER, "switch_time": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    {
+        "source": "work_patterns.get_meeting_analysis",
+        "collection": "meetings",
+        "filter": {"user_id": _SAMPLE_USER, "start_time": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    # backend/app/routers/health.py
+    {
+        "source": "health sleep stats",
+        "collection": "health_sleep",
+        "filter": {"user_id": _SAMPLE_USER, "date": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    {
+        "source": "health activity stats",
+        "collection": "health_activity",
+        "filter": {"user_id": _SAMPLE_USER, "date": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    {
+        "source": "health stress stats",
+        "collection": "health_stress",
+        "filter": {"user_id": _SAMPLE_USER, "timestamp": {"$gte": _SAMPLE_TIME, "$lte": _SAMPLE_TIME}}
+    },
+    # backend/app/routers/insights.py and learning.py
+    {
+        "source": "insights.get_feedback_analysis",
+        "collection": "user_feedback",
+        "filter": {"user_id": _SAMPLE_USER},
+        "sort": [("created_at", -1)]
+    },
+    {
+        "source": "learning.get_completed_courses",
+        "collection": "completed_courses",
+        "filter": {"user_id": _SAMPLE_USER}
+    },
+    # backend/app/routers/users.py
+    {
+        "source": "users register and login",
+        "collection": "users",
+        "filter": {"email": "user@example.com"}
+    }
+]
+
+
+def _is_range(value) -> bool:
+    return isinstance(value, dict) and any(key in _RANGE_OPERATORS for key in value)
+
+
+def index_for_shape(shape: Dict) -> List[tuple]:
+    """Compound index key for a query shape: equality fields, then sort fields, then range fields"""
+    sort = shape.get("sort", [])
+    sort_fields = {field for field, _ in sort}
+
+    keys = [(field, 1) for field, value in shape["filter"].items() if not _is_range(value) and field not in sort_fields]
+    keys.extend(sort)
+    keys.extend(
+        (field, 1) for field, value in shape["filter"].items()
+        if _is_range(value) and field not in sort_fields
+    )
+    return keys
+
+
+def _covers(index: List[tuple], keys: List[tuple], sort_fields: set) -> bool:
+    """
+    True if index serves the queries of keys: same leading fields, and the
+    same (or all reversed) directions on the sort fields. Directions of
+    equality and range fields don't matter.
+    """
+    if len(keys) > len(index):
+        return False
+    if [field for field, _ in index[:len(keys)]] != [field for field, _ in keys]:
+        return False
+    directions = [(index_key[1], key[1]) for index_key, key in zip(index, keys) if key[0] in sort_fields]
+    return all(a == b for a, b in directions) or all(a == -b for a, b in directions)
+
+
+def derive_indexes(shapes: List[Dict] = None) -> Dict[str, List[tuple]]:
+    """
+    Indexes needed by the query shapes, by collection, without redundant
+    prefixes. Each entry is (index keys, sort fields of the query shape).
+    """
+    by_collection: Dict[str, List[tuple]] = {}
+    for shape in shapes if shapes is not None else QUERY_SHAPES:
+        keys = index_for_shape(shape)
+        if keys:
+            sort_fields = {field for field, _ in shape.get("sort", [])}
+            by_collection.setdefault(shape["collection"], []).append((keys, sort_fields))
+
+    result = {}
+    for collection, indexes in by_collection.items():
+        # Longest first, so shorter indexes can be dropped when they are a prefix
+        kept = []
+        for keys, sort_fields in sorted(indexes, key=lambda entry: len(entry[0]), reverse=True):
+            if not any(_covers(existing, keys, sort_fields) for existing, _ in kept):
+                kept.append((keys, sort_fields))
+        result[collection] = kept
+    return result
+
+
+async def ensure_indexes(db, shapes: List[Dict] = None) -> List[str]:
+    """Create derived indexes that are missing. Safe to call on every startup; returns created index names."""
+    created = []
+    for collection, indexes in derive_indexes(shapes).items():
+        try:
+            existing = [list(info["key"]) for info in (await db[collection].index_information()).values()]
+        except Exception:
+            existing = []
+
+        for keys, sort_fields in indexes:
+            if any(_covers(index, keys, sort_fields) for index in existing):
+                continue
+            try:
+                name = await db[collection].create_index(keys)
+                created.append(f"{collection}.{name}")
+                existing.append(keys)
+            except Exception as e:
+                logger.error(f"Error creating index {keys} on {collection}: {e}")
+
+    if created:
+        logger.info(f"Created indexes: {', '.join(created)}")
+    return created
+
+
+def _find_stage(plan, stage: str) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == stage:
+            return True
+        return any(_find_stage(value, stage) for value in plan.values())
+    if isinstance(plan, list):
+        return any(_find_stage(item, stage) for item in plan)
+    return False
+
+
+async def find_collection_scans(db, shapes: List[Dict] = None) -> List[Dict]:
+    """Explain every query shape and return (and log) the ones whose winning plan is a collection scan"""
+    scans = []
+    for shape in shapes if shapes is not None else QUERY_SHAPES:
+        try:
+            cursor = db[shape["collection"]].find(shape["filter"], sort=shape.get("sort") or None)
+            explanation = await cursor.explain()
+        except Exception as e:
+            logger.warning(f"Could not explain query shape '{shape['source']}': {e}")
+            continue
+
+        winning_plan: Optional[Dict] = explanation.get("queryPlanner", {}).get("winningPlan")
+        if _find_stage(winning_plan, "COLLSCAN"):
+            logger.warning(f"Query shape '{shape['source']}' on {shape['collection']} uses a collection scan")
+            scans.append(shape)
+    return scans
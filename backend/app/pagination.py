@@ -0,0 +1,142 @@
+"""
+Keyset pagination and NDJSON streaming for MongoDB list endpoints
+
+Pages are ordered by (timestamp, _id) descending. A cursor is the
+"<timestamp ISO>_<_id>" of the last document of the previous page, so a
+client reading an NDJSON stream can also build it from the last line it got.
+"""
+import json
+import logging
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from fastapi.responses import Response, StreamingResponse
+
+logger = logging.getLogger(__name__)
+
+KEYSET_SORT = [("timestamp", -1), ("_id", -1)]
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(document: Dict) -> str:
+    """Cursor pointing just after a document"""
+    return f"{document['timestamp'].isoformat()}_{document['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """(timestamp, _id) of a cursor; raises a 400 for malformed cursors"""
+    try:
+        timestamp, _, object_id = cursor.rpartition("_")
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except (ValueError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {cursor}"
+        )
+
+
+def keyset_filter(query: Dict, cursor: Optional[str]) -> Dict:
+    """Restrict a query to the documents after the cursor in KEYSET_SORT order"""
+    if not cursor:
+        return query
+    timestamp, object_id = decode_cursor(cursor)
+    after = {"$or": [
+        {"timestamp": {"$lt": timestamp}},
+        {"timestamp": timestamp, "_id": {"$lt": object_id}}
+    ]}
+    return {"$and": [query, after]} if query else after
+
+
+def projection(fields: Optional[str]) -> Optional[Dict]:
+    """
+    Projection for a comma-separated field list (None returns whole
+    documents). timestamp and _id are always kept for the cursor.
+    """
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    if any(name.startswith("$") for name in names):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid field list: {fields}"
+        )
+    spec = {name: 1 for name in names}
+    spec.update({"timestamp": 1, "_id": 1})
+    return spec
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+async def read_page(cursor, limit: int) -> Tuple[str, Optional[str]]:
+    """
+    Render a Motor cursor as a JSON array body. Returns (body, next cursor);
+    the next cursor is None when the page is not full.
+    """
+    parts = []
+    last = None
+    async for document in cursor:
+        parts.append(dumps(document))
+        last = document
+    next_cursor = encode_cursor(last) if limit and last is not None and len(parts) >= limit else None
+    return "[" + ",".join(parts) + "]", next_cursor
+
+
+def page_response(body: str, next_cursor: Optional[str]) -> Response:
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _ndjson_lines(cursor) -> AsyncIterator[str]:
+    try:
+        async for document in cursor:
+            yield dumps(document) + "\n"
+    except Exception as e:
+        # The status line is already sent; end the stream early
+        logger.error(f"Error streaming documents: {e}")
+
+
+def ndjson_response(cursor) -> StreamingResponse:
+    """Stream a Motor cursor as newline-delimited JSON, one document per line"""
+    return StreamingResponse(_ndjson_lines(cursor), media_type=NDJSON_MEDIA_TYPE)
+
+
+def page_responses(item_model: Any = None, items: str = "documents") -> Dict:
+    """
+    OpenAPI description of a paginated endpoint's 200 response, for
+    @router.get(..., responses=page_responses(...)). The endpoints return
+    Response objects, so a response_model would be neither applied nor
+    accurate for projected or NDJSON responses.
+    """
+    response = {
+        "description": (
+            f"A JSON array of {items}, newest first. With fields=, each item only has the requested "
+            f"fields plus timestamp and _id. The {NEXT_CURSOR_HEADER} header holds the cursor of the "
+            f"next page and is absent on the last page. With format=ndjson the {items} are streamed "
+            f"as {NDJSON_MEDIA_TYPE}, one per line."
+        ),
+        "headers": {
+            NEXT_CURSOR_HEADER: {"description": "Cursor of the next page", "schema": {"type": "string"}}
+        },
+        "content": {
+            NDJSON_MEDIA_TYPE: {"schema": {"type": "string", "description": "One JSON document per line"}}
+        }
+    }
+    if item_model is not None:
+        response["model"] = List[item_model]
+    else:
+        response["content"]["application/json"] = {"schema": {"type": "array", "items": {"type": "object"}}}
+    return {200: response}
@@ -0,0 +1,109 @@
+"""
+Activity Router
+FastAPI endpoints serving the collector's local JSONL activity files
+
+Queries go through jsonl_index, which keeps a byte-offset sidecar index per
+day file, so these endpoints work without MongoDB.
+"""
+from fastapi import APIRouter, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from pathlib import Path
+import json
+import logging
+import os
+import sys
+
+# Add data-collector to path to import jsonl_index
+data_collector_path = Path(__file__).parent.parent.parent.parent / 'data-collector'
+if str(data_collector_path) not in sys.path:
+    sys.path.insert(0, str(data_collector_path))
+
+from jsonl_index import query_snapshots, latest_snapshot, available_dates, to_collector_time
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+ACTIVITY_DATA_DIR = os.getenv(
+    "ACTIVITY_DATA_DIR",
+    os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data-collector', 'activity_data')
+)
+
+# File reads block, so the endpoints are plain functions run in the threadpool
+
+def _ndjson_lines(snapshots):
+    try:
+        for snapshot in snapshots:
+            yield json.dumps(snapshot) + "\n"
+    except Exception as e:
+        # The status line is already sent; end the stream early
+        logger.error(f"Error streaming activity snapshots: {e}")
+
+@router.get("/snapshots")
+def get_snapshots(
+    start: Optional[datetime] = Query(default=None, description="Start of the time range (collector local time; times with an offset are converted)"),
+    end: Optional[datetime] = Query(default=None, description="End of the time range (inclusive, collector local time; times with an offset are converted)"),
+    app: Optional[List[str]] = Query(default=None, description="Only these apps (process name or title)"),
+    category: Optional[List[str]] = Query(default=None, description="Only apps in these categories"),
+    hour: Optional[int] = Query(default=None, ge=0, le=23, description="Only snapshots taken in this hour of the day"),
+    user_id: Optional[str] = Query(default=None, description="Only this user's files"),
+    limit: int = Query(default=500, ge=0, description="Maximum number of snapshots to return (0 for no limit)"),
+    format: str = Query(default="json", pattern="^(json|ndjson)$", description="json for a list, ndjson to stream snapshots")
+):
+    """
+    Get full snapshots in time order. With app or category filters each
+    snapshot only keeps the matching apps.
+    """
+    start, end = to_collector_time(start), to_collector_time(end)
+    if start and end and start > end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must not be after end"
+        )
+
+    snapshots = query_snapshots(
+        ACTIVITY_DATA_DIR, start=start, end=end, apps=app, categories=category,
+        user_id=user_id, hour=hour, limit=limit
+    )
+    try:
+        if format == "ndjson":
+            return StreamingResponse(_ndjson_lines(snapshots), media_type="application/x-ndjson")
+        return list(snapshots)
+
+    except Exception as e:
+        logger.error(f"Error querying activity snapshots: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to query activity snapshots: {str(e)}"
+        )
+
+@router.get("/current")
+def get_current_snapshot(user_id: Optional[str] = Query(default=None, description="Only this user's files")):
+    """Get the latest snapshot"""
+    try:
+        snapshot = latest_snapshot(ACTIVITY_DATA_DIR, user_id=user_id)
+    except Exception as e:
+        logger.error(f"Error reading latest snapshot: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to read latest snapshot: {str(e)}"
+        )
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No activity data found"
+        )
+    return snapshot
+
+@router.get("/available-dates")
+def get_available_dates(user_id: Optional[str] = Query(default=None, description="Only this user's files")):
+    """List the dates that have activity data, newest first"""
+    try:
+        return {"dates": available_dates(ACTIVITY_DATA_DIR, user_id=user_id)}
+    except Exception as e:
+        logger.error(f"Error listing activity dates: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to list activity dates: {str(e)}"
+        )
@@ -15,7 +15,7 @@ if str(data_collector_path) not in sys.path:
     sys.path.insert(0, str(data_collector_path))
 
 try:
-    from alert_engine import get_alert_engine, AlertRule
+    from alert_engine import get_alert_engine, AlertRule, WINDOW_METRICS, APP_WINDOW_METRICS, is_valid_aggregate
 except ImportError as e:
     print(f"Warning: Could not import alert_engine: {e}")
     print(f"Looking in: {data_collector_path}")
@@ -29,16 +29,24 @@ except ImportError as e:
     
     def get_alert_engine():
         return None
+    
+    WINDOW_METRICS = ()
+    APP_WINDOW_METRICS = ()
+    
+    def is_valid_aggregate(aggregate):
+        return False
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 
 class AlertRuleCreate(BaseModel):
     name: str
-    conditionType: str  # 'memory_usage', 'app_overrun', 'system_overrun'
+    conditionType: str  # 'memory_usage', 'app_overrun', 'system_overrun', 'window_aggregate'
     threshold: float
-    durationMinutes: int
+    durationMinutes: int  # Window length for 'window_aggregate'
     enabled: bool = True
     targetApp: Optional[str] = None
+    metric: Optional[str] = None  # 'window_aggregate': 'cpu_percent', 'memory_mb' or 'memory_percent'
+    aggregate: Optional[str] = None  # 'window_aggregate': 'avg', 'max' or a percentile such as 'p95'
 
 class AlertRuleUpdate(BaseModel):
     name: Optional[str] = None
@@ -47,6 +55,8 @@ class AlertRuleUpdate(BaseModel):
     durationMinutes: Optional[int] = None
     enabled: Optional[bool] = None
     targetApp: Optional[str] = None
+    metric: Optional[str] = None
+    aggregate: Optional[str] = None
 
 class AlertRuleResponse(BaseModel):
     ruleId: str
@@ -56,6 +66,23 @@ class AlertRuleResponse(BaseModel):
     durationMinutes: int
     enabled: bool
     targetApp: Optional[str] = None
+    metric: Optional[str] = None
+    aggregate: Optional[str] = None
+
+
+def validate_window_rule(condition_type: str, metric: Optional[str], aggregate: Optional[str],
+                         duration_minutes: Optional[int], target_app: Optional[str]):
+    """Reject window_aggregate rules with an unknown metric or aggregate"""
+    if condition_type != 'window_aggregate':
+        return
+    if metric not in WINDOW_METRICS:
+        raise HTTPException(status_code=400, detail=f"metric must be one of: {', '.join(WINDOW_METRICS)}")
+    if target_app and metric not in APP_WINDOW_METRICS:
+        raise HTTPException(status_code=400, detail=f"{metric} is only available system-wide")
+    if not is_valid_aggregate(aggregate):
+        raise HTTPException(status_code=400, detail="aggregate must be 'avg', 'max' or a percentile such as 'p95'")
+    if not duration_minutes or duration_minutes <= 0:
+        raise HTTPException(status_code=400, detail="durationMinutes (the window length) must be positive")
 
 
 @router.get("/rules", response_model=List[AlertRuleResponse])
@@ -73,6 +100,8 @@ async def get_alert_rules():
 async def create_alert_rule(rule_data: AlertRuleCreate):
     """Create a new alert rule"""
     try:
+        validate_window_rule(rule_data.conditionType, rule_data.metric, rule_data.aggregate,
+                             rule_data.durationMinutes, rule_data.targetApp)
         alert_engine = get_alert_engine()
         
         # Generate rule ID
@@ -86,11 +115,15 @@ async def create_alert_rule(rule_data: AlertRuleCreate):
             threshold=rule_data.threshold,
             duration_minutes=rule_data.durationMinutes,
             enabled=rule_data.enabled,
-            target_app=rule_data.targetApp
+            target_app=rule_data.targetApp,
+            metric=rule_data.metric,
+            aggregate=rule_data.aggregate
         )
         
         alert_engine.add_rule(rule)
         return rule.to_dict()
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -112,10 +145,23 @@ async def update_alert_rule(rule_id: str, rule_data: AlertRuleUpdate):
             updates_snake['duration_minutes'] = updates['durationMinutes']
         if 'targetApp' in updates:
             updates_snake['target_app'] = updates['targetApp']
-        for key in ['name', 'threshold', 'enabled']:
+        for key in ['name', 'threshold', 'enabled', 'metric', 'aggregate']:
             if key in updates:
                 updates_snake[key] = updates[key]
         
+        # Validate the rule as it will be after the update (against the rules file as
+        # it is now, which the Express API may have changed)
+        alert_engine.reload_rules_if_changed()
+        current = alert_engine.rules.get(rule_id)
+        if current:
+            validate_window_rule(
+                updates_snake.get('condition_type', current.condition_type),
+                updates_snake.get('metric', current.metric),
+                updates_snake.get('aggregate', current.aggregate),
+                updates_snake.get('duration_minutes', current.duration_minutes),
+                updates_snake.get('target_app', current.target_app)
+            )
+        
         success = alert_engine.update_rule(rule_id, updates_snake)
         if not success:
             raise HTTPException(status_code=404, detail="Alert rule not found")
@@ -152,6 +198,8 @@ async def toggle_alert_rule(rule_id: str):
     """Toggle alert rule enabled/disabled"""
     try:
         alert_engine = get_alert_engine()
+        # Toggle the current rule, even if another process just edited the rules file
+        alert_engine.reload_rules_if_changed()
         rule = alert_engine.rules.get(rule_id)
         if not rule:
             raise HTTPException(status_code=404, detail="Alert rule not found")
@@ -174,10 +222,14 @@ async def test_notification():
     """Send a test desktop notification"""
     try:
         alert_engine = get_alert_engine()
-        alert_engine.send_desktop_notification(
+        queued = alert_engine.send_desktop_notification(
             title="Employee-360 Test Alert",
             message="This is a test notification. If you see this, desktop alerts are working!"
         )
-        return {"message": "Test notification sent"}
+        if not queued:
+            raise HTTPException(status_code=503, detail="Notification queue is full")
+        return {"message": "Test notification queued"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
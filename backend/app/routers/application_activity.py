@@ -13,30 +13,49 @@ from app.models.application_activity import (
     ApplicationInfo, FocusedWindowInfo
 )
 from app.database import get_collection
+from app.cache import cached_endpoint
+from app.usage_buckets import BUCKET_COLLECTION, usage_pipeline, usage_window_start
+from app.pagination import KEYSET_SORT, keyset_filter, projection, read_page, page_response, ndjson_response, page_responses
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/current")
-async def get_current_applications():
+async def _find_page(query: dict, cursor: Optional[str], limit: int, fields: Optional[str], stream: bool):
+    """Keyset-paginated find on application_activity, as an NDJSON stream or a JSON page"""
+    collection = get_collection("application_activity")
+    documents = collection.find(
+        keyset_filter(query, cursor),
+        projection(fields),
+        sort=KEYSET_SORT,
+        limit=limit
+    )
+    if stream:
+        return ndjson_response(documents)
+    return await read_page(documents, limit)
+
+@cached_endpoint
+async def _cached_page(query_name: str, hours: Optional[int], cursor: Optional[str], limit: int, fields: Optional[str]):
+    if query_name == "current":
+        query = {"is_active": True}
+    else:
+        query = {"timestamp": {"$gte": datetime.utcnow() - timedelta(hours=hours)}}
+    return await _find_page(query, cursor, limit, fields, stream=False)
+
+@router.get("/current", responses=page_responses(items="active application documents"))
+async def get_current_applications(
+    cursor: Optional[str] = Query(default=None, description="Return applications after this cursor (<timestamp ISO>_<_id> of the last one received)"),
+    limit: int = Query(default=0, ge=0, description="Maximum number of applications to return (0 for no limit)"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields to return (timestamp and _id are always included)"),
+    format: str = Query(default="json", pattern="^(json|ndjson)$", description="json for a page, ndjson to stream documents")
+):
     """Get currently active applications"""
     try:
-        collection = get_collection("application_activity")
-        
-        # Get all currently active applications
-        cursor = collection.find(
-            {"is_active": True},
-            sort=[("timestamp", -1)]
-        )
-        
-        applications = []
-        async for app in cursor:
-            if "_id" in app:
-                app["_id"] = str(app["_id"])
-            applications.append(app)
-        
-        return applications
+        if format == "ndjson":
+            return await _find_page({"is_active": True}, cursor, limit, fields, stream=True)
+        return page_response(*await _cached_page("current", None, cursor, limit, fields))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting current applications: {e}")
         raise HTTPException(
@@ -44,33 +63,27 @@ async def get_current_applications():
             detail=f"Failed to get current applications: {str(e)}"
         )
 
-@router.get("/snapshots", response_model=List[ApplicationSnapshot])
+@router.get("/snapshots", responses=page_responses(ApplicationSnapshot, "snapshots"))
 async def get_application_snapshots(
     hours: int = Query(default=1, description="Number of hours to look back"),
-    limit: int = Query(default=60, description="Maximum number of snapshots to return")
+    limit: int = Query(default=60, ge=0, description="Maximum number of snapshots to return (0 for no limit)"),
+    cursor: Optional[str] = Query(default=None, description="Return snapshots after this cursor (<timestamp ISO>_<_id> of the last one received)"),
+    fields: Optional[str] = Query(default=None, description="Comma-separated fields to return (timestamp and _id are always included)"),
+    format: str = Query(default="json", pattern="^(json|ndjson)$", description="json for a page, ndjson to stream documents")
 ):
-    """Get application snapshots from the specified time period"""
+    """
+    Get application snapshots from the specified time period, newest first.
+    JSON pages carry the cursor of the next page in the X-Next-Cursor header;
+    format=ndjson streams the documents as the cursor produces them.
+    """
     try:
-        collection = get_collection("application_activity")
-        
-        # Calculate cutoff time
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        
-        # Query snapshots
-        cursor = collection.find(
-            {"timestamp": {"$gte": cutoff_time}},
-            sort=[("timestamp", -1)],
-            limit=limit
-        )
-        
-        snapshots = []
-        async for snapshot in cursor:
-            if "_id" in snapshot:
-                snapshot["_id"] = str(snapshot["_id"])
-            snapshots.append(ApplicationSnapshot(**snapshot))
-        
-        return snapshots
+        if format == "ndjson":
+            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+            return await _find_page({"timestamp": {"$gte": cutoff_time}}, cursor, limit, fields, stream=True)
+        return page_response(*await _cached_page("snapshots", hours, cursor, limit, fields))
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting application snapshots: {e}")
         raise HTTPException(
@@ -79,32 +92,22 @@ async def get_application_snapshots(
         )
 
 @router.get("/summary", response_model=List[ApplicationSummary])
+@cached_endpoint
 async def get_application_summary(
     hours: int = Query(default=24, description="Number of hours to analyze"),
     limit: int = Query(default=20, description="Maximum number of applications to return")
 ):
     """Get summarized application usage statistics"""
     try:
-        collection = get_collection("application_activity")
+        collection = get_collection(BUCKET_COLLECTION)
         
-        # Calculate cutoff time
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        # The buckets cover the window from the first whole bucket after the cutoff
+        now = datetime.utcnow()
+        window_start = usage_window_start(now - timedelta(hours=hours))
+        window_minutes = max((now - window_start).total_seconds() / 60, 1)
         
-        # Aggregation pipeline to summarize application usage
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": cutoff_time}}},
-            {"$unwind": "$applications"},
-            {
-                "$group": {
-                    "_id": "$applications.name",
-                    "total_snapshots": {"$sum": 1},
-                    "avg_memory_mb": {"$avg": "$applications.memory_usage_mb"},
-                    "max_memory_mb": {"$max": "$applications.memory_usage_mb"},
-                    "avg_cpu_percent": {"$avg": "$applications.cpu_percent"},
-                    "last_used": {"$max": "$applications.timestamp"},
-                    "first_seen": {"$min": "$applications.timestamp"}
-                }
-            },
+        # Summarize application usage from the usage buckets
+        pipeline = usage_pipeline(window_start) + [
             {
                 "$project": {
                     "application_name": "$_id",
@@ -115,7 +118,7 @@ async def get_application_summary(
                     "last_used": 1,
                     "usage_percentage": {
                         "$multiply": [
-                            {"$divide": ["$total_snapshots", {"$literal": hours * 60}]},  # Convert to percentage
+                            {"$divide": ["$total_snapshots", {"$literal": window_minutes}]},  # Convert to percentage
                             {"$literal": 100}
                         ]
                     }
@@ -151,6 +154,7 @@ async def get_application_summary(
         )
 
 @router.get("/stats")
+@cached_endpoint
 async def get_activity_stats(
     hours: int = Query(default=24, description="Number of hours to analyze")
 ):
@@ -239,6 +243,7 @@ async def get_activity_stats(
         )
 
 @router.get("/focused-window")
+@cached_endpoint
 async def get_current_focused_window():
     """Get the currently focused window information"""
     try:
@@ -267,29 +272,18 @@ async def get_current_focused_window():
         )
 
 @router.get("/top-memory-usage")
+@cached_endpoint
 async def get_top_memory_usage(
     hours: int = Query(default=1, description="Number of hours to analyze"),
     limit: int = Query(default=10, description="Number of top applications to return")
 ):
     """Get applications with highest memory usage"""
     try:
-        collection = get_collection("application_activity")
+        collection = get_collection(BUCKET_COLLECTION)
         
-        # Calculate cutoff time
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        
-        # Aggregation to find top memory users
-        pipeline = [
-            {"$match": {"timestamp": {"$gte": cutoff_time}}},
-            {"$unwind": "$applications"},
-            {
-                "$group": {
-                    "_id": "$applications.name",
-                    "max_memory_mb": {"$max": "$applications.memory_usage_mb"},
-                    "avg_memory_mb": {"$avg": "$applications.memory_usage_mb"},
-                    "last_seen": {"$max": "$applications.timestamp"}
-                }
-            },
+        # Find top memory users from the usage buckets since the cutoff
+        window_start = usage_window_start(datetime.utcnow() - timedelta(hours=hours))
+        pipeline = usage_pipeline(window_start) + [
             {"$sort": {"max_memory_mb": -1}},
             {"$limit": limit}
         ]
@@ -302,7 +296,7 @@ async def get_top_memory_usage(
                 "application_name": doc["_id"],
                 "max_memory_mb": round(doc["max_memory_mb"], 2),
                 "avg_memory_mb": round(doc["avg_memory_mb"], 2),
-                "last_seen": doc["last_seen"]
+                "last_seen": doc["last_used"]
             })
         
         return results
@@ -2,8 +2,18 @@ from fastapi import APIRouter, HTTPException, status
 from typing import List, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel
+from pathlib import Path
 import json
 import os
+import sys
+
+# Add data-collector to path to import app_catalogue and app_classifier
+data_collector_path = Path(__file__).parent.parent.parent.parent / 'data-collector'
+if str(data_collector_path) not in sys.path:
+    sys.path.insert(0, str(data_collector_path))
+
+from app_catalogue import AppCatalogue
+from app_classifier import get_config_classifier, invalidate_config_classifier
 
 router = APIRouter()
 
@@ -12,6 +22,15 @@ DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
 CATEGORY_CONFIG_FILE = os.path.join(DATA_DIR, 'category_config.json')
 ACTIVITY_DATA_DIR = os.path.join(os.path.dirname(__file__), '..', '..', '..', 'data-collector', 'activity_data')
 
+# Distinct app titles of the activity files, persisted in activity_data/app_catalogue.json
+app_catalogue = AppCatalogue(
+    ACTIVITY_DATA_DIR,
+    refresh_interval=float(os.getenv("APP_CATALOGUE_REFRESH_SECONDS", 30))
+)
+
+# /api/applications response, rebuilt when the catalogue or category_config.json changes
+_applications_cache: Dict[str, Any] = {}
+
 # Pydantic models
 class Application(BaseModel):
     name: str
@@ -110,18 +129,29 @@ def save_categories(data: Dict[str, Any]) -> bool:
         ensure_data_directory()
         with open(CATEGORY_CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2)
+        invalidate_config_classifier(CATEGORY_CONFIG_FILE)
         return True
     except Exception as e:
         print(f"Error saving categories: {e}")
         return False
 
+def load_category_applications() -> Dict[str, List[str]]:
+    """Load the category id -> application names mapping"""
+    return {
+        category['id']: category.get('applications', [])
+        for category in load_categories().get('categories', [])
+    }
+
 def get_category_for_app(app_name: str) -> str:
     """Get the category for a specific application"""
-    categories = load_categories()
-    for category in categories.get('categories', []):
-        if app_name in category.get('applications', []):
-            return category['id']
-    return 'productivity'  # Default category
+    # The classifier is only rebuilt when category_config.json changes
+    classifier = get_config_classifier(
+        CATEGORY_CONFIG_FILE,
+        load_category_applications,
+        default_category='productivity',  # Default category
+        substring_match=False
+    )
+    return classifier.get_category(app_name)
 
 @router.get("/categories")
 async def get_categories():
@@ -198,45 +228,30 @@ async def get_app_category(app_name: str):
 async def get_all_applications():
     """Get all unique applications from activity data"""
     try:
-        applications = set()
+        # Titles seen in the activity files, kept up to date incrementally
+        activity_titles = app_catalogue.titles()
+        try:
+            config_mtime = os.path.getmtime(CATEGORY_CONFIG_FILE)
+        except OSError:
+            config_mtime = None
         
-        # Get applications from activity data files
-        if os.path.exists(ACTIVITY_DATA_DIR):
-            for filename in os.listdir(ACTIVITY_DATA_DIR):
-                if filename.endswith('.jsonl'):
-                    filepath = os.path.join(ACTIVITY_DATA_DIR, filename)
-                    try:
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            for line in f:
-                                try:
-                                    entry = json.loads(line)
-                                    # Get apps from main apps array
-                                    if 'apps' in entry:
-                                        for app in entry['apps']:
-                                            if 'title' in app and app['title']:
-                                                applications.add(app['title'])
-                                    # Get apps from background apps
-                                    if 'backgroundApps' in entry and 'apps' in entry['backgroundApps']:
-                                        for app in entry['backgroundApps']['apps']:
-                                            if 'title' in app and app['title']:
-                                                applications.add(app['title'])
-                                except json.JSONDecodeError:
-                                    continue
-                    except Exception as e:
-                        print(f"Error reading file {filename}: {e}")
-                        continue
-        
-        # Also add applications from categories (to ensure configured apps are shown)
-        categories_data = load_categories()
-        for category in categories_data.get('categories', []):
-            applications.update(category.get('applications', []))
-        
-        # Filter out empty strings and system apps
-        filtered_apps = [app for app in applications if app and app.strip() and not app.startswith('System')]
+        cache_key = (app_catalogue.version, config_mtime)
+        if _applications_cache.get('key') != cache_key:
+            applications = set(activity_titles)
+            
+            # Also add applications from categories (to ensure configured apps are shown)
+            categories_data = load_categories()
+            for category in categories_data.get('categories', []):
+                applications.update(category.get('applications', []))
+            
+            # Filter out empty strings and system apps
+            filtered_apps = [app for app in applications if app and app.strip() and not app.startswith('System')]
+            _applications_cache['key'] = cache_key
+            _applications_cache['response'] = {
+                'applications': sorted(filtered_apps)
+            }
         
-        return {
-            'applications': sorted(list(filtered_apps))
-        }
+        return _applications_cache['response']
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,89 @@
+"""
+Application usage buckets
+
+app_monitor.py folds every application snapshot into one document per app
+per APP_USAGE_BUCKET_MINUTES (sample count, memory and CPU sums, max memory,
+first/last seen), so /api/apps/summary and /api/apps/top-memory-usage group
+a few buckets per app instead of unwinding every snapshot in the time
+window. A sample is one process entry of a snapshot, the same unit the
+snapshot aggregations counted.
+
+A query window starts at the first whole bucket after its cutoff, since a
+partial bucket's samples cannot be split; callers use usage_window_start()
+to know the window they actually covered.
+"""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+BUCKET_COLLECTION = "application_usage_buckets"
+
+# Must divide an hour
+BUCKET_MINUTES = int(os.getenv("APP_USAGE_BUCKET_MINUTES", 5))
+if BUCKET_MINUTES <= 0 or 60 % BUCKET_MINUTES:
+    BUCKET_MINUTES = 5
+
+
+def bucket_start(timestamp: datetime) -> datetime:
+    """Start of the bucket a timestamp falls in"""
+    return timestamp.replace(minute=timestamp.minute - timestamp.minute % BUCKET_MINUTES, second=0, microsecond=0)
+
+
+def usage_window_start(cutoff_time: datetime) -> datetime:
+    """Start of the first whole bucket at or after cutoff_time"""
+    start = bucket_start(cutoff_time)
+    return start if start == cutoff_time else start + timedelta(minutes=BUCKET_MINUTES)
+
+
+def bucket_updates(applications: List[Dict[str, Any]], timestamp: datetime) -> List[tuple]:
+    """(filter, update) upserts that fold one snapshot's applications into their hour buckets"""
+    per_app = defaultdict(lambda: {"samples": 0, "memory_sum": 0.0, "cpu_sum": 0.0, "max_memory": 0.0})
+    for app in applications:
+        totals = per_app[app["name"]]
+        memory_mb = app.get("memory_usage_mb") or 0
+        totals["samples"] += 1
+        totals["memory_sum"] += memory_mb
+        totals["cpu_sum"] += app.get("cpu_percent") or 0
+        totals["max_memory"] = max(totals["max_memory"], memory_mb)
+
+    start = bucket_start(timestamp)
+    return [
+        (
+            {"bucket_start": start, "application": name},
+            {
+                "$inc": {
+                    "sample_count": totals["samples"],
+                    "memory_sum_mb": totals["memory_sum"],
+                    "cpu_sum_percent": totals["cpu_sum"]
+                },
+                "$max": {"max_memory_mb": totals["max_memory"], "last_seen": timestamp},
+                "$min": {"first_seen": timestamp}
+            }
+        )
+        for name, totals in per_app.items()
+    ]
+
+
+def usage_pipeline(window_start: datetime) -> List[Dict]:
+    """Pipeline grouping the buckets from window_start (see usage_window_start) per application"""
+    return [
+        {"$match": {"bucket_start": {"$gte": window_start}}},
+        {
+            "$group": {
+                "_id": "$application",
+                "total_snapshots": {"$sum": "$sample_count"},
+                "memory_sum_mb": {"$sum": "$memory_sum_mb"},
+                "cpu_sum_percent": {"$sum": "$cpu_sum_percent"},
+                "max_memory_mb": {"$max": "$max_memory_mb"},
+                "last_used": {"$max": "$last_seen"},
+                "first_seen": {"$min": "$first_seen"}
+            }
+        },
+        {
+            "$addFields": {
+                "avg_memory_mb": {"$divide": ["$memory_sum_mb", "$total_snapshots"]},
+                "avg_cpu_percent": {"$divide": ["$cpu_sum_percent", "$total_snapshots"]}
+            }
+        }
+    ]
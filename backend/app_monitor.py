@@ -10,10 +10,12 @@ from typing import List, Dict, Any
 import threading
 import schedule
 import logging
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
 import os
 from dotenv import load_dotenv
 
+from app.usage_buckets import BUCKET_COLLECTION, bucket_updates
+
 # Load environment variables
 load_dotenv()
 
@@ -47,6 +49,7 @@ class ApplicationMonitor:
             self.db_client = MongoClient(database_url)
             self.db = self.db_client[database_name]
             self.collection = self.db["application_activity"]
+            self.bucket_collection = self.db[BUCKET_COLLECTION]
             
             logger.info(f"Connected to MongoDB: {database_name}")
             
@@ -175,15 +178,24 @@ class ApplicationMonitor:
                 }
             }
             
-            # Insert into database
+            # Insert into database (old snapshots expire through the TTL index
+            # created by setup_database.py)
             result = self.collection.insert_one(snapshot)
             logger.info(f"Stored application snapshot with ID: {result.inserted_id}")
             
-            # Clean up old records (keep only last 24 hours)
-            cutoff_time = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-            deleted = self.collection.delete_many({'timestamp': {'$lt': cutoff_time}})
-            if deleted.deleted_count > 0:
-                logger.info(f"Cleaned up {deleted.deleted_count} old records")
+            # Fold the snapshot into the usage buckets read by the summary endpoints
+            self.bucket_collection.bulk_write(
+                [UpdateOne(filter_doc, update, upsert=True)
+                 for filter_doc, update in bucket_updates(applications, snapshot['timestamp'])],
+                ordered=False
+            )
+            
+            # Record the tick so the API drops its cached responses
+            self.db['collector_ticks'].update_one(
+                {'_id': 'app_monitor'},
+                {'$set': {'last_tick': snapshot['timestamp']}},
+                upsert=True
+            )
             
         except Exception as e:
             logger.error(f"Error storing application data: {e}")
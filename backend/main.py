@@ -2,8 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 import os
-from app.database import connect_to_mongo, close_mongo_connection
-from app.routers import work_patterns, learning, health, insights, users, application_activity, alerts, categories
+from app.database import connect_to_mongo, close_mongo_connection, get_database
+from app.indexes import ensure_indexes, find_collection_scans
+from app.routers import work_patterns, learning, health, insights, users, application_activity, alerts, categories, activity
 
 # Load environment variables
 load_dotenv()
@@ -27,7 +28,23 @@ app.add_middleware(
 # Database events
 @app.on_event("startup")
 async def startup_db_client():
+    # The /api/activity endpoints read the local JSONL files, so dashboards
+    # built on them run without MongoDB
+    if os.getenv("MONGODB_ENABLED", "true").lower() != "true":
+        print("MongoDB disabled (MONGODB_ENABLED=false); serving local activity files only")
+        return
+    
     await connect_to_mongo()
+    
+    # Create the indexes every router/collector query needs and report any
+    # query that still scans a whole collection
+    if os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true":
+        try:
+            database = await get_database()
+            await ensure_indexes(database)
+            await find_collection_scans(database)
+        except Exception as e:
+            print(f"Could not ensure indexes: {e}")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -42,6 +59,7 @@ app.include_router(health.router, prefix="/api/health", tags=["health"])
 app.include_router(insights.router, prefix="/api/insights", tags=["insights"])
 app.include_router(alerts.router, tags=["alerts"])
 app.include_router(categories.router, prefix="/api", tags=["categories"])
+app.include_router(activity.router, prefix="/api/activity", tags=["activity"])
 
 @app.get("/")
 async def root():
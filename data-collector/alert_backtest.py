@@ -0,0 +1,201 @@
+"""
+Offline alert rule backtesting
+
+Replays recorded activity_*.jsonl days through AlertEngine.check_alerts with
+a simulated clock (each snapshot's own timestamp), so a set of rules can be
+tried against weeks of history in seconds instead of deployed and waited on.
+Nothing is shown or written to the notification journal: every alert is
+recorded instead, along with the alerts the cooldown held back.
+
+    python alert_backtest.py [--rules alert_rules.json] [--data-dir activity_data]
+                             [--start 2025-10-01] [--end 2025-10-31] [--user ID]
+                             [--cooldown SECONDS] [--include-disabled] [--json]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from alert_engine import AlertEngine, AlertRule
+from jsonl_index import query_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+class BacktestEngine(AlertEngine):
+    """AlertEngine with a fixed rule set and a simulated clock that records alerts instead of sending them"""
+
+    def __init__(self, rules: Iterable[AlertRule], cooldown_seconds: float = None):
+        self._backtest_rules = {rule.rule_id: rule for rule in rules}
+        self.current_time: Optional[datetime] = None
+        self.alerts: List[Dict] = []
+        self.suppressed: Dict[str, int] = defaultdict(int)  # rule id -> alerts held back by the cooldown
+        super().__init__(clock=lambda: self.current_time)
+        if cooldown_seconds is not None:
+            self.alert_cooldown = cooldown_seconds
+
+    def _open_notification_journal(self):
+        return None
+
+    def load_rules(self):
+        self.rules = dict(self._backtest_rules)
+        self._rule_index = None
+
+    def reload_rules_if_changed(self):
+        pass
+
+    def save_rules(self):
+        pass
+
+    def send_desktop_notification(self, title: str, message: str, rule_id: str = None) -> bool:
+        self.alerts.append({
+            'timestamp': self.current_time.isoformat(),
+            'ruleId': rule_id,
+            'ruleName': title,
+            'message': message
+        })
+        return True
+
+    def _in_cooldown(self, rule: AlertRule, state, now: datetime) -> bool:
+        if super()._in_cooldown(rule, state, now):
+            self.suppressed[rule.rule_id] += 1
+            return True
+        return False
+
+
+def load_rules_file(rules_file: Path, include_disabled: bool = False) -> List[AlertRule]:
+    """Read rules in the alert_rules.json format"""
+    with open(rules_file, 'r', encoding='utf-8') as f:
+        rules = [AlertRule.from_dict(rule_data) for rule_data in json.load(f)]
+    if include_disabled:
+        for rule in rules:
+            rule.enabled = True
+    return rules
+
+
+def app_tracking_from_snapshot(snapshot: Dict) -> Dict:
+    """Rebuild the collector's app_tracking (run and focus totals per app) from a snapshot"""
+    apps = list(snapshot.get('apps', []))
+    background = snapshot.get('backgroundApps')
+    if background:
+        apps.extend(background.get('apps', []))
+
+    app_tracking = {}
+    for app in apps:
+        app_name = app.get('name')
+        if not app_name or app_name == 'background_apps':
+            continue
+        app_tracking[app_name] = {
+            'title': app.get('title', app_name),
+            'total_run_seconds': app.get('runningTimeSec', 0),
+            'total_focus_seconds': app.get('focusDurationSec', 0)
+        }
+    return app_tracking
+
+
+def _snapshot_time(snapshot: Dict) -> Optional[datetime]:
+    timestamp = snapshot.get('timestamp')
+    if not timestamp:
+        return None
+    # Compared as naive times, like the collector's own clock
+    return datetime.fromisoformat(timestamp[:-1] if timestamp.endswith('Z') else timestamp).replace(tzinfo=None)
+
+
+def run_backtest(rules: Iterable[AlertRule], snapshots: Iterable[Dict], cooldown_seconds: float = None) -> Dict:
+    """
+    Feed snapshots (in time order) through the rules. Returns a report with
+    every alert and, per rule, how often it fired, when it first and last
+    fired, and how many alerts its cooldown held back.
+    """
+    engine = BacktestEngine(rules, cooldown_seconds)
+    started = time.monotonic()
+    first_time = last_time = None
+    count = 0
+
+    for snapshot in snapshots:
+        now = _snapshot_time(snapshot)
+        if now is None or (last_time is not None and now < last_time):
+            continue
+        engine.current_time = now
+        engine.check_alerts(app_tracking_from_snapshot(snapshot), snapshot)
+        first_time = first_time or now
+        last_time = now
+        count += 1
+
+    fired = defaultdict(list)
+    for alert in engine.alerts:
+        fired[alert['ruleId']].append(alert['timestamp'])
+
+    rule_reports = []
+    for rule in engine.rules.values():
+        times = fired.get(rule.rule_id, [])
+        rule_reports.append({
+            **rule.to_dict(),
+            'fired': len(times),
+            'suppressedByCooldown': engine.suppressed.get(rule.rule_id, 0),
+            'firstFired': times[0] if times else None,
+            'lastFired': times[-1] if times else None
+        })
+
+    return {
+        'snapshots': count,
+        'start': first_time.isoformat() if first_time else None,
+        'end': last_time.isoformat() if last_time else None,
+        'simulatedSeconds': (last_time - first_time).total_seconds() if count else 0,
+        'elapsedSeconds': round(time.monotonic() - started, 3),
+        'cooldownSeconds': engine.alert_cooldown,
+        'rules': rule_reports,
+        'alerts': engine.alerts
+    }
+
+
+def print_report(report: Dict):
+    print(f"Replayed {report['snapshots']} snapshots from {report['start']} to {report['end']} "
+          f"({report['simulatedSeconds'] / 3600:.1f} h of history in {report['elapsedSeconds']:.2f} s, "
+          f"cooldown {report['cooldownSeconds']:.0f} s)")
+    print()
+    print(f"{'Rule':<40} {'Fired':>6} {'Held back':>10}  {'First fired':<26} {'Last fired':<26}")
+    for rule in report['rules']:
+        print(f"{(rule['name'] or rule['ruleId'])[:40]:<40} {rule['fired']:>6} {rule['suppressedByCooldown']:>10}  "
+              f"{rule['firstFired'] or '-':<26} {rule['lastFired'] or '-':<26}")
+
+
+def _end_time(value: str) -> datetime:
+    """A date alone means the end of that day"""
+    return datetime.fromisoformat(value + 'T23:59:59.999999' if len(value) == 10 else value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay alert rules against recorded activity days")
+    parser.add_argument('--rules', type=Path, default=Path(__file__).parent / 'alert_rules.json',
+                        help="rules file in the alert_rules.json format")
+    parser.add_argument('--data-dir', type=Path, default=Path(os.getenv('DATA_DIR', Path(__file__).parent / 'activity_data')))
+    parser.add_argument('--start', type=datetime.fromisoformat, help="first date or time to replay")
+    parser.add_argument('--end', type=_end_time, help="last date or time to replay")
+    parser.add_argument('--user', help="only replay this user's files")
+    parser.add_argument('--cooldown', type=float, help="override the cooldown between alerts (seconds)")
+    parser.add_argument('--include-disabled', action='store_true', help="replay disabled rules too")
+    parser.add_argument('--json', action='store_true', help="print the full report, including every alert, as JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Every replayed alert would otherwise be logged as a warning
+    logging.getLogger('alert_engine').setLevel(logging.ERROR)
+
+    rules = load_rules_file(args.rules, args.include_disabled)
+    snapshots = query_snapshots(args.data_dir, start=args.start, end=args.end, user_id=args.user)
+    report = run_backtest(rules, snapshots, args.cooldown)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,19 @@
 import logging
 import json
+import hashlib
+import os
+import re
 import time
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
-import psutil
+from typing import Callable, Dict, Iterable, List, Any, NamedTuple, Optional
+from bisect import bisect_right
 from collections import defaultdict
 
+from notification_dispatcher import NotificationDispatcher
+from notification_journal import NotificationJournal
+from rolling_window import RollingWindow
+
 # Windows notification support
 try:
     from plyer import notification
@@ -17,19 +24,33 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# window_aggregate rules: metric read each tick, aggregated over the last
+# durationMinutes ('avg', 'max' or a percentile such as 'p95')
+WINDOW_METRICS = ('cpu_percent', 'memory_mb', 'memory_percent')
+# Metrics a snapshot has per app (memory_percent is system-wide only)
+APP_WINDOW_METRICS = ('cpu_percent', 'memory_mb')
+_AGGREGATE_PATTERN = re.compile(r'^(avg|max|p(100|[1-9]?[0-9](\.[0-9]+)?))$')
+
+
+def is_valid_aggregate(aggregate: str) -> bool:
+    return bool(aggregate) and _AGGREGATE_PATTERN.match(aggregate) is not None
+
+
 class AlertRule:
     """Represents a single alert rule"""
     
     def __init__(self, rule_id: str, name: str, condition_type: str, 
                  threshold: float, duration_minutes: int, enabled: bool = True,
-                 target_app: str = None):
+                 target_app: str = None, metric: str = None, aggregate: str = None):
         self.rule_id = rule_id
         self.name = name
-        self.condition_type = condition_type  # 'memory_usage', 'app_overrun', 'system_overrun'
+        self.condition_type = condition_type  # 'memory_usage', 'app_overrun', 'system_overrun', 'window_aggregate'
         self.threshold = threshold
-        self.duration_minutes = duration_minutes
+        self.duration_minutes = duration_minutes  # Window length for window_aggregate rules
         self.enabled = enabled
         self.target_app = target_app  # Specific app name, or None for system-wide
+        self.metric = metric  # window_aggregate only: one of WINDOW_METRICS
+        self.aggregate = aggregate  # window_aggregate only: 'avg', 'max' or 'p<N>'
         
     def to_dict(self):
         return {
@@ -39,7 +60,9 @@ class AlertRule:
             'threshold': self.threshold,
             'durationMinutes': self.duration_minutes,
             'enabled': self.enabled,
-            'targetApp': self.target_app
+            'targetApp': self.target_app,
+            'metric': self.metric,
+            'aggregate': self.aggregate
         }
     
     @classmethod
@@ -51,110 +74,223 @@ class AlertRule:
             threshold=data.get('threshold'),
             duration_minutes=data.get('durationMinutes'),
             enabled=data.get('enabled', True),
-            target_app=data.get('targetApp')
+            target_app=data.get('targetApp'),
+            metric=data.get('metric'),
+            aggregate=data.get('aggregate')
+        )
+
+
+class MetricsFrame(NamedTuple):
+    """System metrics measured by the collector for one tick"""
+    cpu_percent: float
+    memory_mb: float
+    memory_percent: Optional[float] = None
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict) -> Optional['MetricsFrame']:
+        """Read the metrics from a snapshot's 'system' section (None if it has none)"""
+        system = snapshot.get('system')
+        if not system or system.get('cpuUsage') is None:
+            return None
+        return cls(
+            cpu_percent=float(system['cpuUsage']),
+            memory_mb=float(system.get('memoryUsageMB') or 0),
+            memory_percent=system.get('memoryPercent')
         )
 
 
+class AlertState:
+    """Alert state of one rule for one app"""
+    __slots__ = ('start_time', 'last_alert_time', 'alert_count', 'window')
+    
+    def __init__(self):
+        self.start_time = None
+        self.last_alert_time = None
+        self.alert_count = 0
+        self.window: Optional[RollingWindow] = None  # window_aggregate rules only
+
+
+class ThresholdRules:
+    """Rules sorted by threshold, so a value only visits the rules it reaches"""
+    __slots__ = ('rules', 'thresholds')
+    
+    def __init__(self, rules: List[AlertRule]):
+        self.rules = sorted(rules, key=lambda rule: rule.threshold)
+        self.thresholds = [rule.threshold for rule in self.rules]
+    
+    def exceeded_by(self, value: float) -> List[AlertRule]:
+        """Rules whose threshold is at or below value"""
+        return self.rules[:bisect_right(self.thresholds, value)]
+    
+    def __iter__(self):
+        return iter(self.rules)
+    
+    def __bool__(self):
+        return bool(self.rules)
+
+
+class RuleIndex:
+    """Enabled rules compiled by condition type and target app"""
+    __slots__ = ('app_memory', 'any_app_memory', 'app_overrun', 'any_app_overrun', 'system_overrun',
+                 'app_window', 'system_window')
+    
+    def __init__(self, rules: Iterable[AlertRule]):
+        app_memory = defaultdict(list)
+        any_app_memory = []
+        app_overrun = defaultdict(list)
+        any_app_overrun = []
+        self.system_overrun: List[AlertRule] = []
+        self.app_window: Dict[str, List[AlertRule]] = defaultdict(list)
+        self.system_window: List[AlertRule] = []
+        
+        for rule in rules:
+            if not rule.enabled or rule.threshold is None:
+                continue
+            if rule.condition_type == 'memory_usage':
+                (app_memory[rule.target_app] if rule.target_app else any_app_memory).append(rule)
+            elif rule.condition_type == 'app_overrun':
+                (app_overrun[rule.target_app] if rule.target_app else any_app_overrun).append(rule)
+            elif rule.condition_type == 'system_overrun':
+                self.system_overrun.append(rule)
+            elif rule.condition_type == 'window_aggregate':
+                if rule.metric not in WINDOW_METRICS or not is_valid_aggregate(rule.aggregate) or not rule.duration_minutes:
+                    logger.warning(f"Skipping window rule '{rule.name}': invalid metric, aggregate or window")
+                elif rule.target_app and rule.metric not in APP_WINDOW_METRICS:
+                    logger.warning(f"Skipping window rule '{rule.name}': {rule.metric} is only available system-wide")
+                elif rule.target_app:
+                    self.app_window[rule.target_app].append(rule)
+                else:
+                    self.system_window.append(rule)
+        self.app_window = dict(self.app_window)
+        
+        # Target app -> rules for that app; any_* rules apply to every app
+        self.app_memory: Dict[str, ThresholdRules] = {app: ThresholdRules(r) for app, r in app_memory.items()}
+        self.any_app_memory = ThresholdRules(any_app_memory)
+        self.app_overrun: Dict[str, ThresholdRules] = {app: ThresholdRules(r) for app, r in app_overrun.items()}
+        self.any_app_overrun = ThresholdRules(any_app_overrun)
+
+
 class AlertEngine:
     """Monitors system and application metrics and triggers alerts based on rules"""
     
-    def __init__(self, rules_file: Path = None):
+    def __init__(self, rules_file: Path = None, clock: Callable[[], datetime] = None):
         self.rules_file = rules_file or Path(__file__).parent / 'alert_rules.json'
-        self.notifications_file = Path(__file__).parent / 'notification_history.json'
+        # Time of each check; replaced by a simulated clock when replaying history
+        self.clock = clock or datetime.now
+        self.notifications_file = Path(__file__).parent / 'notification_history.jsonl'
         self.rules: Dict[str, AlertRule] = {}
-        self.alert_state = defaultdict(lambda: {
-            'start_time': None,
-            'last_alert_time': None,
-            'alert_count': 0
-        })
+        self.alert_state: Dict[tuple, AlertState] = {}  # (rule id, app name or None) -> state
+        self._rule_index = None  # compiled from self.rules on the next check
         self.alert_cooldown = 300  # 5 minutes cooldown between same alerts
-        self.last_rules_check = None
-        self.rules_check_interval = 60  # Check for rule changes every 60 seconds
+        # Identity (mtime, size, inode) and content hash of the loaded rules file,
+        # so rules are only re-parsed when another process really changed them
+        self._rules_signature = None
+        self._rules_hash = None
         self.max_notifications = 100  # Keep last 100 notifications
+        self.notification_compact_records = 500  # Rewrite the journal after this many records
+        
+        # Append-only notification history, indexed in memory
+        self.notifications = self._open_notification_journal()
+        
+        # Notifications are delivered by a worker thread, at most `burst` at once per
+        # rule and then one per refill interval; the rest are grouped
+        self.dispatcher = NotificationDispatcher(
+            self._deliver_notification,
+            burst=int(os.getenv('ALERT_NOTIFY_BURST', 3)),
+            refill_seconds=float(os.getenv('ALERT_NOTIFY_REFILL_SECONDS', 60)),
+            max_queue=int(os.getenv('ALERT_NOTIFY_QUEUE_SIZE', 1000))
+        )
         
         # Load rules
         self.load_rules()
         
+    def _open_notification_journal(self) -> Optional[NotificationJournal]:
+        return NotificationJournal(
+            self.notifications_file,
+            max_notifications=self.max_notifications,
+            compact_after=self.notification_compact_records,
+            legacy_file=Path(__file__).parent / 'notification_history.json'
+        )
+        
+    def _rules_file_signature(self):
+        try:
+            stat = self.rules_file.stat()
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    
     def load_rules(self):
         """Load alert rules from file"""
         if self.rules_file.exists():
             try:
-                with open(self.rules_file, 'r', encoding='utf-8') as f:
-                    rules_data = json.load(f)
-                    self.rules.clear()  # Clear existing rules before loading
-                    for rule_data in rules_data:
-                        rule = AlertRule.from_dict(rule_data)
-                        self.rules[rule.rule_id] = rule
+                signature = self._rules_file_signature()
+                with open(self.rules_file, 'rb') as f:
+                    content = f.read()
+                content_hash = hashlib.sha256(content).hexdigest()
+                self._rules_signature = signature
+                if content_hash == self._rules_hash:
+                    return
+                
+                rules = {}
+                for rule_data in json.loads(content):
+                    rule = AlertRule.from_dict(rule_data)
+                    rules[rule.rule_id] = rule
+                # Swap in the complete rule set at once; a bad file keeps the current rules
+                self.rules = rules
+                self._rules_hash = content_hash
+                self._rule_index = None
                 logger.info(f"Loaded {len(self.rules)} alert rules")
-                self.last_rules_check = datetime.now()
             except Exception as e:
                 logger.error(f"Error loading alert rules: {e}")
         else:
             # Create default rules
             self.create_default_rules()
     
-    def reload_rules_if_needed(self):
-        """Reload rules if enough time has passed"""
-        if not self.last_rules_check or \
-           (datetime.now() - self.last_rules_check).total_seconds() >= self.rules_check_interval:
-            logger.info("Reloading alert rules...")
+    def reload_rules_if_changed(self):
+        """Reload rules if the rules file was replaced or modified (one stat call when it wasn't)"""
+        if self._rules_file_signature() != self._rules_signature:
             self.load_rules()
             
     def save_rules(self):
-        """Save alert rules to file"""
+        """Save alert rules to file (atomically, so other processes never read a partial file)"""
         try:
             rules_data = [rule.to_dict() for rule in self.rules.values()]
-            with open(self.rules_file, 'w', encoding='utf-8') as f:
-                json.dump(rules_data, f, indent=2)
+            content = json.dumps(rules_data, indent=2).encode('utf-8')
+            temp_file = self.rules_file.with_suffix('.json.tmp')
+            with open(temp_file, 'wb') as f:
+                f.write(content)
+            os.replace(temp_file, self.rules_file)
+            
+            self._rule_index = None
+            
+            # Our own write doesn't need to be reloaded
+            self._rules_signature = self._rules_file_signature()
+            self._rules_hash = hashlib.sha256(content).hexdigest()
             logger.info(f"Saved {len(self.rules)} alert rules")
         except Exception as e:
             logger.error(f"Error saving alert rules: {e}")
     
-    def save_notification(self, rule_name: str, message: str, rule_id: str = None):
-        """Save notification to history file"""
+    def save_notification(self, rule_name: str, message: str, rule_id: str = None, count: int = 1):
+        """Append a notification to the history journal (count: alerts grouped into it)"""
         try:
-            # Load existing notifications
-            notifications = []
-            if self.notifications_file.exists():
-                with open(self.notifications_file, 'r', encoding='utf-8') as f:
-                    notifications = json.load(f)
-            
-            # Add new notification
             notification_data = {
                 'id': f"{int(datetime.now().timestamp() * 1000)}",
                 'ruleId': rule_id,
                 'ruleName': rule_name,
                 'message': message,
+                'count': count,
                 'timestamp': datetime.now().isoformat(),
                 'read': False
             }
-            notifications.insert(0, notification_data)
-            
-            # Keep only last max_notifications
-            notifications = notifications[:self.max_notifications]
-            
-            # Save back to file
-            with open(self.notifications_file, 'w', encoding='utf-8') as f:
-                json.dump(notifications, f, indent=2)
-            
+            self.notifications.add(notification_data)
             logger.debug(f"Saved notification: {rule_name}")
         except Exception as e:
             logger.error(f"Error saving notification: {e}")
     
     def get_notifications(self, unread_only: bool = False, limit: int = None):
-        """Get notification history"""
+        """Get notification history, newest first"""
         try:
-            if self.notifications_file.exists():
-                with open(self.notifications_file, 'r', encoding='utf-8') as f:
-                    notifications = json.load(f)
-                    
-                if unread_only:
-                    notifications = [n for n in notifications if not n.get('read', False)]
-                
-                if limit:
-                    notifications = notifications[:limit]
-                    
-                return notifications
+            return self.notifications.list(unread_only=unread_only, limit=limit)
         except Exception as e:
             logger.error(f"Error loading notifications: {e}")
         
@@ -163,21 +299,7 @@ class AlertEngine:
     def mark_notification_read(self, notification_id: str):
         """Mark a notification as read"""
         try:
-            if self.notifications_file.exists():
-                with open(self.notifications_file, 'r', encoding='utf-8') as f:
-                    notifications = json.load(f)
-                
-                # Find and mark as read
-                for notif in notifications:
-                    if notif['id'] == notification_id:
-                        notif['read'] = True
-                        break
-                
-                # Save back
-                with open(self.notifications_file, 'w', encoding='utf-8') as f:
-                    json.dump(notifications, f, indent=2)
-                    
-                return True
+            return self.notifications.mark_read(notification_id)
         except Exception as e:
             logger.error(f"Error marking notification as read: {e}")
         
@@ -186,19 +308,8 @@ class AlertEngine:
     def mark_all_notifications_read(self):
         """Mark all notifications as read"""
         try:
-            if self.notifications_file.exists():
-                with open(self.notifications_file, 'r', encoding='utf-8') as f:
-                    notifications = json.load(f)
-                
-                # Mark all as read
-                for notif in notifications:
-                    notif['read'] = True
-                
-                # Save back
-                with open(self.notifications_file, 'w', encoding='utf-8') as f:
-                    json.dump(notifications, f, indent=2)
-                    
-                return True
+            self.notifications.mark_all_read()
+            return True
         except Exception as e:
             logger.error(f"Error marking all notifications as read: {e}")
         
@@ -239,11 +350,13 @@ class AlertEngine:
         
     def add_rule(self, rule: AlertRule):
         """Add a new alert rule"""
+        self.reload_rules_if_changed()
         self.rules[rule.rule_id] = rule
         self.save_rules()
         
     def update_rule(self, rule_id: str, updates: Dict[str, Any]):
         """Update an existing alert rule"""
+        self.reload_rules_if_changed()
         if rule_id in self.rules:
             rule = self.rules[rule_id]
             for key, value in updates.items():
@@ -255,6 +368,7 @@ class AlertEngine:
         
     def delete_rule(self, rule_id: str):
         """Delete an alert rule"""
+        self.reload_rules_if_changed()
         if rule_id in self.rules:
             del self.rules[rule_id]
             self.save_rules()
@@ -263,89 +377,61 @@ class AlertEngine:
         
     def get_all_rules(self) -> List[Dict]:
         """Get all alert rules"""
+        self.reload_rules_if_changed()
         return [rule.to_dict() for rule in self.rules.values()]
         
-    def check_memory_usage(self, rule: AlertRule, app_tracking: Dict) -> bool:
-        """Check if memory usage exceeds threshold"""
-        if rule.target_app:
-            # Check specific app memory
-            if rule.target_app in app_tracking:
-                app_data = app_tracking[rule.target_app]
-                # Note: We need current memory from snapshot, not tracked total
-                return False  # Will be checked in check_alerts with current snapshot
-        else:
-            # Check system memory
-            memory = psutil.virtual_memory()
-            memory_percent = memory.percent
-            
-            state_key = f"{rule.rule_id}_system"
-            state = self.alert_state[state_key]
-            
-            if memory_percent >= rule.threshold:
-                if state['start_time'] is None:
-                    state['start_time'] = datetime.now()
-                
-                duration = (datetime.now() - state['start_time']).total_seconds() / 60
-                if duration >= rule.duration_minutes:
-                    return True
-            else:
-                state['start_time'] = None
-                
-        return False
+    def _state(self, rule_id: str, app_name: str = None) -> 'AlertState':
+        """Alert state of one rule for one app (None for system-wide rules)"""
+        key = (rule_id, app_name)
+        state = self.alert_state.get(key)
+        if state is None:
+            state = self.alert_state[key] = AlertState()
+        return state
+    
+    def _in_cooldown(self, rule: AlertRule, state: 'AlertState', now: datetime) -> bool:
+        """True if the rule already alerted for this app recently (called only once the rule's condition holds)"""
+        return state.last_alert_time is not None and \
+            (now - state.last_alert_time).total_seconds() < self.alert_cooldown
+    
+    def _compiled_rules(self) -> 'RuleIndex':
+        """The rule index, recompiled after the rules changed"""
+        if self._rule_index is None:
+            self._rule_index = RuleIndex(self.rules.values())
+            # Drop the state of deleted rules
+            self.alert_state = {key: state for key, state in self.alert_state.items() if key[0] in self.rules}
+        return self._rule_index
         
-    def check_system_overrun(self, rule: AlertRule) -> bool:
-        """Check if system CPU usage exceeds threshold"""
-        cpu_percent = psutil.cpu_percent(interval=1)
+    def _sustained(self, state: 'AlertState', exceeded: bool, duration_minutes: float, now: datetime) -> bool:
+        """True once a condition has held for duration_minutes"""
+        if not exceeded:
+            state.start_time = None
+            return False
+        if state.start_time is None:
+            state.start_time = now
+        return (now - state.start_time).total_seconds() / 60 >= duration_minutes
         
-        state_key = f"{rule.rule_id}_system"
-        state = self.alert_state[state_key]
+    def check_memory_usage(self, rule: AlertRule, metrics: 'MetricsFrame', now: datetime) -> bool:
+        """Check if system memory usage exceeds threshold (used when there is no app snapshot)"""
+        if rule.target_app or metrics.memory_percent is None:
+            # App memory comes from the current snapshot, checked in check_alerts
+            return False
         
-        if cpu_percent >= rule.threshold:
-            if state['start_time'] is None:
-                state['start_time'] = datetime.now()
-            
-            duration = (datetime.now() - state['start_time']).total_seconds() / 60
-            if duration >= rule.duration_minutes:
-                return True
-        else:
-            state['start_time'] = None
-            
-        return False
+        state = self._state(rule.rule_id)
+        return self._sustained(state, metrics.memory_percent >= rule.threshold, rule.duration_minutes, now)
         
-    def check_app_overrun(self, rule: AlertRule, app_tracking: Dict) -> bool:
-        """Check if app is running but not being used"""
-        for app_name, app_data in app_tracking.items():
-            # Skip if rule targets specific app and this isn't it
-            if rule.target_app and rule.target_app != app_name:
-                continue
-                
-            # Check if app has been running but not focused
-            run_minutes = app_data.get('total_run_seconds', 0) / 60
-            focus_minutes = app_data.get('total_focus_seconds', 0) / 60
-            
-            if run_minutes >= rule.threshold:
-                # App has been running for threshold duration
-                idle_minutes = run_minutes - focus_minutes
-                
-                # If app has been idle for more than half its run time
-                if idle_minutes > run_minutes * 0.5 and idle_minutes >= rule.duration_minutes:
-                    state_key = f"{rule.rule_id}_{app_name}"
-                    state = self.alert_state[state_key]
-                    
-                    # Check cooldown
-                    if state['last_alert_time']:
-                        time_since_alert = (datetime.now() - state['last_alert_time']).total_seconds()
-                        if time_since_alert < self.alert_cooldown:
-                            continue
-                    
-                    return True
-                    
-        return False
+    def check_system_overrun(self, rule: AlertRule, metrics: 'MetricsFrame', now: datetime) -> bool:
+        """Check if system CPU usage exceeds threshold"""
+        state = self._state(rule.rule_id)
+        return self._sustained(state, metrics.cpu_percent >= rule.threshold, rule.duration_minutes, now)
         
-    def send_desktop_notification(self, title: str, message: str, rule_id: str = None):
-        """Send desktop notification and save to history"""
+    def send_desktop_notification(self, title: str, message: str, rule_id: str = None) -> bool:
+        """Queue a desktop notification; it is saved to history and shown by the dispatch thread"""
+        return self.dispatcher.submit(title, message, rule_id)
+        
+    def _deliver_notification(self, title: str, message: str, rule_id: str = None, count: int = 1):
+        """Save a notification to history and show it (runs on the dispatch thread)"""
         # Save to history first
-        self.save_notification(title, message, rule_id)
+        self.save_notification(title, message, rule_id, count)
         
         if not NOTIFICATIONS_AVAILABLE:
             logger.warning(f"Notification not sent (plyer not installed): {title} - {message}")
@@ -362,114 +448,139 @@ class AlertEngine:
         except Exception as e:
             logger.error(f"Error sending notification: {e}")
             
-    def check_alerts(self, app_tracking: Dict, current_snapshot: Dict = None):
-        """Check all alert rules and trigger notifications"""
-        # Reload rules if needed (every 60 seconds)
-        self.reload_rules_if_needed()
+    def close(self):
+        """Deliver queued notifications and stop the dispatch thread"""
+        self.dispatcher.close()
         
-        for rule in self.rules.values():
-            if not rule.enabled:
+    def _fire(self, rule: AlertRule, state: 'AlertState', message: str, now: datetime):
+        state.last_alert_time = now
+        state.alert_count += 1
+        self.send_desktop_notification(
+            title=rule.name,
+            message=message,
+            rule_id=rule.rule_id
+        )
+        logger.warning(f"Alert triggered: {rule.name} - {message}")
+    
+    def _check_app_memory(self, index: 'RuleIndex', current_snapshot: Dict, now: datetime):
+        """One pass over the snapshot's apps, visiting only the memory rules each app exceeds"""
+        for app in current_snapshot.get('apps', []):
+            app_name = app.get('name', '')
+            
+            # Skip background_apps
+            if app_name == 'background_apps':
                 continue
-                
-            triggered = False
-            alert_message = ""
             
-            if rule.condition_type == 'memory_usage':
-                if current_snapshot:
-                    # Check app memory from current snapshot
-                    for app in current_snapshot.get('apps', []):
-                        app_name = app.get('name', '')
-                        
-                        # Skip if rule targets specific app and this isn't it
-                        if rule.target_app and rule.target_app != app_name:
-                            continue
-                        
-                        # Skip background_apps
-                        if app_name == 'background_apps':
-                            continue
-                        
-                        memory_mb = app.get('memoryUsageMB', 0)
-                        if memory_mb >= rule.threshold:
-                            state_key = f"{rule.rule_id}_{app_name}"
-                            state = self.alert_state[state_key]
-                            
-                            # Check cooldown
-                            if state['last_alert_time']:
-                                time_since_alert = (datetime.now() - state['last_alert_time']).total_seconds()
-                                if time_since_alert < self.alert_cooldown:
-                                    continue
-                            
-                            triggered = True
-                            app_title = app.get('title', app_name)
-                            alert_message = f"'{app_title}' is using {memory_mb:.0f} MB of memory (threshold: {rule.threshold:.0f} MB)"
-                            state['last_alert_time'] = datetime.now()
-                            state['alert_count'] += 1
-                            
-                            # Send notification for this app
-                            self.send_desktop_notification(
-                                title=rule.name,
-                                message=alert_message,
-                                rule_id=rule.rule_id
-                            )
-                            logger.warning(f"Alert triggered: {rule.name} - {alert_message}")
-                else:
-                    # No snapshot, check system memory as fallback
-                    triggered = self.check_memory_usage(rule, app_tracking)
-                    if triggered:
-                        memory = psutil.virtual_memory()
-                        alert_message = f"System memory usage is {memory.percent:.1f}% (threshold: {rule.threshold:.0f}%)"
-                        self.send_desktop_notification(
-                            title=rule.name,
-                            message=alert_message,
-                            rule_id=rule.rule_id
-                        )
-                        logger.warning(f"Alert triggered: {rule.name} - {alert_message}")
-                        
-            elif rule.condition_type == 'system_overrun':
-                triggered = self.check_system_overrun(rule)
-                if triggered:
-                    cpu_percent = psutil.cpu_percent(interval=0)
-                    alert_message = f"System CPU usage is {cpu_percent:.1f}% for {rule.duration_minutes} minutes (threshold: {rule.threshold:.0f}%)"
+            memory_mb = app.get('memoryUsageMB', 0)
+            for rule in index.app_window.get(app_name, ()):
+                value = memory_mb if rule.metric == 'memory_mb' else app.get('cpuUsage', 0) if rule.metric == 'cpu_percent' else None
+                if value is not None:
+                    self._check_window(rule, app_name, app.get('title', app_name), value, now)
+            
+            for rules in (index.app_memory.get(app_name), index.any_app_memory):
+                if rules is None:
+                    continue
+                for rule in rules.exceeded_by(memory_mb):
+                    state = self._state(rule.rule_id, app_name)
+                    if self._in_cooldown(rule, state, now):
+                        continue
+                    
+                    app_title = app.get('title', app_name)
+                    alert_message = f"'{app_title}' is using {memory_mb:.0f} MB of memory (threshold: {rule.threshold:.0f} MB)"
+                    self._fire(rule, state, alert_message, now)
+    
+    def _check_window(self, rule: AlertRule, app_name: Optional[str], label: str, value: float, now: datetime):
+        """Add this tick's value to the rule's window and fire once the aggregate reaches the threshold"""
+        state = self._state(rule.rule_id, app_name)
+        if state.window is None or state.window.window_seconds != rule.duration_minutes * 60:
+            state.window = RollingWindow(rule.duration_minutes * 60)
+        state.window.add(value, now)
+        
+        # Wait for a full window, so a single spike can't trigger it
+        if not state.window.covers(now):
+            return
+        aggregate = state.window.aggregate(rule.aggregate)
+        if aggregate is None or aggregate < rule.threshold or self._in_cooldown(rule, state, now):
+            return
+        
+        alert_message = f"{label} {rule.metric} {rule.aggregate} over {rule.duration_minutes} minutes is {aggregate:.1f} (threshold: {rule.threshold:.1f})"
+        self._fire(rule, state, alert_message, now)
+    
+    def _check_app_overrun(self, index: 'RuleIndex', app_tracking: Dict, now: datetime):
+        """One pass over the tracked apps, visiting only the overrun rules each app's run time exceeds"""
+        for app_name, app_data in app_tracking.items():
+            targeted = index.app_overrun.get(app_name)
+            if targeted is None and not index.any_app_overrun:
+                continue
+            
+            run_minutes = app_data.get('total_run_seconds', 0) / 60
+            focus_minutes = app_data.get('total_focus_seconds', 0) / 60
+            idle_minutes = run_minutes - focus_minutes
+            
+            # If app has been idle for more than half its run time
+            if idle_minutes <= run_minutes * 0.5:
+                continue
+            
+            for rules in (targeted, index.any_app_overrun):
+                if rules is None:
+                    continue
+                for rule in rules.exceeded_by(run_minutes):
+                    if idle_minutes < rule.duration_minutes:
+                        continue
+                    state = self._state(rule.rule_id, app_name)
+                    if self._in_cooldown(rule, state, now):
+                        continue
+                    
+                    friendly_name = app_data.get('title', app_name)
+                    alert_message = f"'{friendly_name}' has been running for {run_minutes:.0f} minutes but only used for {focus_minutes:.0f} minutes"
+                    self._fire(rule, state, alert_message, now)
+            
+    def check_alerts(self, app_tracking: Dict, current_snapshot: Dict = None, metrics: 'MetricsFrame' = None):
+        """
+        Check all alert rules and trigger notifications. System metrics come
+        from metrics, or else from the snapshot's system section; the engine
+        never samples the OS itself.
+        """
+        # Pick up rule edits made through the API (a stat call unless the file changed)
+        self.reload_rules_if_changed()
+        index = self._compiled_rules()
+        now = self.clock()
+        if metrics is None and current_snapshot:
+            metrics = MetricsFrame.from_snapshot(current_snapshot)
+        
+        if current_snapshot:
+            self._check_app_memory(index, current_snapshot, now)
+        elif metrics is not None:
+            # No app snapshot, check system memory as fallback
+            for rule in index.any_app_memory:
+                if self.check_memory_usage(rule, metrics, now):
+                    alert_message = f"System memory usage is {metrics.memory_percent:.1f}% (threshold: {rule.threshold:.0f}%)"
                     self.send_desktop_notification(
                         title=rule.name,
                         message=alert_message,
                         rule_id=rule.rule_id
                     )
                     logger.warning(f"Alert triggered: {rule.name} - {alert_message}")
-                    
-            elif rule.condition_type == 'app_overrun':
-                # Find apps that match the condition
-                for app_name, app_data in app_tracking.items():
-                    if rule.target_app and rule.target_app != app_name:
-                        continue
-                        
-                    run_minutes = app_data.get('total_run_seconds', 0) / 60
-                    focus_minutes = app_data.get('total_focus_seconds', 0) / 60
-                    
-                    if run_minutes >= rule.threshold:
-                        idle_minutes = run_minutes - focus_minutes
-                        if idle_minutes > run_minutes * 0.5 and idle_minutes >= rule.duration_minutes:
-                            state_key = f"{rule.rule_id}_{app_name}"
-                            state = self.alert_state[state_key]
-                            
-                            # Check cooldown
-                            if state['last_alert_time']:
-                                time_since_alert = (datetime.now() - state['last_alert_time']).total_seconds()
-                                if time_since_alert < self.alert_cooldown:
-                                    continue
-                            
-                            triggered = True
-                            friendly_name = app_data.get('title', app_name)
-                            alert_message = f"'{friendly_name}' has been running for {run_minutes:.0f} minutes but only used for {focus_minutes:.0f} minutes"
-                            state['last_alert_time'] = datetime.now()
-                            state['alert_count'] += 1
-                            
-                            self.send_desktop_notification(
-                                title=rule.name,
-                                message=alert_message,
-                                rule_id=rule.rule_id
-                            )
-                            logger.warning(f"Alert triggered: {rule.name} - {alert_message}")
+        
+        if metrics is not None:
+            for rule in index.system_overrun:
+                if self.check_system_overrun(rule, metrics, now):
+                    alert_message = f"System CPU usage is {metrics.cpu_percent:.1f}% for {rule.duration_minutes} minutes (threshold: {rule.threshold:.0f}%)"
+                    self.send_desktop_notification(
+                        title=rule.name,
+                        message=alert_message,
+                        rule_id=rule.rule_id
+                    )
+                    logger.warning(f"Alert triggered: {rule.name} - {alert_message}")
+        
+        if metrics is not None:
+            for rule in index.system_window:
+                value = getattr(metrics, rule.metric)
+                if value is not None:
+                    self._check_window(rule, None, 'System', value, now)
+        
+        if index.app_overrun or index.any_app_overrun:
+            self._check_app_overrun(index, app_tracking, now)
 
 
 # Singleton instance
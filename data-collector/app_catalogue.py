@@ -0,0 +1,138 @@
+"""
+Persistent catalogue of app titles seen in the activity JSONL files
+
+Stores the distinct app titles together with how far each day file has been
+read in activity_data/app_catalogue.json. A refresh only reads the lines
+appended since the stored offset (replaying from the checkpoint before them
+through the file's jsonl_index sidecar), and days that are over and fully
+read are never looked at again. Between refreshes, titles() answers from
+memory.
+"""
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from columnar_store import parse_day_file
+from jsonl_index import load_index
+from snapshot_codec import iter_snapshots
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FILENAME = 'app_catalogue.json'
+CATALOGUE_VERSION = 1
+
+
+def snapshot_titles(snapshot: Dict) -> List[str]:
+    """App titles of a snapshot's apps and background apps"""
+    apps = list(snapshot.get('apps', []))
+    apps.extend((snapshot.get('backgroundApps') or {}).get('apps', []))
+    return [app['title'] for app in apps if app.get('title')]
+
+
+class AppCatalogue:
+    """Distinct app titles of a data directory, updated incrementally from each file's last-read offset"""
+
+    def __init__(self, data_dir: Path, catalogue_file: Path = None, refresh_interval: float = 30):
+        self.data_dir = Path(data_dir)
+        self.catalogue_file = Path(catalogue_file) if catalogue_file else self.data_dir / CATALOGUE_FILENAME
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self._titles = set()
+        self._sorted_titles: List[str] = []
+        # filename -> {'offset': bytes read, 'complete': day over and fully read}
+        self._files: Dict[str, Dict] = {}
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.catalogue_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') != CATALOGUE_VERSION:
+            return
+        self._titles = set(data.get('titles', []))
+        self._sorted_titles = sorted(self._titles)
+        self._files = data.get('files', {})
+
+    def _save(self):
+        temp_file = self.catalogue_file.with_suffix('.json.tmp')
+        data = {
+            'version': CATALOGUE_VERSION,
+            'titles': self._sorted_titles,
+            'files': self._files
+        }
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp_file, self.catalogue_file)
+        except OSError as e:
+            logger.warning(f"Could not save app catalogue: {e}")
+
+    def _read_new_lines(self, jsonl_file: Path, offset: int) -> Optional[int]:
+        """Add the titles of the lines from offset on; returns the new offset (None if nothing new)"""
+        index = load_index(jsonl_file)
+        if index['size'] <= offset:
+            return None
+
+        first = bisect.bisect_left(index['offsets'], offset)
+        if first < len(index['offsets']):
+            checkpoint = index['checkpoints'][first]
+            seek_to = checkpoint if checkpoint >= 0 else index['offsets'][first]
+            with open(jsonl_file, 'rb') as f:
+                f.seek(seek_to)
+                data = f.read(index['size'] - seek_to)
+            for snapshot in iter_snapshots(line.decode('utf-8', errors='replace') for line in data.split(b'\n')):
+                self._titles.update(snapshot_titles(snapshot))
+        return index['size']
+
+    def refresh(self) -> bool:
+        """Read what was appended since the last refresh. Returns True if the catalogue changed."""
+        with self._lock:
+            changed = False
+            count = len(self._titles)
+            today = date.today()
+            for jsonl_file in sorted(self.data_dir.glob('activity_*.jsonl')):
+                parsed = parse_day_file(jsonl_file)
+                entry = self._files.get(jsonl_file.name, {'offset': 0, 'complete': False})
+                if parsed is None or entry['complete']:
+                    continue
+
+                try:
+                    size = jsonl_file.stat().st_size
+                    if size < entry['offset']:
+                        entry = {'offset': 0, 'complete': False}  # rewritten
+                    new_offset = self._read_new_lines(jsonl_file, entry['offset'])
+                except (OSError, ValueError) as e:
+                    logger.error(f"Error reading {jsonl_file.name} for the app catalogue: {e}")
+                    continue
+
+                if new_offset is not None:
+                    entry = {'offset': new_offset, 'complete': False}
+                if parsed[0] < today and entry['offset'] >= size:
+                    entry['complete'] = True
+                if self._files.get(jsonl_file.name) != entry:
+                    self._files[jsonl_file.name] = entry
+                    changed = True
+
+            if len(self._titles) != count:
+                self._sorted_titles = sorted(self._titles)
+                self.version += 1
+            if changed:
+                self._save()
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            return changed
+
+    def titles(self) -> List[str]:
+        """Sorted distinct app titles, refreshing first if the refresh interval has passed"""
+        if time.monotonic() >= self._next_refresh:
+            self.refresh()
+        return self._sorted_titles
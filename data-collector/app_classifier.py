@@ -0,0 +1,99 @@
+"""
+Shared application classifier
+
+Resolves process names to friendly display names and application names to
+categories. Keyword lists are compiled once (one case-insensitive regex per
+category for substring matching, or a dict for exact matching) and results
+are memoized per name, so classifying the same apps every tick is a cache
+hit. Used by collector_jsonl.py, collector.py and the backend categories
+router.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+
+class AppClassifier:
+    """Compiled category and friendly-name resolver with an LRU cache"""
+
+    def __init__(self, categories: Dict[str, List[str]], default_category: str = 'Uncategorized',
+                 substring_match: bool = True, display_names: Dict[str, str] = None,
+                 cache_size: int = 4096):
+        self.default_category = default_category
+        self.substring_match = substring_match
+
+        # Categories keep their order - the first matching category wins
+        self._patterns = [
+            (category, re.compile('|'.join(re.escape(app) for app in apps), re.IGNORECASE))
+            for category, apps in categories.items() if apps
+        ]
+        self._exact = {}
+        for category, apps in categories.items():
+            for app in apps:
+                self._exact.setdefault(app, category)
+
+        self._display_names = {name.lower(): display for name, display in (display_names or {}).items()}
+
+        self.get_category = lru_cache(maxsize=cache_size)(self._resolve_category)
+        self.get_friendly_name = lru_cache(maxsize=cache_size)(self._resolve_friendly_name)
+
+    def _resolve_category(self, app_name: str) -> str:
+        if not self.substring_match:
+            return self._exact.get(app_name, self.default_category)
+
+        for category, pattern in self._patterns:
+            if pattern.search(app_name):
+                return category
+        return self.default_category
+
+    def _resolve_friendly_name(self, process_name: str) -> str:
+        process_lower = process_name.lower()
+        if process_lower in self._display_names:
+            return self._display_names[process_lower]
+
+        # Remove .exe and capitalize
+        if process_lower.endswith('.exe'):
+            clean_name = process_name[:-4]
+        else:
+            clean_name = process_name
+
+        return ' '.join(word.capitalize() for word in clean_name.replace('_', ' ').replace('-', ' ').split())
+
+
+# Config-backed classifiers, keyed by config file path: (file version, classifier)
+_config_classifiers: Dict[str, tuple] = {}
+
+
+def _config_version(config_file: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(config_file)
+        return stat.st_mtime_ns, stat.st_size
+    except OSError:
+        return None
+
+
+def get_config_classifier(config_file: str, load_categories: Callable[[], Dict[str, List[str]]],
+                          **classifier_options) -> AppClassifier:
+    """
+    Get a classifier for a category config file. load_categories is only
+    called (and the classifier rebuilt) when the file's mtime or size changes.
+    """
+    config_file = os.path.abspath(config_file)
+    version = _config_version(config_file)
+
+    cached = _config_classifiers.get(config_file)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    classifier = AppClassifier(load_categories(), **classifier_options)
+    if version is None:
+        # Loading may have created the file with default categories
+        version = _config_version(config_file)
+    _config_classifiers[config_file] = (version, classifier)
+    return classifier
+
+
+def invalidate_config_classifier(config_file: str):
+    """Force a rebuild on next use, e.g. after saving the config in this process"""
+    _config_classifiers.pop(os.path.abspath(config_file), None)
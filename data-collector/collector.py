@@ -14,6 +14,12 @@ import configparser
 import getpass
 from collections import defaultdict
 
+from process_sampler import ProcessSampler
+from window_enumerator import WindowEnumerator
+from app_classifier import AppClassifier
+from summary_rollups import SummaryRollups
+from mongo_write_buffer import MongoWriteBuffer
+
 # Load environment variables
 load_dotenv()
 
@@ -72,6 +78,108 @@ DISTRACTION_APPS = [
     'Netflix', 'Steam', 'Discord', 'WhatsApp', 'Telegram'
 ]
 
+# Display Name Mappings - Map process names (case-insensitive) to friendly display names
+APP_DISPLAY_NAMES = {
+    # Microsoft Office
+    'winword.exe': 'Microsoft Word',
+    'excel.exe': 'Microsoft Excel',
+    'powerpnt.exe': 'Microsoft PowerPoint',
+    'outlook.exe': 'Microsoft Outlook',
+    'onenote.exe': 'Microsoft OneNote',
+    'teams.exe': 'Microsoft Teams',
+    
+    # Browsers
+    'chrome.exe': 'Google Chrome',
+    'firefox.exe': 'Mozilla Firefox',
+    'msedge.exe': 'Microsoft Edge',
+    'opera.exe': 'Opera Browser',
+    'brave.exe': 'Brave Browser',
+    'iexplore.exe': 'Internet Explorer',
+    
+    # Development Tools
+    'code.exe': 'Visual Studio Code',
+    'devenv.exe': 'Visual Studio',
+    'rider64.exe': 'JetBrains Rider',
+    'idea64.exe': 'IntelliJ IDEA',
+    'pycharm64.exe': 'PyCharm',
+    'webstorm64.exe': 'WebStorm',
+    'sublime_text.exe': 'Sublime Text',
+    'notepad++.exe': 'Notepad++',
+    'atom.exe': 'Atom',
+    
+    # Communication
+    'slack.exe': 'Slack',
+    'discord.exe': 'Discord',
+    'zoom.exe': 'Zoom',
+    'skype.exe': 'Skype',
+    'whatsapp.exe': 'WhatsApp',
+    'telegram.exe': 'Telegram',
+    
+    # Media & Entertainment
+    'spotify.exe': 'Spotify',
+    'vlc.exe': 'VLC Media Player',
+    'netflix.exe': 'Netflix',
+    'youtube.exe': 'YouTube',
+    'itunes.exe': 'iTunes',
+    'winamp.exe': 'Winamp',
+    
+    # Adobe Creative Suite
+    'photoshop.exe': 'Adobe Photoshop',
+    'illustrator.exe': 'Adobe Illustrator',
+    'indesign.exe': 'Adobe InDesign',
+    'lightroom.exe': 'Adobe Lightroom',
+    'premiere.exe': 'Adobe Premiere Pro',
+    'afterfx.exe': 'Adobe After Effects',
+    'acrobat.exe': 'Adobe Acrobat',
+    
+    # System & Utilities
+    'explorer.exe': 'File Explorer',
+    'notepad.exe': 'Notepad',
+    'calc.exe': 'Calculator',
+    'cmd.exe': 'Command Prompt',
+    'powershell.exe': 'PowerShell',
+    'taskmgr.exe': 'Task Manager',
+    'regedit.exe': 'Registry Editor',
+    'msconfig.exe': 'System Configuration',
+    
+    # Gaming
+    'steam.exe': 'Steam',
+    'origin.exe': 'EA Origin',
+    'epicgameslauncher.exe': 'Epic Games Launcher',
+    'battle.net.exe': 'Battle.net',
+    
+    # Cloud Storage
+    'onedrive.exe': 'OneDrive',
+    'dropbox.exe': 'Dropbox',
+    'googledrivesync.exe': 'Google Drive',
+    'box.exe': 'Box',
+    
+    # Database & Development
+    'mongodbcompass.exe': 'MongoDB Compass',
+    'mysql.exe': 'MySQL',
+    'postgres.exe': 'PostgreSQL',
+    'redis.exe': 'Redis',
+    'postman.exe': 'Postman',
+    'insomnia.exe': 'Insomnia',
+    
+    # Others
+    '7z.exe': '7-Zip',
+    'winrar.exe': 'WinRAR',
+    'putty.exe': 'PuTTY',
+    'filezilla.exe': 'FileZilla',
+    'wireshark.exe': 'Wireshark',
+    'vmware.exe': 'VMware',
+    'virtualbox.exe': 'VirtualBox'
+}
+
+# Category matching is compiled once and memoized per name
+APP_CLASSIFIER = AppClassifier(
+    APP_CATEGORIES,
+    default_category='uncategorized',
+    substring_match=False,
+    display_names=APP_DISPLAY_NAMES
+)
+
 class ApplicationDataCollector:
     def __init__(self):
         self.mongodb_uri = os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
@@ -98,6 +206,16 @@ class ApplicationDataCollector:
             })
         })
         
+        # daily_summary / hourly_summary are maintained incrementally and
+        # periodically reconciled against app_time_tracking and system_metrics
+        self.summary_rollups = SummaryRollups(self.user_id)
+        self.summary_reconcile_interval = int(os.getenv('SUMMARY_RECONCILE_MINUTES', 15)) * 60
+        self.last_summary_reconcile = None
+        
+        # Per-tick writes go out as one unordered bulk_write per collection;
+        # ticks are coalesced while a slow flush is still running
+        self.write_buffer = MongoWriteBuffer(int(os.getenv('WRITE_BUFFER_MAX_INSERTS', 10000)))
+        
         # Load configuration
         self.config = configparser.ConfigParser()
         config_path = os.path.join(os.path.dirname(__file__), 'config.ini')
@@ -112,10 +230,19 @@ class ApplicationDataCollector:
             self.config.set('tracking_enabled', 'enabled', 'true')
             self.config.set('tracking_enabled', 'max_applications', '50')
         
+        # USS (memory_full_info) matches Task Manager but is expensive; RSS-only
+        # mode skips it entirely
+        self.use_rss_only = os.getenv('MEMORY_RSS_ONLY', 'false').lower() == 'true'
+        
+        # Process handles and window info are cached across ticks
+        self.process_sampler = ProcessSampler()
+        self.window_enumerator = None
+        
         # Windows API for getting foreground window
         if platform.system() == 'Windows':
             self.user32 = ctypes.windll.user32
             self.kernel32 = ctypes.windll.kernel32
+            self.window_enumerator = WindowEnumerator(self.process_sampler)
     
     async def connect_to_database(self):
         """Connect to MongoDB database"""
@@ -150,13 +277,8 @@ class ApplicationDataCollector:
             pid = wintypes.DWORD()
             self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
             
-            # Get process name
-            try:
-                process = psutil.Process(pid.value)
-                process_name = process.name()
-                return process_name, window_title
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                return None, window_title
+            # Get process name from the sampler's cached handles
+            return self.process_sampler.process_name(pid.value), window_title
                 
         except Exception as e:
             logger.warning(f"Error getting foreground window: {e}")
@@ -164,121 +286,11 @@ class ApplicationDataCollector:
     
     def get_friendly_app_name(self, process_name, window_title=None):
         """Convert process name to user-friendly application name"""
-        process_name_lower = process_name.lower()
-        
-        # Application name mapping
-        app_name_map = {
-            # Microsoft Office
-            'winword.exe': 'Microsoft Word',
-            'excel.exe': 'Microsoft Excel',
-            'powerpnt.exe': 'Microsoft PowerPoint',
-            'outlook.exe': 'Microsoft Outlook',
-            'onenote.exe': 'Microsoft OneNote',
-            'teams.exe': 'Microsoft Teams',
-            
-            # Browsers
-            'chrome.exe': 'Google Chrome',
-            'firefox.exe': 'Mozilla Firefox',
-            'msedge.exe': 'Microsoft Edge',
-            'opera.exe': 'Opera Browser',
-            'brave.exe': 'Brave Browser',
-            'iexplore.exe': 'Internet Explorer',
-            
-            # Development Tools
-            'code.exe': 'Visual Studio Code',
-            'devenv.exe': 'Visual Studio',
-            'rider64.exe': 'JetBrains Rider',
-            'idea64.exe': 'IntelliJ IDEA',
-            'pycharm64.exe': 'PyCharm',
-            'webstorm64.exe': 'WebStorm',
-            'sublime_text.exe': 'Sublime Text',
-            'notepad++.exe': 'Notepad++',
-            'atom.exe': 'Atom',
-            
-            # Communication
-            'slack.exe': 'Slack',
-            'discord.exe': 'Discord',
-            'zoom.exe': 'Zoom',
-            'skype.exe': 'Skype',
-            'whatsapp.exe': 'WhatsApp',
-            'telegram.exe': 'Telegram',
-            
-            # Media & Entertainment
-            'spotify.exe': 'Spotify',
-            'vlc.exe': 'VLC Media Player',
-            'netflix.exe': 'Netflix',
-            'youtube.exe': 'YouTube',
-            'itunes.exe': 'iTunes',
-            'winamp.exe': 'Winamp',
-            
-            # Adobe Creative Suite
-            'photoshop.exe': 'Adobe Photoshop',
-            'illustrator.exe': 'Adobe Illustrator',
-            'indesign.exe': 'Adobe InDesign',
-            'lightroom.exe': 'Adobe Lightroom',
-            'premiere.exe': 'Adobe Premiere Pro',
-            'afterfx.exe': 'Adobe After Effects',
-            'acrobat.exe': 'Adobe Acrobat',
-            
-            # System & Utilities
-            'explorer.exe': 'File Explorer',
-            'notepad.exe': 'Notepad',
-            'calc.exe': 'Calculator',
-            'cmd.exe': 'Command Prompt',
-            'powershell.exe': 'PowerShell',
-            'taskmgr.exe': 'Task Manager',
-            'regedit.exe': 'Registry Editor',
-            'msconfig.exe': 'System Configuration',
-            
-            # Gaming
-            'steam.exe': 'Steam',
-            'origin.exe': 'EA Origin',
-            'epicgameslauncher.exe': 'Epic Games Launcher',
-            'battle.net.exe': 'Battle.net',
-            
-            # Cloud Storage
-            'onedrive.exe': 'OneDrive',
-            'dropbox.exe': 'Dropbox',
-            'googledrivesync.exe': 'Google Drive',
-            'box.exe': 'Box',
-            
-            # Database & Development
-            'mongodbcompass.exe': 'MongoDB Compass',
-            'mysql.exe': 'MySQL',
-            'postgres.exe': 'PostgreSQL',
-            'redis.exe': 'Redis',
-            'postman.exe': 'Postman',
-            'insomnia.exe': 'Insomnia',
-            
-            # Others
-            '7z.exe': '7-Zip',
-            'winrar.exe': 'WinRAR',
-            'putty.exe': 'PuTTY',
-            'filezilla.exe': 'FileZilla',
-            'wireshark.exe': 'Wireshark',
-            'vmware.exe': 'VMware',
-            'virtualbox.exe': 'VirtualBox'
-        }
-        
-        # Check if we have a friendly name mapping
-        if process_name_lower in app_name_map:
-            return app_name_map[process_name_lower]
-        
-        # If no mapping found, use the process name without .exe extension
-        if process_name_lower.endswith('.exe'):
-            clean_name = process_name[:-4]  # Remove .exe
-        else:
-            clean_name = process_name
-        
-        # Capitalize the first letter of each word
-        return ' '.join(word.capitalize() for word in clean_name.replace('_', ' ').replace('-', ' ').split())
+        return APP_CLASSIFIER.get_friendly_name(process_name)
     
     def get_app_category(self, app_name):
         """Determine the category of an application"""
-        for category, apps in APP_CATEGORIES.items():
-            if app_name in apps:
-                return category
-        return 'uncategorized'
+        return APP_CLASSIFIER.get_category(app_name)
     
     def is_focus_app(self, app_name):
         """Check if application is a focus application"""
@@ -291,75 +303,50 @@ class ApplicationDataCollector:
     def get_running_applications(self):
         """Get list of running applications with their total memory usage - matching Task Manager"""
         applications = {}
-        apps_with_windows = set()
         
-        # First pass: identify which applications have visible windows
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_percent', 'exe']):
-            try:
-                info = proc.info
-                name = info['name']
-                pid = info['pid']
-                
-                # Skip system processes and focus on user applications
-                if self.is_user_application(proc, info):
-                    # Calculate memory first to check thresholds
-                    try:
-                        # Use USS (Unique Set Size) which matches Task Manager better
-                        full_mem_info = proc.memory_full_info()
-                        memory_mb = full_mem_info.uss / (1024 * 1024)
-                    except (psutil.AccessDenied, AttributeError):
-                        # Fallback to RSS if USS is not available
-                        memory_mb = info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
-                    
-                    # Check if this application should be tracked based on configuration
-                    if self.should_track_application(name, memory_mb):
-                        # Check if this process has a visible window
-                        if self.has_visible_window(pid):
-                            apps_with_windows.add(name)
-                        
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        # One window enumeration per tick instead of one per candidate process
+        window_pids = self.get_taskbar_window_pids()
+        
+        # Single pass over processes; USS is computed at most once per process
+        user_processes = []
+        apps_with_windows = set()
+        for info in self.process_sampler.sample():
+            # Skip system processes and focus on user applications
+            if not self.is_user_application(info):
                 continue
+            
+            name = info['name']
+            memory_mb = self.get_process_memory_mb(info)
+            user_processes.append((info, memory_mb))
+            
+            # Check if this application should be tracked based on configuration
+            if name not in apps_with_windows and self.should_track_application(name, memory_mb):
+                # Check if this process has a visible window
+                if window_pids is None or info['pid'] in window_pids:
+                    apps_with_windows.add(name)
         
-        # Second pass: aggregate all processes for applications that have at least one visible window
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_percent', 'exe']):
-            try:
-                info = proc.info
-                name = info['name']
-                pid = info['pid']
-                
-                # Skip system processes and focus on user applications
-                if self.is_user_application(proc, info):
-                    # Include this process if the application has at least one visible window
-                    if name in apps_with_windows:
-                        # Use the process name as the key for aggregation
-                        app_key = name
-                        
-                        if app_key not in applications:
-                            applications[app_key] = {
-                                'name': name,
-                                'memory_mb': 0,
-                                'cpu_percent': 0,
-                                'process_count': 0,
-                                'pids': []
-                            }
-                        
-                        # Get memory usage (USS = Unique Set Size, matches Task Manager's "Memory" column)
-                        try:
-                            # Use USS (Unique Set Size) which matches Task Manager better
-                            full_mem_info = proc.memory_full_info()
-                            memory_mb = full_mem_info.uss / (1024 * 1024)
-                        except (psutil.AccessDenied, AttributeError):
-                            # Fallback to RSS if USS is not available
-                            memory_mb = info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
-                        cpu_percent = info['cpu_percent'] or 0
-                        
-                        applications[app_key]['memory_mb'] += memory_mb
-                        applications[app_key]['cpu_percent'] += cpu_percent
-                        applications[app_key]['process_count'] += 1
-                        applications[app_key]['pids'].append(info['pid'])
-                    
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+        # Aggregate all processes for applications that have at least one visible window
+        for info, memory_mb in user_processes:
+            name = info['name']
+            if name not in apps_with_windows:
                 continue
+            
+            # Use the process name as the key for aggregation
+            app_key = name
+            
+            if app_key not in applications:
+                applications[app_key] = {
+                    'name': name,
+                    'memory_mb': 0,
+                    'cpu_percent': 0,
+                    'process_count': 0,
+                    'pids': []
+                }
+            
+            applications[app_key]['memory_mb'] += memory_mb
+            applications[app_key]['cpu_percent'] += info['cpu_percent'] or 0
+            applications[app_key]['process_count'] += 1
+            applications[app_key]['pids'].append(info['pid'])
         
         # Average CPU usage for multi-process applications
         for app in applications.values():
@@ -368,7 +355,19 @@ class ApplicationDataCollector:
         
         return list(applications.values())
     
-    def is_user_application(self, proc, info):
+    def get_process_memory_mb(self, info):
+        """Get process memory in MB - USS (matches Task Manager's "Memory" column) unless RSS-only mode is on"""
+        if not self.use_rss_only:
+            try:
+                # Use USS (Unique Set Size) which matches Task Manager better
+                return info['process'].memory_full_info().uss / (1024 * 1024)
+            except (psutil.AccessDenied, psutil.NoSuchProcess, psutil.ZombieProcess, AttributeError):
+                pass
+        
+        # Fallback to RSS if USS is not available
+        return info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
+    
+    def is_user_application(self, info):
         """Determine if a process is a user application that should appear in taskbar"""
         try:
             name = info['name'].lower()
@@ -473,65 +472,37 @@ class ApplicationDataCollector:
             logger.warning(f"Error checking application config for {process_name}: {e}")
             return True  # Default to allowing if config check fails
     
-    def has_visible_window(self, pid):
-        """Check if a process has a visible window that would appear in taskbar"""
+    def get_taskbar_window_pids(self):
+        """Get the pids of all processes with a window that would appear in taskbar (None if unknown)"""
+        if not self.window_enumerator:
+            return None
+        
         try:
             # Windows API constants
             WS_VISIBLE = 0x10000000
             WS_EX_TOOLWINDOW = 0x00000080
             WS_EX_APPWINDOW = 0x00040000
-            GWL_EXSTYLE = -20
-            GWL_STYLE = -16
-            
-            # Get user32 and kernel32 DLLs
-            user32 = ctypes.windll.user32
             
-            # Variable to store if we found a visible window
-            found_window = [False]
-            
-            # Check if any window belongs to this process and is visible
-            def enum_windows_proc(hwnd, lParam):
-                # Get window's process ID
-                window_pid = wintypes.DWORD()
-                user32.GetWindowThreadProcessId(hwnd, ctypes.byref(window_pid))
-                
-                if window_pid.value == pid:
-                    # Check if window is visible
-                    if user32.IsWindowVisible(hwnd):
-                        # Get window styles
-                        style = user32.GetWindowLongW(hwnd, GWL_STYLE)
-                        ex_style = user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
-                        
-                        # Check if it's a regular window (not a tool window)
-                        # and is visible in taskbar
-                        is_tool_window = (ex_style & WS_EX_TOOLWINDOW) != 0
-                        is_app_window = (ex_style & WS_EX_APPWINDOW) != 0
-                        is_visible = (style & WS_VISIBLE) != 0
-                        
-                        # Get window title length
-                        title_length = user32.GetWindowTextLengthW(hwnd)
-                        
-                        # Window should appear in taskbar if:
-                        # - It's visible
-                        # - It has a title
-                        # - It's not a tool window OR it's explicitly an app window
-                        if is_visible and title_length > 0 and (not is_tool_window or is_app_window):
-                            found_window[0] = True
-                            return False  # Stop enumeration
+            window_pids = set()
+            for window in self.window_enumerator.enumerate():
+                # Check if it's a regular window (not a tool window)
+                # and is visible in taskbar
+                is_tool_window = (window['ex_style'] & WS_EX_TOOLWINDOW) != 0
+                is_app_window = (window['ex_style'] & WS_EX_APPWINDOW) != 0
+                is_visible = (window['style'] & WS_VISIBLE) != 0
                 
-                return True  # Continue enumeration
-            
-            # Define the callback type
-            EnumWindowsProc = ctypes.WINFUNCTYPE(ctypes.c_bool, wintypes.HWND, wintypes.LPARAM)
-            
-            # Enumerate all windows
-            user32.EnumWindows(EnumWindowsProc(enum_windows_proc), 0)
+                # Window should appear in taskbar if:
+                # - It's visible (enumerated windows always have a title)
+                # - It's not a tool window OR it's explicitly an app window
+                if is_visible and (not is_tool_window or is_app_window):
+                    window_pids.add(window['pid'])
             
-            return found_window[0]
+            return window_pids
             
         except Exception as e:
-            # If we can't determine, assume it might have a window
-            return True
+            # If we can't determine, assume every process might have a window
+            logger.warning(f"Error enumerating windows: {e}")
+            return None
     
     def is_application(self, process_name):
         """Legacy method - keeping for compatibility"""
@@ -550,14 +521,17 @@ class ApplicationDataCollector:
             current_date = current_time.date()
             current_hour = current_time.hour
             
+            # Rebuild the in-memory summaries on a new day and periodically after that
+            await self.reconcile_summaries_if_needed(current_date)
+            
             # Get foreground window information
             foreground_app, window_title = self.get_foreground_window_info()
             
             # Get all currently running applications
             running_applications = self.get_running_applications()
             
-            # Get system metrics
-            cpu_usage = psutil.cpu_percent(interval=1)
+            # Get system metrics (CPU is averaged since the previous tick's process sample)
+            cpu_usage = self.process_sampler.system_cpu_percent
             memory = psutil.virtual_memory()
             memory_usage_mb = memory.used / (1024 * 1024)
             
@@ -569,7 +543,7 @@ class ApplicationDataCollector:
                 if self.current_focused_app != friendly_app_name:
                     if self.current_focused_app and self.focused_app_start_time:
                         focus_duration = (current_time - self.focused_app_start_time).total_seconds()
-                        await self.update_app_time_tracking(
+                        self.update_app_time_tracking(
                             self.current_focused_app,
                             focus_duration,
                             current_date,
@@ -619,7 +593,7 @@ class ApplicationDataCollector:
                 
                 # Update time-based tracking for background apps
                 if not is_focused:
-                    await self.update_app_time_tracking(
+                    self.update_app_time_tracking(
                         friendly_app_name,
                         self.collection_interval,
                         current_date,
@@ -627,18 +601,20 @@ class ApplicationDataCollector:
                         is_focused=False
                     )
             
-            # Batch insert real-time activity
-            if app_activities:
-                await self.db.application_activity.insert_many(app_activities)
+            # Queue real-time activity (old documents expire through the TTL
+            # indexes created by setup_database.py)
+            for activity_document in app_activities:
+                self.write_buffer.insert('application_activity', activity_document)
             
             # Store system metrics
-            await self.store_system_metrics(current_time, cpu_usage, memory_usage_mb)
+            self.store_system_metrics(current_time, cpu_usage, memory_usage_mb)
             
-            # Store daily summary
-            await self.store_daily_summary(current_date)
+            # Queue daily and hourly summary increments
+            self.store_summaries()
             
-            # Store hourly summary
-            await self.store_hourly_summary(current_date, current_hour)
+            # Send this tick's writes (merged with earlier ones if the database is behind),
+            # then record the tick so the API can drop its cached responses
+            self.write_buffer.flush_in_background(self.db, lambda: self.record_tick(current_time))
             
             # Log status
             if foreground_app:
@@ -647,18 +623,12 @@ class ApplicationDataCollector:
                 logger.info(f"Focused: {focused_friendly_name} ({category}) | Running: {len(running_applications)} | CPU: {cpu_usage:.1f}% | Memory: {memory_usage_mb:.0f}MB")
             else:
                 logger.info(f"No focused app | Running: {len(running_applications)} | CPU: {cpu_usage:.1f}% | Memory: {memory_usage_mb:.0f}MB")
-            
-            # Cleanup old real-time data (keep only last 24 hours)
-            cleanup_time = current_time - timedelta(hours=24)
-            await self.db.application_activity.delete_many({
-                'timestamp': {'$lt': cleanup_time}
-            })
                 
         except Exception as e:
             logger.error(f"Error collecting application data: {e}", exc_info=True)
     
-    async def update_app_time_tracking(self, app_name, duration_seconds, date, hour, is_focused=False):
-        """Update time tracking for an application"""
+    def update_app_time_tracking(self, app_name, duration_seconds, date, hour, is_focused=False):
+        """Queue a time tracking update for an application"""
         try:
             category = self.get_app_category(app_name)
             is_focus = self.is_focus_app(app_name)
@@ -684,21 +654,34 @@ class ApplicationDataCollector:
             }
             
             # Update app time tracking (hourly granularity)
-            await self.db.app_time_tracking.update_one(
+            self.write_buffer.update(
+                'app_time_tracking',
                 {
                     'user_id': self.user_id,
                     'application': app_name,
                     'date': datetime.combine(date, datetime.min.time()),
                     'hour': hour
                 },
-                update_doc,
-                upsert=True
+                update_doc
             )
             
+            if datetime.combine(date, datetime.min.time()) == self.summary_rollups.date_start:
+                self.summary_rollups.add_app_time(
+                    app_name, hour, duration_seconds, is_focused, category, is_focus, is_distraction
+                )
+            
         except Exception as e:
             logger.error(f"Error updating app time tracking: {e}")
     
-    async def store_system_metrics(self, timestamp, cpu_usage, memory_usage_mb):
+    async def record_tick(self, tick_time: datetime):
+        """Record the last written tick in collector_ticks (read by the API response cache)"""
+        await self.db.collector_ticks.update_one(
+            {'_id': f'collector:{self.user_id}'},
+            {'$set': {'last_tick': tick_time}},
+            upsert=True
+        )
+    
+    def store_system_metrics(self, timestamp, cpu_usage, memory_usage_mb):
         """Store system-level metrics"""
         try:
             metrics_doc = {
@@ -710,191 +693,98 @@ class ApplicationDataCollector:
                 'memory_usage_mb': memory_usage_mb,
             }
             
-            await self.db.system_metrics.insert_one(metrics_doc)
+            self.write_buffer.insert('system_metrics', metrics_doc)
             
-            # Cleanup old metrics (keep only last 7 days)
-            cleanup_time = timestamp - timedelta(days=7)
-            await self.db.system_metrics.delete_many({
-                'timestamp': {'$lt': cleanup_time}
-            })
+            if metrics_doc['date'] == self.summary_rollups.date_start:
+                self.summary_rollups.add_system_metrics(cpu_usage, memory_usage_mb)
             
         except Exception as e:
             logger.error(f"Error storing system metrics: {e}")
     
-    async def store_daily_summary(self, date):
-        """Store or update daily summary with focus vs distraction time"""
+    async def reconcile_summaries_if_needed(self, date):
+        """Reload the summary rollups from the raw collections on a new day, when due or after a failed write"""
+        date_start = datetime.combine(date, datetime.min.time())
+        if self.write_buffer.take_write_failure():
+            self.last_summary_reconcile = None
+        if (
+            self.summary_rollups.date_start == date_start
+            and self.last_summary_reconcile is not None
+            and time.monotonic() - self.last_summary_reconcile < self.summary_reconcile_interval
+        ):
+            return
+        await self.reconcile_summaries(date)
+    
+    async def reconcile_summaries(self, date):
+        """Rebuild the day's summary rollups from app_time_tracking and system_metrics"""
         try:
             date_start = datetime.combine(date, datetime.min.time())
             date_end = date_start + timedelta(days=1)
             
-            # Aggregate app time tracking for the day
-            pipeline = [
-                {
-                    '$match': {
-                        'user_id': self.user_id,
-                        'date': date_start
-                    }
-                },
-                {
-                    '$group': {
-                        '_id': None,
-                        'total_time_seconds': {'$sum': '$total_time_seconds'},
-                        'total_focused_time_seconds': {'$sum': '$focused_time_seconds'},
-                        'apps': {
-                            '$push': {
-                                'application': '$application',
-                                'total_time_seconds': '$total_time_seconds',
-                                'focused_time_seconds': '$focused_time_seconds',
-                                'category': '$category',
-                                'is_focus_app': '$is_focus_app',
-                                'is_distraction_app': '$is_distraction_app'
-                            }
-                        }
-                    }
-                }
-            ]
-            
-            result = await self.db.app_time_tracking.aggregate(pipeline).to_list(length=1)
+            # Buffered increments must be in the database before it is read back
+            await self.write_buffer.flush(self.db)
             
-            if result:
-                data = result[0]
-                apps = data.get('apps', [])
-                
-                # Calculate focus and distraction time
-                focus_time = sum(app['focused_time_seconds'] for app in apps if app.get('is_focus_app', False))
-                distraction_time = sum(app['total_time_seconds'] for app in apps if app.get('is_distraction_app', False))
-                
-                # Calculate category breakdown
-                category_breakdown = {}
-                for app in apps:
-                    category = app.get('category', 'uncategorized')
-                    if category not in category_breakdown:
-                        category_breakdown[category] = 0
-                    category_breakdown[category] += app['total_time_seconds']
-                
-                # Get top apps
-                top_apps = sorted(apps, key=lambda x: x['total_time_seconds'], reverse=True)[:10]
-                
-                # Get system metrics for the day
-                avg_cpu = await self.get_average_system_metric('cpu_usage_percent', date_start, date_end)
-                avg_memory = await self.get_average_system_metric('memory_usage_mb', date_start, date_end)
-                
-                # Store daily summary
-                summary_doc = {
-                    'user_id': self.user_id,
-                    'date': date_start,
-                    'total_time_seconds': data['total_time_seconds'],
-                    'total_focused_time_seconds': data['total_focused_time_seconds'],
-                    'focus_time_seconds': focus_time,
-                    'distraction_time_seconds': distraction_time,
-                    'category_breakdown': category_breakdown,
-                    'top_apps': top_apps,
-                    'avg_cpu_usage_percent': avg_cpu,
-                    'avg_memory_usage_mb': avg_memory,
-                    'last_updated': datetime.utcnow()
+            tracking_docs = await self.db.app_time_tracking.find(
+                {'user_id': self.user_id, 'date': date_start},
+                {
+                    '_id': 0, 'application': 1, 'hour': 1, 'total_time_seconds': 1, 'focused_time_seconds': 1,
+                    'category': 1, 'is_focus_app': 1, 'is_distraction_app': 1
                 }
-                
-                await self.db.daily_summary.update_one(
-                    {
-                        'user_id': self.user_id,
-                        'date': date_start
-                    },
-                    {'$set': summary_doc},
-                    upsert=True
-                )
-                
-        except Exception as e:
-            logger.error(f"Error storing daily summary: {e}")
-    
-    async def store_hourly_summary(self, date, hour):
-        """Store or update hourly summary"""
-        try:
-            date_start = datetime.combine(date, datetime.min.time())
+            ).to_list(length=None)
             
-            # Aggregate app time tracking for the hour
             pipeline = [
                 {
                     '$match': {
                         'user_id': self.user_id,
-                        'date': date_start,
-                        'hour': hour
+                        'timestamp': {'$gte': date_start, '$lt': date_end}
                     }
                 },
                 {
                     '$group': {
                         '_id': None,
-                        'total_time_seconds': {'$sum': '$total_time_seconds'},
-                        'total_focused_time_seconds': {'$sum': '$focused_time_seconds'},
-                        'apps': {
-                            '$push': {
-                                'application': '$application',
-                                'total_time_seconds': '$total_time_seconds',
-                                'category': '$category',
-                                'is_focus_app': '$is_focus_app',
-                                'is_distraction_app': '$is_distraction_app'
-                            }
-                        }
+                        'cpu_sum': {'$sum': '$cpu_usage_percent'},
+                        'memory_sum': {'$sum': '$memory_usage_mb'},
+                        'samples': {'$sum': 1}
                     }
                 }
             ]
+            metric_totals = await self.db.system_metrics.aggregate(pipeline).to_list(length=1)
             
-            result = await self.db.app_time_tracking.aggregate(pipeline).to_list(length=1)
+            self.summary_rollups.load(date_start, tracking_docs, metric_totals[0] if metric_totals else None)
+            self.last_summary_reconcile = time.monotonic()
+            logger.info(f"Reconciled summaries for {date} from {len(tracking_docs)} tracking documents")
             
-            if result:
-                data = result[0]
-                apps = data.get('apps', [])
-                
-                focus_time = sum(app['total_time_seconds'] for app in apps if app.get('is_focus_app', False))
-                distraction_time = sum(app['total_time_seconds'] for app in apps if app.get('is_distraction_app', False))
-                
-                summary_doc = {
-                    'user_id': self.user_id,
-                    'date': date_start,
-                    'hour': hour,
-                    'total_time_seconds': data['total_time_seconds'],
-                    'focus_time_seconds': focus_time,
-                    'distraction_time_seconds': distraction_time,
-                    'app_count': len(apps),
-                    'last_updated': datetime.utcnow()
-                }
-                
-                await self.db.hourly_summary.update_one(
-                    {
-                        'user_id': self.user_id,
-                        'date': date_start,
-                        'hour': hour
-                    },
-                    {'$set': summary_doc},
-                    upsert=True
-                )
-                
         except Exception as e:
-            logger.error(f"Error storing hourly summary: {e}")
+            logger.error(f"Error reconciling summaries: {e}")
+            # Keep counting from the current state; retry on the next tick
+            self.last_summary_reconcile = None
+            if self.summary_rollups.date_start != datetime.combine(date, datetime.min.time()):
+                self.summary_rollups.reset(datetime.combine(date, datetime.min.time()))
     
-    async def get_average_system_metric(self, metric_field, start_time, end_time):
-        """Get average system metric for a time period"""
-        try:
-            pipeline = [
+    def store_summaries(self):
+        """Queue the summary increments since the previous tick"""
+        rollups = self.summary_rollups
+        
+        daily_update = rollups.take_daily_update()
+        if daily_update:
+            self.write_buffer.update(
+                'daily_summary',
                 {
-                    '$match': {
-                        'user_id': self.user_id,
-                        'timestamp': {'$gte': start_time, '$lt': end_time}
-                    }
+                    'user_id': self.user_id,
+                    'date': rollups.date_start
                 },
+                daily_update
+            )
+        
+        for hour, hourly_update in rollups.take_hourly_updates().items():
+            self.write_buffer.update(
+                'hourly_summary',
                 {
-                    '$group': {
-                        '_id': None,
-                        'average': {'$avg': f'${metric_field}'}
-                    }
-                }
-            ]
-            
-            result = await self.db.system_metrics.aggregate(pipeline).to_list(length=1)
-            return result[0]['average'] if result else 0
-            
-        except Exception as e:
-            logger.error(f"Error calculating average metric: {e}")
-            return 0
+                    'user_id': self.user_id,
+                    'date': rollups.date_start,
+                    'hour': hour
+                },
+                hourly_update
+            )
     
     async def run_data_collection(self):
         """Main data collection loop"""
@@ -910,7 +800,9 @@ class ApplicationDataCollector:
                 await asyncio.sleep(self.collection_interval)
     
     async def close(self):
-        """Close database connection"""
+        """Flush buffered writes and close database connection"""
+        if self.db is not None:
+            await self.write_buffer.flush(self.db)
         if self.client:
             self.client.close()
             logger.info("Database connection closed")
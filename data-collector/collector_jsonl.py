@@ -12,10 +12,18 @@ import ctypes
 from ctypes import wintypes
 import configparser
 import getpass
-from collections import defaultdict
+import sys
+import threading
+from collections import defaultdict, deque
 
 # Import alert engine
 from alert_engine import get_alert_engine
+from snapshot_codec import SnapshotEncoder, last_snapshot as read_last_snapshot
+from process_sampler import ProcessSampler
+from window_enumerator import WindowEnumerator
+from app_classifier import AppClassifier
+from jsonl_writer import JsonlWriter
+from columnar_store import compact_day
 
 # Load environment variables
 load_dotenv()
@@ -57,30 +65,30 @@ APP_CATEGORIES = {
     ]
 }
 
-# Display Name Mappings - Map process names to friendly display names
+# Display Name Mappings - Map process names (case-insensitive) to friendly display names
 APP_DISPLAY_NAMES = {
-    'Idea64.exe': 'IntelliJ IDEA',
-    'idea64.exe': 'IntelliJ IDEA',
-    'Sqldeveloper64w.exe': 'SQL Developer',
-    'sqldeveloper64w.exe': 'SQL Developer',
-    'ONENOTE.EXE': 'OneNote',
-    'onenote.exe': 'OneNote',
-    'ONENOTEM.EXE': 'OneNote',
-    'onenotem.exe': 'OneNote',
-    'notepad.exe': 'Notepad',
-    'NOTEPAD.EXE': 'Notepad',
-    'Code.exe': 'Visual Studio Code',
     'code.exe': 'Visual Studio Code',
     'chrome.exe': 'Google Chrome',
-    'firefox.exe': 'Mozilla Firefox',
     'msedge.exe': 'Microsoft Edge',
-    'WINWORD.EXE': 'Microsoft Word',
-    'EXCEL.EXE': 'Microsoft Excel',
-    'POWERPNT.EXE': 'Microsoft PowerPoint',
-    'OUTLOOK.EXE': 'Microsoft Outlook',
-    'Teams.exe': 'Microsoft Teams'
+    'firefox.exe': 'Mozilla Firefox',
+    'teams.exe': 'Microsoft Teams',
+    'ms-teams.exe': 'Microsoft Teams',
+    'outlook.exe': 'Microsoft Outlook',
+    'slack.exe': 'Slack',
+    'discord.exe': 'Discord',
+    'spotify.exe': 'Spotify',
+    'winword.exe': 'Microsoft Word',
+    'excel.exe': 'Microsoft Excel',
+    'powerpnt.exe': 'Microsoft PowerPoint',
+    'notepad++.exe': 'Notepad++',
+    'sublime_text.exe': 'Sublime Text',
+    'mongodbcompass.exe': 'MongoDB Compass',
+    'mongod.exe': 'MongoDB Server',
 }
 
+# Category matching is compiled once and memoized per name
+APP_CLASSIFIER = AppClassifier(APP_CATEGORIES, display_names=APP_DISPLAY_NAMES)
+
 class ActivityTracker:
     """Tracks application activity and system metrics"""
     
@@ -95,6 +103,29 @@ class ActivityTracker:
         self.current_date = datetime.now().date()
         self.current_jsonl_file = None
         
+        # Each JSONL line only stores changes since the previous line, with a full
+        # checkpoint every N records (see snapshot_codec.py)
+        self.snapshot_encoder = SnapshotEncoder(int(os.getenv('SNAPSHOT_CHECKPOINT_INTERVAL', 30)))
+        
+        # JSONL appends run on a background thread so disk stalls don't delay sampling
+        self.writer = JsonlWriter(
+            batch_size=int(os.getenv('JSONL_WRITE_BATCH_SIZE', 1)),
+            flush_interval=float(os.getenv('JSONL_WRITE_FLUSH_SECONDS', 5)),
+            fsync_policy=os.getenv('JSONL_FSYNC', 'none').lower(),
+            fsync_interval=float(os.getenv('JSONL_FSYNC_INTERVAL_SECONDS', 30)),
+            max_queue=int(os.getenv('JSONL_WRITE_QUEUE_SIZE', 1000)),
+            on_flush=self.on_jsonl_flush
+        )
+        
+        # Compact each finished day into a columnar Parquet file at rollover
+        self.columnar_compaction = os.getenv('COLUMNAR_COMPACTION', 'true').lower() == 'true'
+        
+        # Per-app caps so snapshots stay the same size however long the day runs.
+        # Window titles are deduplicated with counts; the full focus switch
+        # history goes to the day's focus_*.jsonl event file.
+        self.window_title_retention = max(1, int(os.getenv('WINDOW_TITLE_RETENTION', 100)))
+        self.focus_switch_retention = max(1, int(os.getenv('FOCUS_SWITCH_RETENTION', 500)))
+        
         # In-memory tracking for aggregation
         self.app_tracking = defaultdict(lambda: {
             'name': '',
@@ -105,8 +136,8 @@ class ActivityTracker:
             'hourly_stats': defaultdict(lambda: {'focus_seconds': 0, 'run_seconds': 0}),
             'last_seen': None,
             'is_focused': False,
-            'window_titles': [],
-            'focus_switches': []  # List of {'from': datetime, 'to': datetime, 'window_title': str, 'totalHours': float, 'courseName': str (optional for Browsers with Udemy)}
+            'window_titles': {},  # title -> {'title': str, 'count': int, 'firstSeen': str, 'lastSeen': str}
+            'focus_switches': deque(maxlen=self.focus_switch_retention)  # Most recent {'from': datetime, 'to': datetime, 'window_title': str, 'totalHours': float, 'courseName': str (optional for Browsers with Udemy)}
         })
         
         self.hourly_summary = defaultdict(lambda: {
@@ -128,6 +159,10 @@ class ActivityTracker:
             'session_start': time.time()
         }
         
+        # Process handles are kept across ticks so CPU usage is measured as the
+        # delta since the previous tick, without blocking sleeps
+        self.process_sampler = ProcessSampler()
+        
         # Idle detection
         self.last_activity_time = time.time()
         self.idle_threshold = 300  # 5 minutes
@@ -148,45 +183,24 @@ class ActivityTracker:
             logger.info(f"Loaded configuration from {config_path}")
         
         # Windows API for getting foreground window
+        self.window_enumerator = None
         if platform.system() == 'Windows':
             self.user32 = ctypes.windll.user32
             self.kernel32 = ctypes.windll.kernel32
+            self.window_enumerator = WindowEnumerator(self.process_sampler)
         
         # Load existing data from today's file to continue tracking
         self.load_existing_data()
     
-    def is_window_visible(self, hwnd):
-        """Check if a window is visible and has taskbar presence"""
-        if not hwnd:
-            return False
-        
-        # Check if window is visible
-        if not self.user32.IsWindowVisible(hwnd):
-            return False
-        
-        # Get window title first - if no title, likely not a real app window
-        length = self.user32.GetWindowTextLengthW(hwnd)
-        if length == 0:
-            return False
-        
-        buff = ctypes.create_unicode_buffer(length + 1)
-        self.user32.GetWindowTextW(hwnd, buff, length + 1)
-        window_title = buff.value
-        
-        # Skip windows with no meaningful title
-        if not window_title or len(window_title.strip()) == 0:
-            return False
-        
-        # Check window styles
-        GWL_EXSTYLE = -20
-        GWL_STYLE = -16
+    def is_taskbar_window(self, window):
+        """Check if an enumerated window has taskbar presence"""
         WS_EX_APPWINDOW = 0x00040000
         WS_EX_TOOLWINDOW = 0x00000080
         WS_VISIBLE = 0x10000000
         WS_OVERLAPPEDWINDOW = 0x00CF0000
         
-        ex_style = self.user32.GetWindowLongW(hwnd, GWL_EXSTYLE)
-        style = self.user32.GetWindowLongW(hwnd, GWL_STYLE)
+        ex_style = window['ex_style']
+        style = window['style']
         
         # Window is a tool window - skip it
         has_tool_window = (ex_style & WS_EX_TOOLWINDOW) != 0
@@ -203,55 +217,28 @@ class ActivityTracker:
         is_visible_style = (style & WS_VISIBLE) != 0
         
         # If it's a visible overlapped window with a title, it's likely a taskbar app
-        if is_overlapped and is_visible_style and window_title:
+        if is_overlapped and is_visible_style:
             return True
         
-        # Check if window has an owner - owned windows are usually dialogs
-        owner = self.user32.GetWindow(hwnd, 4)  # GW_OWNER = 4
-        if owner == 0:  # No owner means it's a top-level window
-            return True
-        
-        return False
+        # Owned windows are usually dialogs; no owner means it's a top-level window
+        return not window['has_owner']
     
     def get_visible_windows(self):
         """Get all visible windows that appear in taskbar"""
         visible_windows = {}
         
-        def enum_windows_callback(hwnd, lParam):
-            if self.is_window_visible(hwnd):
-                try:
-                    # Get process ID
-                    pid = wintypes.DWORD()
-                    self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
-                    
-                    # Get process
-                    try:
-                        process = psutil.Process(pid.value)
-                        process_name = process.name()
-                        
-                        # Get window title
-                        length = self.user32.GetWindowTextLengthW(hwnd)
-                        if length > 0:
-                            buff = ctypes.create_unicode_buffer(length + 1)
-                            self.user32.GetWindowTextW(hwnd, buff, length + 1)
-                            window_title = buff.value
-                            
-                            if window_title and process_name:
-                                visible_windows[process_name] = {
-                                    'name': process_name,
-                                    'title': window_title,
-                                    'hwnd': hwnd
-                                }
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        pass
-                except Exception:
-                    pass
-            return True
-        
-        # Enumerate all top-level windows
-        EnumWindowsProc = ctypes.WINFUNCTYPE(ctypes.c_bool, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int))
-        callback = EnumWindowsProc(enum_windows_callback)
-        self.user32.EnumWindows(callback, 0)
+        if not self.window_enumerator:
+            return visible_windows
+        
+        # Titles are fetched once per window; pid, process name and styles come
+        # from the HWND cache unless the window is new or its title changed
+        for window in self.window_enumerator.enumerate():
+            if self.is_taskbar_window(window):
+                visible_windows[window['name']] = {
+                    'name': window['name'],
+                    'title': window['title'],
+                    'hwnd': window['hwnd']
+                }
         
         return visible_windows
     
@@ -262,6 +249,53 @@ class ActivityTracker:
         filename = f"activity_{date.isoformat()}_{self.user_id}.jsonl"
         return self.data_dir / filename
     
+    def get_focus_events_filename(self, date=None):
+        """Get the append-only focus switch event filename for a specific date"""
+        if date is None:
+            date = datetime.now().date()
+        filename = f"focus_{date.isoformat()}_{self.user_id}.jsonl"
+        return self.data_dir / filename
+    
+    def get_state_filename(self, date=None):
+        """Get the sidecar state checkpoint filename for a specific date"""
+        if date is None:
+            date = datetime.now().date()
+        filename = f"state_{date.isoformat()}_{self.user_id}.json"
+        return self.data_dir / filename
+    
+    def write_state_checkpoint(self, snapshot, jsonl_size, state_file=None):
+        """Atomically write the latest snapshot next to the JSONL file for O(1) restarts"""
+        if state_file is None:
+            state_file = self.get_state_filename()
+        temp_file = state_file.with_suffix('.json.tmp')
+        
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'jsonlSize': jsonl_size, 'snapshot': snapshot}, f)
+            os.replace(temp_file, state_file)
+        except Exception as e:
+            logger.warning(f"Error writing state checkpoint: {e}")
+    
+    def read_state_checkpoint(self, jsonl_file):
+        """Read the sidecar state checkpoint if it matches the end of the JSONL file"""
+        state_file = self.get_state_filename()
+        if not state_file.exists():
+            return None
+        
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            
+            # Records appended after the checkpoint was written make it stale
+            if state.get('jsonlSize') != jsonl_file.stat().st_size:
+                logger.info("State checkpoint is stale, falling back to the JSONL file")
+                return None
+            
+            return state.get('snapshot')
+        except Exception as e:
+            logger.warning(f"Error reading state checkpoint: {e}")
+            return None
+    
     def load_existing_data(self):
         """Load existing data from today's JSONL file to restore state"""
         jsonl_file = self.get_jsonl_filename()
@@ -273,18 +307,15 @@ class ActivityTracker:
         try:
             logger.info(f"Loading existing data from: {jsonl_file}")
             
-            # Read all lines from the JSONL file
-            with open(jsonl_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            # Prefer the sidecar checkpoint, otherwise seek back from the end of the
+            # file and replay the deltas after the last checkpoint record
+            last_snapshot = self.read_state_checkpoint(jsonl_file) or read_last_snapshot(jsonl_file)
             
-            if not lines:
+            if not last_snapshot:
                 logger.info("JSONL file is empty")
                 return
             
-            # Get the last snapshot to restore the most recent state
-            last_snapshot = json.loads(lines[-1])
-            
-            logger.info(f"Found {len(lines)} existing snapshots, restoring from last snapshot")
+            logger.info(f"Restoring from last snapshot at {last_snapshot.get('timestamp')}")
             
             # Restore app tracking data from the last snapshot
             for app in last_snapshot.get('apps', []):
@@ -307,9 +338,10 @@ class ActivityTracker:
                     'hourly_stats': defaultdict(lambda: {'focus_seconds': 0, 'run_seconds': 0}),
                     'last_seen': datetime.now(),
                     'is_focused': app['isFocused'],
-                    'window_titles': app.get('windowTitles', []),
-                    'focus_switches': app.get('focusSwitches', [])
+                    'window_titles': {},
+                    'focus_switches': deque(app.get('focusSwitches', []), maxlen=self.focus_switch_retention)
                 }
+                self.restore_window_titles(app_key, app.get('windowTitles', []), last_snapshot.get('timestamp'))
                 
                 # Restore hourly stats
                 for hourly_stat in app.get('hourlyStats', []):
@@ -349,29 +381,48 @@ class ActivityTracker:
             logger.error(f"Error loading existing data: {e}", exc_info=True)
             logger.info("Starting with fresh tracking data")
     
+    def record_window_title(self, app_key, window_title, seen_at):
+        """Count a window title for an app, evicting the least recently seen title when over the cap"""
+        titles = self.app_tracking[app_key]['window_titles']
+        entry = titles.get(window_title)
+        if entry is None:
+            if len(titles) >= self.window_title_retention:
+                oldest = min(titles, key=lambda title: titles[title]['lastSeen'])
+                del titles[oldest]
+            window_title = sys.intern(window_title)
+            entry = titles[window_title] = {'title': window_title, 'count': 0, 'firstSeen': seen_at}
+        entry['count'] += 1
+        entry['lastSeen'] = seen_at
+    
+    def restore_window_titles(self, app_key, stored_titles, timestamp):
+        """Restore window title counts, converting the old list-of-strings format"""
+        titles = self.app_tracking[app_key]['window_titles']
+        seen_at = timestamp or datetime.now().isoformat()
+        for stored in stored_titles:
+            if isinstance(stored, str):
+                self.record_window_title(app_key, stored, seen_at)
+            elif isinstance(stored, dict) and stored.get('title'):
+                titles[sys.intern(stored['title'])] = dict(stored)
+        
+        while len(titles) > self.window_title_retention:
+            del titles[min(titles, key=lambda title: titles[title]['lastSeen'])]
+    
+    def append_focus_event(self, app_key, focus_switch_entry):
+        """Queue a focus switch for the day's event file, which keeps the full history"""
+        event = {
+            'app': app_key,
+            'category': self.app_tracking[app_key].get('category', 'Uncategorized'),
+            **focus_switch_entry
+        }
+        self.writer.submit(self.get_focus_events_filename(), event)
+    
     def get_friendly_app_name(self, process_name):
-        """Get friendly display name for an application"""
-        # Check if there's a mapped display name
-        if process_name in APP_DISPLAY_NAMES:
-            return APP_DISPLAY_NAMES[process_name]
-        
-        # Try case-insensitive match
-        for key, value in APP_DISPLAY_NAMES.items():
-            if key.lower() == process_name.lower():
-                return value
-        
-        # Remove .exe extension and return as-is
-        if process_name.lower().endswith('.exe'):
-            return process_name[:-4]
-        
-        return process_name
+        """Convert process name to user-friendly application name"""
+        return APP_CLASSIFIER.get_friendly_name(process_name)
     
     def get_app_category(self, app_name):
         """Determine the category of an application"""
-        for category, apps in APP_CATEGORIES.items():
-            if any(known_app.lower() in app_name.lower() for known_app in apps):
-                return category
-        return 'Uncategorized'
+        return APP_CLASSIFIER.get_category(app_name)
     
     def get_foreground_window_info(self):
         """Get information about the currently focused window (Windows only)"""
@@ -393,99 +444,39 @@ class ActivityTracker:
             pid = wintypes.DWORD()
             self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
             
-            # Get process name
-            try:
-                process = psutil.Process(pid.value)
-                process_name = process.name()
-                return process_name, window_title
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                return None, window_title
+            # Get process name from the sampler's cached handles
+            return self.process_sampler.process_name(pid.value), window_title
                 
         except Exception as e:
             logger.warning(f"Error getting foreground window: {e}")
             return None, None
     
-    def get_friendly_app_name(self, process_name):
-        """Convert process name to user-friendly application name"""
-        app_name_map = {
-            'code.exe': 'Visual Studio Code',
-            'chrome.exe': 'Google Chrome',
-            'msedge.exe': 'Microsoft Edge',
-            'firefox.exe': 'Mozilla Firefox',
-            'teams.exe': 'Microsoft Teams',
-            'ms-teams.exe': 'Microsoft Teams',
-            'outlook.exe': 'Microsoft Outlook',
-            'slack.exe': 'Slack',
-            'discord.exe': 'Discord',
-            'spotify.exe': 'Spotify',
-            'winword.exe': 'Microsoft Word',
-            'excel.exe': 'Microsoft Excel',
-            'powerpnt.exe': 'Microsoft PowerPoint',
-            'notepad++.exe': 'Notepad++',
-            'sublime_text.exe': 'Sublime Text',
-            'mongodbcompass.exe': 'MongoDB Compass',
-            'mongod.exe': 'MongoDB Server',
-        }
-        
-        process_lower = process_name.lower()
-        if process_lower in app_name_map:
-            return app_name_map[process_lower]
-        
-        # Remove .exe and capitalize
-        if process_lower.endswith('.exe'):
-            clean_name = process_name[:-4]
-        else:
-            clean_name = process_name
-        
-        return ' '.join(word.capitalize() for word in clean_name.replace('_', ' ').replace('-', ' ').split())
-    
     def get_running_applications(self):
         """Get list of running applications"""
         applications = {}
         
-        # First pass: get initial CPU readings (non-blocking)
-        for proc in psutil.process_iter(['pid', 'name']):
-            try:
-                proc.cpu_percent(interval=None)  # Initialize CPU measurement
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
-        
-        # Small delay to allow CPU measurement
-        import time
-        time.sleep(0.1)
-        
-        # Second pass: collect data with accurate CPU readings
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_percent']):
-            try:
-                info = proc.info
-                name = info['name']
+        # Single enumeration; CPU percent is the delta since the previous tick
+        for info in self.process_sampler.sample():
+            name = info['name']
+            
+            if self.is_user_application(info):
+                if name not in applications:
+                    applications[name] = {
+                        'name': name,
+                        'memory_mb': 0,
+                        'cpu_percent': 0,
+                        'process_count': 0
+                    }
                 
-                if self.is_user_application(proc, info):
-                    if name not in applications:
-                        applications[name] = {
-                            'name': name,
-                            'memory_mb': 0,
-                            'cpu_percent': 0,
-                            'process_count': 0
-                        }
-                    
-                    memory_mb = info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
-                    # Get current CPU percent (should now have valid measurement)
-                    try:
-                        cpu_percent = proc.cpu_percent(interval=None) or 0
-                    except:
-                        cpu_percent = 0
-                    
-                    applications[name]['memory_mb'] += memory_mb
-                    applications[name]['cpu_percent'] += cpu_percent
-                    applications[name]['process_count'] += 1
-                    
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+                memory_mb = info['memory_info'].rss / (1024 * 1024) if info['memory_info'] else 0
+                
+                applications[name]['memory_mb'] += memory_mb
+                applications[name]['cpu_percent'] += info['cpu_percent'] or 0
+                applications[name]['process_count'] += 1
         
         return list(applications.values())
     
-    def is_user_application(self, proc, info):
+    def is_user_application(self, info):
         """Determine if a process is a user application"""
         try:
             name = info['name'].lower()
@@ -509,13 +500,12 @@ class ActivityTracker:
             if name in excluded_processes:
                 return False
             
-            # Try to get exe path, but don't fail if unavailable
-            try:
-                exe_path = proc.exe().lower() if hasattr(proc, 'exe') else ''
-            except (psutil.AccessDenied, psutil.NoSuchProcess):
+            # Exe path is None when access was denied
+            if info['exe'] is None:
                 # If we can't get the path but it's not in excluded list, include it
                 # This catches cases where we have permission issues
                 return True
+            exe_path = info['exe'].lower()
             
             # Exclude Windows system directories
             if exe_path and any(sys_dir in exe_path for sys_dir in [
@@ -607,6 +597,7 @@ class ActivityTracker:
                     
                     # Save switch event for previous app
                     self.app_tracking[self.last_focused_app]['focus_switches'].append(focus_switch_entry)
+                    self.append_focus_event(self.last_focused_app, focus_switch_entry)
                 
                 # Start new focus event
                 self.last_focused_app = foreground_process
@@ -615,9 +606,9 @@ class ActivityTracker:
             else:
                 # Update window title if changed
                 self.last_window_title = window_title
-            # Always store full window title for current app
+            # Count the full window title for current app
             if window_title:
-                self.app_tracking[foreground_process]['window_titles'].append(window_title)
+                self.record_window_title(foreground_process, window_title, now.isoformat())
         
         # Get visible windows (taskbar apps)
         visible_windows = self.get_visible_windows()
@@ -625,8 +616,8 @@ class ActivityTracker:
         # Get running applications
         running_apps = self.get_running_applications()
         
-        # System metrics
-        cpu_usage = psutil.cpu_percent(interval=1)
+        # System metrics (CPU is averaged since the previous tick's process sample)
+        cpu_usage = self.process_sampler.system_cpu_percent
         memory = psutil.virtual_memory()
         memory_usage_mb = memory.used / (1024 * 1024)
         
@@ -735,8 +726,9 @@ class ActivityTracker:
                     'totalFocusHours': round(self.app_tracking[app_key]['total_focus_seconds'] / 3600, 2)
                 },
                 'hourlyStats': hourly_stats,
-                'windowTitles': self.app_tracking[app_key]['window_titles'],
-                'focusSwitches': self.app_tracking[app_key]['focus_switches']
+                # Copies, since the snapshot is kept as the base for the next delta record
+                'windowTitles': [dict(entry) for entry in self.app_tracking[app_key]['window_titles'].values()],
+                'focusSwitches': list(self.app_tracking[app_key]['focus_switches'])
             }
             
             # Categorize as taskbar or background
@@ -835,6 +827,7 @@ class ActivityTracker:
             'system': {
                 'cpuUsage': round(cpu_usage, 1),
                 'memoryUsageMB': round(memory_usage_mb, 0),
+                'memoryPercent': round(memory.percent, 1),
                 'batteryPercent': battery_info['percent'],
                 'isCharging': battery_info['is_charging'],
                 'uptimeSec': round(uptime_sec, 0),
@@ -862,15 +855,33 @@ class ActivityTracker:
         return snapshot
     
     def append_to_jsonl(self, data):
-        """Append data to JSONL file"""
+        """Queue a snapshot for the JSONL file as a checkpoint or delta record"""
         jsonl_file = self.get_jsonl_filename()
         
+        # A new file must start with a full checkpoint, and so must the record
+        # after one that was dropped or failed to write
+        if jsonl_file != self.current_jsonl_file or self.writer.take_write_failure():
+            self.snapshot_encoder.reset()
+            self.current_jsonl_file = jsonl_file
+        
+        record = self.snapshot_encoder.encode(data)
+        if not self.writer.submit(jsonl_file, record, (self.get_state_filename(), data)):
+            self.snapshot_encoder.reset()
+    
+    def on_jsonl_flush(self, path, size, context):
+        """Writer thread callback: record the state as of the last snapshot written"""
+        if context is not None:
+            state_file, snapshot = context
+            self.write_state_checkpoint(snapshot, size, state_file)
+    
+    def compact_day_file(self, jsonl_file):
+        """Write a finished day's per-app per-minute rows to Parquet (runs off the collection loop)"""
+        if not jsonl_file.exists():
+            return
         try:
-            with open(jsonl_file, 'a', encoding='utf-8') as f:
-                f.write(json.dumps(data) + '\n')
-            logger.info(f"Appended snapshot to {jsonl_file}")
+            compact_day(jsonl_file)
         except Exception as e:
-            logger.error(f"Error writing to JSONL: {e}")
+            logger.error(f"Error compacting {jsonl_file}: {e}")
     
     def generate_aggregated_report(self):
         """Generate aggregated daily report"""
@@ -981,7 +992,7 @@ class ActivityTracker:
         except Exception as e:
             logger.error(f"Error saving daily summary: {e}")
     
-    def check_date_rollover(self):
+    async def check_date_rollover(self):
         """Check if day has changed and save daily report"""
         current_date = datetime.now().date()
         if current_date != self.current_date:
@@ -990,6 +1001,19 @@ class ActivityTracker:
             # Save yesterday's report
             self.save_daily_report()
             
+            # Yesterday's state checkpoint is never restored again (wait for
+            # queued records so it is not rewritten afterwards, off the event loop)
+            await asyncio.get_running_loop().run_in_executor(None, self.writer.flush, 30)
+            self.get_state_filename(self.current_date).unlink(missing_ok=True)
+            
+            if self.columnar_compaction:
+                threading.Thread(
+                    target=self.compact_day_file,
+                    args=(self.get_jsonl_filename(self.current_date),),
+                    name='columnar-compaction',
+                    daemon=True
+                ).start()
+            
             # Reset tracking for new day
             self.current_date = current_date
             self.session_start = datetime.now()
@@ -1005,34 +1029,44 @@ class ActivityTracker:
         logger.info(f"Data directory: {self.data_dir.absolute()}")
         logger.info(f"Collection interval: {self.collection_interval} seconds")
         
-        while True:
-            try:
-                # Check for date rollover
-                self.check_date_rollover()
-                
-                # Collect snapshot
-                snapshot = self.collect_snapshot()
-                
-                # Append to JSONL file
-                self.append_to_jsonl(snapshot)
-                
-                # Log status
-                focused_app = next((app['name'] for app in snapshot['apps'] if app['isFocused']), 'None')
-                logger.info(f"Tracked: {focused_app} | Apps: {len(snapshot['apps'])} | CPU: {snapshot['system']['cpuUsage']:.1f}% | Idle: {snapshot['system']['isIdle']}")
-                
-                # Wait for next interval
-                await asyncio.sleep(self.collection_interval)
-                
-            except KeyboardInterrupt:
-                logger.info("Stopping tracker...")
-                break
-            except Exception as e:
-                logger.error(f"Error in collection loop: {e}", exc_info=True)
-                await asyncio.sleep(self.collection_interval)
-        
-        # Save final report on exit
-        logger.info("Saving final daily report...")
-        self.save_daily_report()
+        self.writer.start()
+        
+        try:
+            while True:
+                try:
+                    # Check for date rollover
+                    await self.check_date_rollover()
+                    
+                    # Collect snapshot
+                    snapshot = self.collect_snapshot()
+                    
+                    # Append to JSONL file
+                    self.append_to_jsonl(snapshot)
+                    
+                    # Log status
+                    focused_app = next((app['name'] for app in snapshot['apps'] if app['isFocused']), 'None')
+                    logger.info(f"Tracked: {focused_app} | Apps: {len(snapshot['apps'])} | CPU: {snapshot['system']['cpuUsage']:.1f}% | Idle: {snapshot['system']['isIdle']}")
+                    
+                    writer_stats = self.writer.stats()
+                    if writer_stats['queued'] > self.writer.batch_size:
+                        logger.warning(f"JSONL writer is behind: {writer_stats}")
+                    
+                    # Wait for next interval
+                    await asyncio.sleep(self.collection_interval)
+                    
+                except KeyboardInterrupt:
+                    logger.info("Stopping tracker...")
+                    break
+                except Exception as e:
+                    logger.error(f"Error in collection loop: {e}", exc_info=True)
+                    await asyncio.sleep(self.collection_interval)
+        finally:
+            # Also runs when asyncio.run cancels the task on Ctrl-C
+            logger.info("Saving final daily report...")
+            self.save_daily_report()
+            self.writer.close()
+            # Deliver the alerts still queued or held back by the rate limit
+            self.alert_engine.close()
 
 async def main():
     tracker = ActivityTracker()
@@ -0,0 +1,240 @@
+"""
+Columnar daily activity store
+
+Compacts a day's activity_*.jsonl file into activity_*.parquet with one row
+per app per minute (cpu, memory, focus flag, category). Readers that only
+need a few columns over many days read those columns from the Parquet files
+instead of rebuilding every JSON snapshot, and filters on minute, app,
+category or user are pushed down to row groups.
+
+The collector compacts the previous day at date rollover; run this module
+directly to compact older days:
+
+    python columnar_store.py [activity_data_dir]
+"""
+import logging
+import os
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from snapshot_codec import read_snapshots
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    logging.warning("pyarrow not installed. Columnar activity files disabled. Install with: pip install pyarrow")
+
+logger = logging.getLogger(__name__)
+
+COLUMNAR_SUFFIX = '.parquet'
+
+if PYARROW_AVAILABLE:
+    SCHEMA = pa.schema([
+        ('minute', pa.timestamp('s')),
+        ('user_id', pa.dictionary(pa.int32(), pa.string())),
+        ('app', pa.dictionary(pa.int32(), pa.string())),
+        ('title', pa.dictionary(pa.int32(), pa.string())),
+        ('category', pa.dictionary(pa.int32(), pa.string())),
+        ('cpu_usage', pa.float32()),
+        ('memory_mb', pa.float32()),
+        ('is_focused', pa.bool_()),
+        ('samples', pa.int16())
+    ])
+
+
+def columnar_filename(jsonl_file: Path) -> Path:
+    """Get the Parquet file that holds the compacted rows of a JSONL file"""
+    jsonl_file = Path(jsonl_file)
+    return jsonl_file.with_suffix(COLUMNAR_SUFFIX)
+
+
+def parse_day_file(path: Path) -> Optional[tuple]:
+    """Split activity_YYYY-MM-DD_user.<ext> into (date, user_id)"""
+    parts = path.stem.split('_', 2)
+    if len(parts) != 3 or parts[0] != 'activity':
+        return None
+    try:
+        return date.fromisoformat(parts[1]), parts[2]
+    except ValueError:
+        return None
+
+
+def minute_rows(snapshots: Iterable[Dict], user_id: str = '') -> List[Dict]:
+    """
+    Aggregate snapshots into one row per app per minute: average CPU and
+    memory, focused if the app had focus in any sample of that minute.
+    """
+    minutes = defaultdict(lambda: {'cpu': 0.0, 'memory': 0.0, 'focused': False, 'samples': 0})
+    details = {}
+
+    for snapshot in snapshots:
+        try:
+            minute = datetime.fromisoformat(snapshot['timestamp'].rstrip('Z')).replace(second=0, microsecond=0, tzinfo=None)
+        except (KeyError, AttributeError, ValueError):
+            continue
+
+        apps = list(snapshot.get('apps', []))
+        apps.extend((snapshot.get('backgroundApps') or {}).get('apps', []))
+        for app in apps:
+            name = app.get('name')
+            if not name:
+                continue
+            row = minutes[(minute, name)]
+            row['cpu'] += app.get('cpuUsage', 0) or 0
+            row['memory'] += app.get('memoryUsageMB', 0) or 0
+            row['focused'] = row['focused'] or bool(app.get('isFocused'))
+            row['samples'] += 1
+            details[name] = (app.get('title') or name, app.get('category') or 'Uncategorized')
+
+    rows = []
+    for (minute, name), row in sorted(minutes.items()):
+        title, category = details[name]
+        rows.append({
+            'minute': minute,
+            'user_id': user_id,
+            'app': name,
+            'title': title,
+            'category': category,
+            'cpu_usage': round(row['cpu'] / row['samples'], 2),
+            'memory_mb': round(row['memory'] / row['samples'], 1),
+            'is_focused': row['focused'],
+            'samples': row['samples']
+        })
+    return rows
+
+
+def compact_day(jsonl_file: Path, output_file: Path = None) -> Optional[Path]:
+    """
+    Write the per-app per-minute rows of a JSONL day file to Parquet.
+    Returns the written file, or None when pyarrow is unavailable or the day has no rows.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+
+    jsonl_file = Path(jsonl_file)
+    output_file = Path(output_file) if output_file else columnar_filename(jsonl_file)
+    parsed = parse_day_file(jsonl_file)
+    user_id = parsed[1] if parsed else ''
+
+    rows = minute_rows(read_snapshots(jsonl_file), user_id)
+    if not rows:
+        return None
+
+    table = pa.Table.from_pylist(rows, schema=SCHEMA)
+    temp_file = output_file.with_suffix(COLUMNAR_SUFFIX + '.tmp')
+    # Row groups of roughly an hour of data, so minute filters can skip whole groups
+    pq.write_table(table, temp_file, compression='zstd', row_group_size=max(1, len(rows) // 24))
+    os.replace(temp_file, output_file)
+
+    logger.info(f"Compacted {jsonl_file.name} into {output_file.name} ({len(rows)} rows)")
+    return output_file
+
+
+def is_compacted(jsonl_file: Path) -> bool:
+    """True if the JSONL file has a Parquet file that is at least as new"""
+    columnar_file = columnar_filename(jsonl_file)
+    try:
+        return columnar_file.stat().st_mtime >= Path(jsonl_file).stat().st_mtime
+    except OSError:
+        return False
+
+
+def find_columnar_files(data_dir: Path, start: datetime = None, end: datetime = None,
+                        user_id: str = None) -> List[Path]:
+    """List Parquet day files, pruned by date and user from their filenames"""
+    files = []
+    for path in sorted(Path(data_dir).glob(f'activity_*{COLUMNAR_SUFFIX}')):
+        parsed = parse_day_file(path)
+        if parsed is None:
+            continue
+        day, file_user = parsed
+        if user_id and file_user != user_id:
+            continue
+        if start and day < start.date():
+            continue
+        if end and day > end.date():
+            continue
+        files.append(path)
+    return files
+
+
+def read_table(data_dir: Path, columns: Sequence[str] = None, start: datetime = None, end: datetime = None,
+               apps: Sequence[str] = None, categories: Sequence[str] = None, user_id: str = None,
+               focused_only: bool = False):
+    """
+    Read rows from the Parquet day files as a pyarrow Table.
+
+    Only the requested columns are read, and the minute range, app, category,
+    user and focus filters are pushed down to the Parquet reader.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required to read columnar activity files")
+
+    files = find_columnar_files(data_dir, start, end, user_id)
+    if not files:
+        return SCHEMA.empty_table().select(list(columns)) if columns else SCHEMA.empty_table()
+
+    expression = None
+    conditions = []
+    if start:
+        conditions.append(ds.field('minute') >= pa.scalar(start.replace(tzinfo=None), pa.timestamp('s')))
+    if end:
+        conditions.append(ds.field('minute') <= pa.scalar(end.replace(tzinfo=None), pa.timestamp('s')))
+    if apps:
+        conditions.append(ds.field('app').isin(list(apps)))
+    if categories:
+        conditions.append(ds.field('category').isin(list(categories)))
+    if user_id:
+        conditions.append(ds.field('user_id') == user_id)
+    if focused_only:
+        conditions.append(ds.field('is_focused'))
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    dataset = ds.dataset([str(path) for path in files], schema=SCHEMA, format='parquet')
+    return dataset.to_table(columns=list(columns) if columns else None, filter=expression)
+
+
+def read_rows(data_dir: Path, columns: Sequence[str] = None, **filters) -> List[Dict]:
+    """Same as read_table(), returned as a list of row dicts"""
+    return read_table(data_dir, columns, **filters).to_pylist()
+
+
+def distinct_values(data_dir: Path, column: str, **filters) -> List[str]:
+    """Distinct values of one column, e.g. every app title seen in a date range"""
+    table = read_table(data_dir, [column], **filters)
+    values = pc.unique(table.column(column).combine_chunks())
+    if pa.types.is_dictionary(values.type):
+        values = values.dictionary_decode()
+    return [value for value in values.to_pylist() if value]
+
+
+def compact_directory(data_dir: Path, skip_today: bool = True) -> List[Path]:
+    """Compact every JSONL day file that has no up-to-date Parquet file"""
+    written = []
+    today = date.today()
+    for jsonl_file in sorted(Path(data_dir).glob('activity_*.jsonl')):
+        parsed = parse_day_file(jsonl_file)
+        if parsed is None or (skip_today and parsed[0] >= today) or is_compacted(jsonl_file):
+            continue
+        try:
+            output_file = compact_day(jsonl_file)
+        except Exception as e:
+            logger.error(f"Error compacting {jsonl_file}: {e}")
+            continue
+        if output_file:
+            written.append(output_file)
+    return written
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    compact_directory(Path(sys.argv[1] if len(sys.argv) > 1 else os.getenv('DATA_DIR', './activity_data')))
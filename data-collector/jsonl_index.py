@@ -0,0 +1,292 @@
+"""
+Indexed queries over activity JSONL files
+
+Each activity_*.jsonl file gets a sidecar activity_*.idx.json holding, for
+every complete line, its timestamp, byte offset and the offset of the
+checkpoint it depends on, plus the first line of every hour. A time-range
+query bisects the timestamps, seeks to the checkpoint before the first
+matching line and replays only the deltas from there, instead of decoding
+the file from the top.
+
+Sidecars are updated incrementally: only the bytes appended since the last
+indexed line are scanned. A file that shrank (rewritten) is reindexed from
+scratch, and a torn final line is left for the next update.
+
+Snapshot timestamps are the collector's local time (with a 'Z' appended), so
+query bounds are compared as naive local times; timezone-aware bounds are
+converted to local time first.
+"""
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from columnar_store import parse_day_file
+from snapshot_codec import is_delta_line, iter_snapshots, last_snapshot
+
+logger = logging.getLogger(__name__)
+
+INDEX_SUFFIX = '.idx.json'
+INDEX_VERSION = 1
+
+_TIMESTAMP_PATTERN = re.compile(rb'"timestamp":\s*"([^"]+)"')
+
+# Parsed sidecars by JSONL path, so repeated queries don't reload them
+_indexes: Dict[str, Dict] = {}
+_indexes_lock = threading.Lock()
+
+
+def index_filename(jsonl_file: Path) -> Path:
+    """Get the sidecar index file of a JSONL file"""
+    return Path(jsonl_file).with_suffix(INDEX_SUFFIX)
+
+
+def to_collector_time(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive local time of a query bound (aware datetimes are converted, naive ones kept)"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def _normalize_timestamp(timestamp: str) -> str:
+    """Timestamps are compared as naive ISO strings"""
+    return timestamp[:-1] if timestamp.endswith('Z') else timestamp
+
+
+def _line_timestamp(line: bytes) -> Optional[str]:
+    # Records start with the record type and timestamp, so a short prefix is enough
+    match = _TIMESTAMP_PATTERN.search(line, 0, 256)
+    if match:
+        return match.group(1).decode('utf-8', errors='replace')
+    try:
+        timestamp = json.loads(line).get('timestamp')
+    except (ValueError, AttributeError):
+        return None
+    return timestamp if isinstance(timestamp, str) else None
+
+
+def _empty_index() -> Dict:
+    return {
+        'version': INDEX_VERSION,
+        'size': 0,
+        'timestamps': [],
+        'offsets': [],
+        'checkpoints': [],
+        'hours': {}
+    }
+
+
+def _read_sidecar(jsonl_file: Path) -> Optional[Dict]:
+    try:
+        with open(index_filename(jsonl_file), 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != INDEX_VERSION:
+        return None
+    return index
+
+
+def _write_sidecar(jsonl_file: Path, index: Dict):
+    sidecar = index_filename(jsonl_file)
+    temp_file = sidecar.with_suffix(sidecar.suffix + '.tmp')
+    try:
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(index, f, separators=(',', ':'))
+        os.replace(temp_file, sidecar)
+    except OSError as e:
+        logger.warning(f"Could not write index {sidecar.name}: {e}")
+
+
+def _extend_index(jsonl_file: Path, index: Dict) -> bool:
+    """Index the complete lines appended since index['size']. Returns True if anything was added."""
+    timestamps, offsets, checkpoints, hours = index['timestamps'], index['offsets'], index['checkpoints'], index['hours']
+    last_checkpoint = checkpoints[-1] if checkpoints else -1
+    position = index['size']
+    added = False
+
+    with open(jsonl_file, 'rb') as f:
+        f.seek(position)
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Torn or still being written - index it on the next update
+                break
+            offset = position
+            position += len(line)
+            if not line.strip():
+                continue
+
+            timestamp = _line_timestamp(line)
+            if timestamp is None:
+                # Unreadable line: the deltas after it can't be replayed until the next checkpoint
+                last_checkpoint = -1
+                continue
+            if not is_delta_line(line):
+                last_checkpoint = offset
+
+            timestamp = _normalize_timestamp(timestamp)
+            if timestamps and timestamp < timestamps[-1]:
+                # Keep the timestamps sorted for bisect; a clock step back clamps to the previous line
+                timestamp = timestamps[-1]
+            hours.setdefault(timestamp[11:13], len(timestamps))
+            timestamps.append(timestamp)
+            offsets.append(offset)
+            checkpoints.append(last_checkpoint)
+            added = True
+
+    index['size'] = position
+    return added
+
+
+def load_index(jsonl_file: Path) -> Dict:
+    """Return the up-to-date index of a JSONL file, updating its sidecar if the file grew"""
+    jsonl_file = Path(jsonl_file)
+    key = str(jsonl_file)
+    size = jsonl_file.stat().st_size
+
+    with _indexes_lock:
+        index = _indexes.get(key) or _read_sidecar(jsonl_file)
+        if index is None or index['size'] > size:
+            index = _empty_index()
+        if index['size'] < size and _extend_index(jsonl_file, index):
+            _write_sidecar(jsonl_file, index)
+        elif not index_filename(jsonl_file).exists():
+            _write_sidecar(jsonl_file, index)
+        _indexes[key] = index
+        return index
+
+
+def _start_position(index: Dict, start: Optional[str], hour: Optional[int]) -> Optional[int]:
+    """Index of the first line at or after start (and in the hour, if given)"""
+    first = bisect.bisect_left(index['timestamps'], start) if start else 0
+    if hour is not None:
+        hour_start = index['hours'].get(f'{hour:02d}')
+        if hour_start is None:
+            return None
+        first = max(first, hour_start)
+    return first if first < len(index['timestamps']) else None
+
+
+def iter_file_range(jsonl_file: Path, start: datetime = None, end: datetime = None,
+                    hour: int = None) -> Iterator[Dict]:
+    """
+    Yield the full snapshots of one file between start and end (inclusive,
+    collector local time), seeking via its index
+    """
+    index = load_index(jsonl_file)
+    start, end = to_collector_time(start), to_collector_time(end)
+    start_key = start.isoformat() if start else None
+    end_key = end.isoformat() if end else None
+
+    first = _start_position(index, start_key, hour)
+    if first is None:
+        return
+
+    # Replay from the checkpoint the first line depends on (skipping a broken chain to the next checkpoint)
+    checkpoint = index['checkpoints'][first]
+    seek_to = checkpoint if checkpoint >= 0 else index['offsets'][first]
+    hour_key = f'{hour:02d}' if hour is not None else None
+
+    with open(jsonl_file, 'rb') as f:
+        f.seek(seek_to)
+        lines = (line.decode('utf-8', errors='replace') for line in f if line.endswith(b'\n'))
+        for snapshot in iter_snapshots(lines):
+            timestamp = _normalize_timestamp(snapshot.get('timestamp') or '')
+            if start_key and timestamp < start_key:
+                continue
+            if end_key and timestamp > end_key:
+                break
+            if hour_key is not None and timestamp[11:13] != hour_key:
+                if timestamp[11:13] > hour_key:
+                    break
+                continue
+            yield snapshot
+
+
+def find_activity_files(data_dir: Path, start: datetime = None, end: datetime = None,
+                        user_id: str = None) -> List[Path]:
+    """List JSONL day files, pruned by date and user from their filenames"""
+    start, end = to_collector_time(start), to_collector_time(end)
+    files = []
+    for path in sorted(Path(data_dir).glob('activity_*.jsonl')):
+        parsed = parse_day_file(path)
+        if parsed is None:
+            continue
+        day, file_user = parsed
+        if user_id and file_user != user_id:
+            continue
+        if start and day < start.date():
+            continue
+        if end and day > end.date():
+            continue
+        files.append(path)
+    return files
+
+
+def _filter_apps(snapshot: Dict, apps: Optional[set], categories: Optional[set]) -> Optional[Dict]:
+    """
+    Keep only the matching apps (by process name or title) of a snapshot's
+    apps and background apps; None if none match.
+    """
+    if not apps and not categories:
+        return snapshot
+
+    def matches(app):
+        return ((not apps or app.get('name') in apps or app.get('title') in apps)
+                and (not categories or app.get('category') in categories))
+
+    result = {**snapshot, 'apps': [app for app in snapshot.get('apps', []) if matches(app)]}
+    found = bool(result['apps'])
+    background = snapshot.get('backgroundApps')
+    if background and background.get('apps'):
+        background_apps = [app for app in background['apps'] if matches(app)]
+        result['backgroundApps'] = {**background, 'apps': background_apps}
+        found = found or bool(background_apps)
+    return result if found else None
+
+
+def query_snapshots(data_dir: Path, start: datetime = None, end: datetime = None,
+                    apps: Sequence[str] = None, categories: Sequence[str] = None,
+                    user_id: str = None, hour: int = None, limit: int = None) -> Iterator[Dict]:
+    """
+    Yield snapshots in time order across the day files, between start and
+    end in the collector's local time. With app or category filters, each
+    snapshot only keeps the matching apps and snapshots with none are skipped.
+    """
+    start, end = to_collector_time(start), to_collector_time(end)
+    apps = set(apps) if apps else None
+    categories = set(categories) if categories else None
+    returned = 0
+    for jsonl_file in find_activity_files(data_dir, start, end, user_id):
+        try:
+            snapshots = iter_file_range(jsonl_file, start, end, hour)
+            for snapshot in snapshots:
+                snapshot = _filter_apps(snapshot, apps, categories)
+                if snapshot is None:
+                    continue
+                yield snapshot
+                returned += 1
+                if limit and returned >= limit:
+                    return
+        except OSError as e:
+            logger.error(f"Error reading {jsonl_file}: {e}")
+
+
+def latest_snapshot(data_dir: Path, user_id: str = None) -> Optional[Dict]:
+    """The most recent snapshot of the newest day file"""
+    for jsonl_file in reversed(find_activity_files(data_dir, user_id=user_id)):
+        snapshot = last_snapshot(jsonl_file)
+        if snapshot is not None:
+            return snapshot
+    return None
+
+
+def available_dates(data_dir: Path, user_id: str = None) -> List[str]:
+    """Dates that have an activity file, newest first"""
+    dates = {parse_day_file(path)[0].isoformat() for path in find_activity_files(data_dir, user_id=user_id)}
+    return sorted(dates, reverse=True)
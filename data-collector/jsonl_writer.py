@@ -0,0 +1,248 @@
+"""
+Background JSONL writer
+
+Records are serialized and appended by a dedicated thread, so a slow disk or
+an antivirus scan never delays the collector's next sample. Records are
+written in batches (every N records or T seconds, whichever comes first) and
+optionally fsynced. The queue is bounded: when it is full, submit() drops the
+record and returns False instead of blocking the caller. After a failed write
+to a file, the delta records queued behind it for that file are dropped until
+the next checkpoint, since their base never reached the disk.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from snapshot_codec import DELTA, RECORD_TYPE_KEY
+
+logger = logging.getLogger(__name__)
+
+FSYNC_NONE = 'none'
+FSYNC_INTERVAL = 'interval'
+FSYNC_ALWAYS = 'always'
+FSYNC_POLICIES = (FSYNC_NONE, FSYNC_INTERVAL, FSYNC_ALWAYS)
+
+_STOP = object()
+
+
+class JsonlWriter:
+    """Appends JSON records to files from a background thread"""
+
+    def __init__(self, batch_size: int = 1, flush_interval: float = 5.0, fsync_policy: str = FSYNC_NONE,
+                 fsync_interval: float = 30.0, max_queue: int = 1000,
+                 on_flush: Callable[[Path, int, Any], None] = None):
+        """
+        on_flush(path, size, context) runs on the writer thread after a batch is
+        written to a file, with the file size and the context of the last record
+        written to it.
+        """
+        if fsync_policy not in FSYNC_POLICIES:
+            logger.warning(f"Unknown fsync policy '{fsync_policy}', using '{FSYNC_NONE}'")
+            fsync_policy = FSYNC_NONE
+
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.on_flush = on_flush
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = None
+        self._last_fsync: Dict[Path, float] = {}
+        self._checked_files = set()
+        self._write_failed = threading.Event()
+        # Files whose delta chain was broken by a failed write (writer thread only)
+        self._broken_chains = set()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'batches': 0,
+            'maxQueued': 0,
+            'lastBatchSeconds': 0.0,
+            'maxBatchSeconds': 0.0
+        }
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='jsonl-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, path: Path, record: Dict, context: Any = None) -> bool:
+        """Queue a record for appending to path. Returns False if the queue is full and the record was dropped."""
+        try:
+            self._queue.put_nowait((Path(path), record, context))
+        except queue.Full:
+            self._update_stats(dropped=1)
+            logger.warning(f"JSONL write queue is full, dropped a record for {path}")
+            return False
+
+        queued = self._queue.qsize()
+        with self._stats_lock:
+            self._stats['maxQueued'] = max(self._stats['maxQueued'], queued)
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far has been written. Returns False on timeout."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Write out the queue and stop the writer thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("JSONL write queue is still full, stopping without draining it")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def take_write_failure(self) -> bool:
+        """Return True (once) if a write failed since the last call, e.g. to restart a delta chain"""
+        if self._write_failed.is_set():
+            self._write_failed.clear()
+            return True
+        return False
+
+    def stats(self) -> Dict:
+        """Queue depth and backpressure counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize()
+        stats['maxQueue'] = self._queue.maxsize
+        return stats
+
+    def _update_stats(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _run(self):
+        pending = []
+        deadline = None
+        while True:
+            timeout = None if not pending else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, tuple):
+                pending.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if len(pending) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            # Batch is full, flush interval elapsed, or a flush/stop was requested
+            if pending:
+                self._write_batch(pending)
+                pending = []
+                deadline = None
+
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write_batch(self, batch):
+        started = time.monotonic()
+
+        # Group consecutive records by file, keeping their order
+        groups = []
+        for path, record, context in batch:
+            if groups and groups[-1][0] == path:
+                groups[-1][1].append((record, context))
+            else:
+                groups.append((path, [(record, context)]))
+
+        for path, items in groups:
+            if path in self._broken_chains:
+                items = self._drop_orphaned_deltas(path, items)
+                if not items:
+                    continue
+            try:
+                size = self._append(path, [record for record, _ in items])
+            except Exception as e:
+                logger.error(f"Error writing to {path}: {e}")
+                # The file may now end with a torn line
+                self._checked_files.discard(path)
+                self._write_failed.set()
+                self._broken_chains.add(path)
+                self._update_stats(failed=len(items))
+                continue
+
+            self._update_stats(written=len(items))
+            if self.on_flush:
+                try:
+                    self.on_flush(path, size, items[-1][1])
+                except Exception as e:
+                    logger.warning(f"Error in JSONL flush callback for {path}: {e}")
+
+        elapsed = time.monotonic() - started
+        with self._stats_lock:
+            self._stats['batches'] += 1
+            self._stats['lastBatchSeconds'] = round(elapsed, 3)
+            self._stats['maxBatchSeconds'] = max(self._stats['maxBatchSeconds'], round(elapsed, 3))
+
+    def _drop_orphaned_deltas(self, path: Path, items):
+        """Drop the deltas before the next checkpoint of a file whose chain is broken"""
+        for position, (record, _) in enumerate(items):
+            if record.get(RECORD_TYPE_KEY) != DELTA:
+                self._broken_chains.discard(path)
+                break
+        else:
+            position = len(items)
+        if position:
+            logger.warning(f"Dropped {position} delta records for {path} after a failed write")
+            self._update_stats(failed=position)
+        return items[position:]
+
+    def _append(self, path: Path, records) -> int:
+        """Append records to a file and return its new size"""
+        if path not in self._checked_files:
+            self._terminate_torn_line(path)
+            self._checked_files.add(path)
+
+        with open(path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record) + '\n')
+                if self.fsync_policy == FSYNC_ALWAYS:
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            if self.fsync_policy == FSYNC_INTERVAL:
+                now = time.monotonic()
+                if now - self._last_fsync.get(path, 0.0) >= self.fsync_interval:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._last_fsync[path] = now
+
+            return f.tell()
+
+    def _terminate_torn_line(self, path: Path):
+        """Terminate a partial last line left by a crash so the next record starts on its own line"""
+        try:
+            if not path.exists() or path.stat().st_size == 0:
+                return
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    logger.warning(f"Terminating partial last line in {path}")
+                    f.write(b'\n')
+        except Exception as e:
+            logger.error(f"Error checking last line of {path}: {e}")
@@ -0,0 +1,144 @@
+"""
+Write-behind buffer for the MongoDB collector
+
+Collects a tick's inserts and upserts and sends them as one unordered
+bulk_write per collection. Upserts to the same document are coalesced ($inc
+values added, the latest $set kept), so when the database is slow and a
+flush is still running, the following ticks merge into the buffer instead
+of queueing more round-trips.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, List
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+def _merge_update(pending: Dict, update: Dict):
+    """Merge an update document into a pending one for the same document"""
+    sets = pending.setdefault('$set', {})
+    incs = pending.setdefault('$inc', {})
+
+    for field, value in update.get('$set', {}).items():
+        # A $set replaces earlier increments of the field and of its subfields
+        for inc_field in [f for f in incs if f == field or f.startswith(field + '.')]:
+            del incs[inc_field]
+        sets[field] = value
+
+    for field, value in update.get('$inc', {}).items():
+        parent, _, child = field.partition('.')
+        if field in sets:
+            sets[field] += value
+        elif child and isinstance(sets.get(parent), dict):
+            sets[parent][child] = sets[parent].get(child, 0) + value
+        else:
+            incs[field] = incs.get(field, 0) + value
+
+    for field, value in update.get('$setOnInsert', {}).items():
+        pending.setdefault('$setOnInsert', {}).setdefault(field, value)
+
+
+def _filter_key(filter_doc: Dict) -> tuple:
+    return tuple(sorted(filter_doc.items()))
+
+
+class MongoWriteBuffer:
+    """Buffers per-tick writes and flushes them with one bulk_write per collection"""
+
+    def __init__(self, max_inserts: int = 10000):
+        self.max_inserts = max_inserts
+        self._inserts: Dict[str, List[Dict]] = defaultdict(list)
+        self._updates: Dict[str, Dict[tuple, tuple]] = defaultdict(dict)
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._write_failed = False
+        self.dropped_inserts = 0
+
+    def insert(self, collection: str, document: Dict):
+        """Queue a document insert"""
+        inserts = self._inserts[collection]
+        inserts.append(document)
+        if len(inserts) > self.max_inserts:
+            # The database has been unreachable for a long time - keep the newest documents
+            del inserts[0]
+            self.dropped_inserts += 1
+
+    def update(self, collection: str, filter_doc: Dict, update: Dict):
+        """Queue an upsert, merging it with a pending upsert of the same document"""
+        updates = self._updates[collection]
+        key = _filter_key(filter_doc)
+        if key in updates:
+            _merge_update(updates[key][1], update)
+        else:
+            pending = {}
+            _merge_update(pending, update)
+            updates[key] = (filter_doc, pending)
+
+    def pending_count(self) -> int:
+        return sum(len(docs) for docs in self._inserts.values()) + sum(len(ops) for ops in self._updates.values())
+
+    def take_write_failure(self) -> bool:
+        """Return True (once) if a write failed since the last call"""
+        failed, self._write_failed = self._write_failed, False
+        return failed
+
+    def _take_operations(self) -> Dict[str, List]:
+        operations = defaultdict(list)
+        for collection, documents in self._inserts.items():
+            operations[collection].extend(InsertOne(document) for document in documents)
+        for collection, updates in self._updates.items():
+            for filter_doc, update in updates.values():
+                update = {operator: fields for operator, fields in update.items() if fields}
+                if update:
+                    operations[collection].append(UpdateOne(filter_doc, update, upsert=True))
+        self._inserts = defaultdict(list)
+        self._updates = defaultdict(dict)
+        return operations
+
+    async def flush(self, db) -> bool:
+        """Write everything buffered so far (waiting for a running flush first). Returns False if a write failed."""
+        async with self._lock:
+            operations = self._take_operations()
+            if not operations:
+                return True
+
+            collections = list(operations)
+            results = await asyncio.gather(
+                *(db[collection].bulk_write(operations[collection], ordered=False) for collection in collections),
+                return_exceptions=True
+            )
+
+            success = True
+            for collection, result in zip(collections, results):
+                if isinstance(result, BulkWriteError):
+                    errors = result.details.get('writeErrors', [])
+                    logger.error(f"Bulk write to {collection}: {len(errors)} of {len(operations[collection])} operations failed")
+                    success = False
+                elif isinstance(result, Exception):
+                    logger.error(f"Bulk write to {collection} failed: {result}")
+                    success = False
+
+            if not success:
+                self._write_failed = True
+            return success
+
+    async def _flush_then(self, db, after):
+        if await self.flush(db) and after is not None:
+            try:
+                await after()
+            except Exception as e:
+                logger.error(f"Error after flushing writes: {e}")
+
+    def flush_in_background(self, db, after=None):
+        """
+        Start a flush unless one is still running; buffered writes then wait
+        for the next tick. after() is awaited once the flush has succeeded.
+        """
+        if self._task is not None and not self._task.done():
+            logger.warning(f"Database is slow, coalescing writes ({self.pending_count()} pending operations)")
+            return
+        self._task = asyncio.create_task(self._flush_then(db, after))
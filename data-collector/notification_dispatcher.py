@@ -0,0 +1,183 @@
+"""
+Background notification dispatch
+
+Alerts are queued by the sampling loop and delivered (saved to the history
+journal and shown on the desktop) by a worker thread, so a burst of alerts
+never delays the next tick. Each rule has a token bucket: it may send `burst`
+notifications at once and then one every `refill_seconds`. Alerts from a rule
+that arrive while it is out of tokens (or while the worker is busy) are
+coalesced into one grouped notification sent when the next token is available.
+The queue is bounded: when it is full, submit() drops the alert and returns
+False instead of blocking the caller.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TokenBucket:
+    """Allows `capacity` events at once, refilled at one token per refill_seconds"""
+    __slots__ = ('capacity', 'refill_seconds', 'tokens', 'updated')
+
+    def __init__(self, capacity: int, refill_seconds: float, now: float):
+        self.capacity = max(1, capacity)
+        self.refill_seconds = max(0.0, refill_seconds)
+        self.tokens = float(self.capacity)
+        self.updated = now
+
+    def _refill(self, now: float):
+        if self.refill_seconds == 0:
+            self.tokens = float(self.capacity)
+        elif now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.refill_seconds)
+        self.updated = now
+
+    def take(self, now: float) -> bool:
+        """Use a token if one is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) * self.refill_seconds)
+
+
+class NotificationDispatcher:
+    """Rate-limits, groups and delivers notifications from a background thread"""
+
+    def __init__(self, deliver: Callable[[str, str, Optional[str], int], None], burst: int = 3,
+                 refill_seconds: float = 60.0, max_queue: int = 1000, max_grouped_lines: int = 5):
+        """
+        deliver(title, message, rule_id, count) runs on the worker thread, once
+        per notification; count is the number of alerts grouped into it.
+        """
+        self.deliver = deliver
+        self.burst = burst
+        self.refill_seconds = refill_seconds
+        self.max_grouped_lines = max_grouped_lines
+
+        self._queue = queue.Queue(maxsize=max(1, max_queue))
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # Used only by the worker thread
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._pending: Dict[str, List[Tuple[str, str, Optional[str]]]] = OrderedDict()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'queued': 0,
+            'sent': 0,
+            'grouped': 0,
+            'dropped': 0,
+            'failed': 0
+        }
+
+    def start(self):
+        """Start the worker thread (submit() starts it when needed)"""
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='notification-dispatch', daemon=True)
+                self._thread.start()
+
+    def submit(self, title: str, message: str, rule_id: str = None) -> bool:
+        """Queue a notification. Returns False if the queue is full and it was dropped."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait((title, message, rule_id))
+        except queue.Full:
+            self._update_stats(dropped=1)
+            logger.warning(f"Notification queue is full, dropped: {title} - {message}")
+            return False
+        self._update_stats(queued=1)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Deliver everything still queued or held back (ignoring the rate limit) and stop the worker"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("Notification queue is still full, stopping without draining it")
+            return
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def _update_stats(self, **increments):
+        with self._stats_lock:
+            for key, value in increments.items():
+                self._stats[key] += value
+
+    def _next_wakeup(self, now: float) -> Optional[float]:
+        """Seconds until a held-back rule gets a token (None if nothing is held back)"""
+        if not self._pending:
+            return None
+        return min(self._buckets[key].wait_time(now) for key in self._pending)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self._next_wakeup(time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            # Take everything else that is already queued, so it can be grouped
+            stopping = False
+            while item is not None:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    self._hold(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+
+            now = time.monotonic()
+            for key in list(self._pending):
+                if stopping or self._buckets[key].take(now):
+                    self._send(self._pending.pop(key))
+            if stopping:
+                return
+
+    def _hold(self, alert: Tuple[str, str, Optional[str]]):
+        title, _, rule_id = alert
+        # Notifications without a rule (e.g. test notifications) are limited by title
+        key = rule_id if rule_id is not None else f"title:{title}"
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(self.burst, self.refill_seconds, time.monotonic())
+        self._pending.setdefault(key, []).append(alert)
+
+    def _send(self, alerts: List[Tuple[str, str, Optional[str]]]):
+        title, message, rule_id = alerts[-1]
+        if len(alerts) > 1:
+            messages = [alert_message for _, alert_message, _ in alerts]
+            shown = messages[-self.max_grouped_lines:]
+            lines = [f"{len(alerts)} alerts:"] + shown
+            if len(messages) > len(shown):
+                lines.append(f"...and {len(messages) - len(shown)} earlier")
+            message = '\n'.join(lines)
+        try:
+            self.deliver(title, message, rule_id, len(alerts))
+            self._update_stats(sent=1, grouped=len(alerts) - 1)
+        except Exception as e:
+            logger.error(f"Error delivering notification '{title}': {e}")
+            self._update_stats(failed=1)
@@ -0,0 +1,232 @@
+"""
+Append-only notification journal
+
+Notifications are stored in notification_history.jsonl as one record per
+line instead of a JSON array that is rewritten on every change:
+
+    {"op": "add", "notification": {...}}
+    {"op": "read", "id": "..."}
+    {"op": "read_all", "before": "<ISO timestamp>"}
+    {"op": "delete", "id": "..."}
+    {"op": "compacted", "generation": "..."}
+
+Each process keeps the replayed notifications in memory, indexed by id and
+by unread status, and only reads the lines appended since its last read
+(the collector adds notifications while the API marks them read). Applying
+a record twice has no further effect, so a process simply replays its own
+appends. Once the journal holds compact_after records it is rewritten with
+one 'add' record per kept notification, after a 'compacted' header with a new
+generation id; a reader whose generation no longer matches the header replays
+the file from the start instead of continuing from its old offset.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationJournal:
+    """Notification history backed by an append-only JSONL journal"""
+
+    def __init__(self, journal_file: Path, max_notifications: int = 100, compact_after: int = 500,
+                 legacy_file: Path = None):
+        self.journal_file = Path(journal_file)
+        self.max_notifications = max_notifications
+        self.compact_after = max(compact_after, max_notifications)
+        # id -> notification, oldest first
+        self._notifications: Dict[str, Dict] = OrderedDict()
+        # ids of unread notifications, oldest first
+        self._unread: Dict[str, None] = OrderedDict()
+        self._offset = 0
+        self._records = 0
+        # Generation (from the 'compacted' header) and identity of the file read up to _offset
+        self._generation = None
+        self._file_identity = None
+        self._lock = threading.Lock()
+
+        with self._lock:
+            if not self.journal_file.exists() and legacy_file and Path(legacy_file).exists():
+                self._import_legacy(Path(legacy_file))
+            self._refresh()
+
+    def _import_legacy(self, legacy_file: Path):
+        """Convert a notification_history.json array (newest first) into a journal"""
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                notifications = json.load(f)
+            for notification in reversed(notifications):
+                self._apply({'op': 'add', 'notification': notification})
+            self._write_compacted()
+            logger.info(f"Imported {len(notifications)} notifications from {legacy_file.name}")
+        except Exception as e:
+            logger.error(f"Error importing {legacy_file.name}: {e}")
+
+    def _apply(self, record: Dict):
+        op = record.get('op')
+        if op == 'add':
+            notification = record.get('notification') or {}
+            notification_id = notification.get('id')
+            if notification_id is None or notification_id in self._notifications:
+                return
+            self._notifications[notification_id] = notification
+            if not notification.get('read', False):
+                self._unread[notification_id] = None
+            while len(self._notifications) > self.max_notifications:
+                oldest_id, _ = self._notifications.popitem(last=False)
+                self._unread.pop(oldest_id, None)
+        elif op == 'read':
+            notification = self._notifications.get(record.get('id'))
+            if notification is not None:
+                notification['read'] = True
+                self._unread.pop(record['id'], None)
+        elif op == 'read_all':
+            before = record.get('before', '')
+            for notification_id in [i for i in self._unread if self._notifications[i].get('timestamp', '') <= before]:
+                self._notifications[notification_id]['read'] = True
+                del self._unread[notification_id]
+        elif op == 'delete':
+            self._notifications.pop(record.get('id'), None)
+            self._unread.pop(record.get('id'), None)
+
+    def _reset(self):
+        self._notifications.clear()
+        self._unread.clear()
+        self._offset = 0
+        self._records = 0
+        self._generation = None
+
+    @staticmethod
+    def _read_generation(f) -> Optional[str]:
+        """Generation id from the journal's 'compacted' header (None if it was never compacted)"""
+        f.seek(0)
+        first_line = f.readline()
+        if not first_line.startswith(b'{"op": "compacted"'):
+            return None
+        try:
+            return json.loads(first_line).get('generation')
+        except (ValueError, AttributeError):
+            return None
+
+    def _refresh(self):
+        """Apply the records appended since the last read (everything, if the journal was compacted)"""
+        try:
+            stat = self.journal_file.stat()
+        except OSError:
+            self._reset()
+            self._file_identity = None
+            return
+        if (stat.st_ino, stat.st_size) == self._file_identity:
+            # Same file, nothing appended
+            return
+
+        with open(self.journal_file, 'rb') as f:
+            generation = self._read_generation(f)
+            if generation != self._generation or stat.st_size < self._offset:
+                # Compacted by another process - its offsets mean nothing in the new file
+                self._reset()
+                self._generation = generation
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Still being written - read it next time
+                    break
+                self._offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"Skipping unreadable notification record: {e}")
+                self._records += 1
+        self._file_identity = (stat.st_ino, self._offset) if self._offset == stat.st_size else None
+
+    def _append(self, record: Dict):
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self._refresh()
+        if self._records >= self.compact_after:
+            self._write_compacted()
+
+    def _write_compacted(self):
+        temp_file = self.journal_file.with_suffix(self.journal_file.suffix + '.tmp')
+        generation = uuid.uuid4().hex
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'op': 'compacted', 'generation': generation}) + '\n')
+            for notification in self._notifications.values():
+                f.write(json.dumps({'op': 'add', 'notification': notification}) + '\n')
+        os.replace(temp_file, self.journal_file)
+        stat = self.journal_file.stat()
+        self._offset = stat.st_size
+        self._file_identity = (stat.st_ino, stat.st_size)
+        self._generation = generation
+        self._records = len(self._notifications)
+
+    def compact(self):
+        """Rewrite the journal with only the notifications that are kept"""
+        with self._lock:
+            self._refresh()
+            self._write_compacted()
+
+    def add(self, notification: Dict) -> Dict:
+        """Append a notification (its 'id' is made unique if needed)"""
+        with self._lock:
+            self._refresh()
+            base_id = notification['id']
+            suffix = 0
+            while notification['id'] in self._notifications:
+                suffix += 1
+                notification['id'] = f"{base_id}-{suffix}"
+            self._append({'op': 'add', 'notification': notification})
+            return notification
+
+    def mark_read(self, notification_id: str) -> bool:
+        """Mark one notification read; False if it does not exist"""
+        with self._lock:
+            self._refresh()
+            if notification_id not in self._notifications:
+                return False
+            if notification_id in self._unread:
+                self._append({'op': 'read', 'id': notification_id})
+            return True
+
+    def mark_all_read(self) -> int:
+        """Mark every notification read; returns how many were unread"""
+        with self._lock:
+            self._refresh()
+            count = len(self._unread)
+            if count:
+                self._append({'op': 'read_all', 'before': datetime.now().isoformat()})
+            return count
+
+    def delete(self, notification_id: str) -> bool:
+        """Delete one notification; False if it does not exist"""
+        with self._lock:
+            self._refresh()
+            if notification_id not in self._notifications:
+                return False
+            self._append({'op': 'delete', 'id': notification_id})
+            return True
+
+    def list(self, unread_only: bool = False, limit: Optional[int] = None) -> List[Dict]:
+        """Notifications, newest first"""
+        with self._lock:
+            self._refresh()
+            ids = reversed(self._unread) if unread_only else reversed(self._notifications)
+            result = []
+            for notification_id in ids:
+                if limit and len(result) >= limit:
+                    break
+                result.append(dict(self._notifications[notification_id]))
+            return result
+
+    def unread_count(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._unread)
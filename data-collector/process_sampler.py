@@ -0,0 +1,101 @@
+"""
+Single-pass process sampler
+
+Keeps psutil.Process handles alive across collection ticks, so per-process
+CPU usage is the delta of each process' CPU times since the previous tick
+(no blocking sleep between two enumerations), and static attributes such as
+name and exe path are only fetched once per process.
+"""
+import logging
+from typing import Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_ERRORS = (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess)
+
+
+class ProcessSampler:
+    """Samples every running process once per tick"""
+
+    def __init__(self):
+        self._processes: Dict[int, psutil.Process] = {}
+        self._static_info: Dict[int, Dict] = {}
+
+        # The first non-blocking call only primes the system-wide CPU counters
+        psutil.cpu_percent(interval=None)
+        self.system_cpu_percent = 0.0
+
+    def _track(self, pid: int) -> Optional[psutil.Process]:
+        """Return the cached handle for a pid, replacing it if the pid was reused"""
+        proc = self._processes.get(pid)
+        if proc is not None:
+            try:
+                if proc.is_running():
+                    return proc
+            except SAMPLE_ERRORS:
+                pass
+
+        try:
+            proc = psutil.Process(pid)
+            with proc.oneshot():
+                static_info = {'pid': pid, 'name': proc.name()}
+                try:
+                    static_info['exe'] = proc.exe()
+                except (psutil.AccessDenied, psutil.ZombieProcess):
+                    static_info['exe'] = None
+            # Prime per-process CPU counters; the first reading is always 0.0
+            proc.cpu_percent(interval=None)
+        except SAMPLE_ERRORS:
+            return None
+
+        self._processes[pid] = proc
+        self._static_info[pid] = static_info
+        return proc
+
+    def sample(self) -> List[Dict]:
+        """
+        Enumerate all processes once and return one info dict per process with
+        'pid', 'name', 'exe', 'memory_info', 'cpu_percent' and the 'process' handle.
+
+        Also refreshes system_cpu_percent (average since the previous sample).
+        """
+        samples = []
+        live_processes = {}
+
+        for pid in psutil.pids():
+            proc = self._track(pid)
+            if proc is None:
+                continue
+            live_processes[pid] = proc
+
+            try:
+                with proc.oneshot():
+                    memory_info = proc.memory_info()
+                    cpu_percent = proc.cpu_percent(interval=None)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                del live_processes[pid]
+                continue
+            except psutil.AccessDenied:
+                memory_info = None
+                cpu_percent = 0.0
+
+            info = dict(self._static_info[pid])
+            info['memory_info'] = memory_info
+            info['cpu_percent'] = cpu_percent
+            info['process'] = proc
+            samples.append(info)
+
+        # Drop handles of processes that have exited
+        self._processes = live_processes
+        self._static_info = {pid: self._static_info[pid] for pid in live_processes}
+
+        self.system_cpu_percent = psutil.cpu_percent(interval=None)
+        return samples
+
+    def process_name(self, pid: int) -> Optional[str]:
+        """Get a process name from the handle cache (None if the process is gone)"""
+        if self._track(pid) is None:
+            return None
+        return self._static_info[pid]['name']
@@ -0,0 +1,121 @@
+"""
+Fixed-size rolling window of timed samples
+
+Used by the alert engine's window_aggregate rules. Adding a sample and
+reading the mean or max are O(1) amortised: the sum is kept running and the
+max comes from a monotonic queue. Percentiles are approximate, read from a
+histogram of log-spaced buckets (within PERCENTILE_ERROR of the true value),
+so they cost a fixed number of steps however many samples the window holds.
+"""
+import math
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+# Bucket boundaries grow by this factor, so a percentile is within about +/-2.5%
+_BUCKET_GROWTH = 1.05
+_LOG_GROWTH = math.log(_BUCKET_GROWTH)
+PERCENTILE_ERROR = (_BUCKET_GROWTH - 1) / 2
+
+# Samples arriving faster than this shorten the window instead of growing it
+MIN_SAMPLE_SECONDS = 5
+
+
+def _bucket(value: float) -> int:
+    return int(math.log1p(max(value, 0.0)) / _LOG_GROWTH)
+
+
+def _bucket_value(bucket: int) -> float:
+    """Midpoint of a bucket"""
+    return (math.exp(bucket * _LOG_GROWTH) + math.exp((bucket + 1) * _LOG_GROWTH)) / 2 - 1
+
+
+class RollingWindow:
+    """Samples of the last window_seconds (and at most capacity samples)"""
+    __slots__ = ('window_seconds', 'capacity', 'first_time', '_samples', '_sequence', '_sum', '_max', '_histogram')
+
+    def __init__(self, window_seconds: float, capacity: int = None):
+        self.window_seconds = window_seconds
+        self.capacity = capacity or max(1, int(window_seconds / MIN_SAMPLE_SECONDS))
+        self.first_time: Optional[datetime] = None  # start of the current unbroken run of samples
+        self._samples = deque()  # (sequence, time, value)
+        self._sequence = 0
+        self._sum = 0.0
+        self._max = deque()  # (sequence, value), values decreasing
+        self._histogram: Dict[int, int] = {}
+
+    def clear(self):
+        self.first_time = None
+        self._samples.clear()
+        self._max.clear()
+        self._histogram.clear()
+        self._sum = 0.0
+
+    def _evict_oldest(self):
+        sequence, _, value = self._samples.popleft()
+        self._sum -= value
+        if self._max and self._max[0][0] == sequence:
+            self._max.popleft()
+        bucket = _bucket(value)
+        count = self._histogram[bucket] - 1
+        if count:
+            self._histogram[bucket] = count
+        else:
+            del self._histogram[bucket]
+
+    def expire(self, now: datetime):
+        """Drop the samples that fell out of the window"""
+        while self._samples and (now - self._samples[0][1]).total_seconds() > self.window_seconds:
+            self._evict_oldest()
+        if not self._samples:
+            self.first_time = None
+
+    def add(self, value: float, now: datetime):
+        """Add a sample taken at now"""
+        self.expire(now)
+        if len(self._samples) >= self.capacity:
+            self._evict_oldest()
+        if self.first_time is None:
+            self.first_time = now
+
+        self._sequence += 1
+        self._samples.append((self._sequence, now, value))
+        self._sum += value
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._sequence, value))
+        bucket = _bucket(value)
+        self._histogram[bucket] = self._histogram.get(bucket, 0) + 1
+
+    def __len__(self):
+        return len(self._samples)
+
+    def covers(self, now: datetime) -> bool:
+        """True once samples have been collected for the whole window without a gap"""
+        return self.first_time is not None and (now - self.first_time).total_seconds() >= self.window_seconds
+
+    def mean(self) -> Optional[float]:
+        return self._sum / len(self._samples) if self._samples else None
+
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._max else None
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """Approximate percentile (0-100) of the samples in the window"""
+        if not self._samples:
+            return None
+        rank = max(1, math.ceil(len(self._samples) * percent / 100))
+        seen = 0
+        for bucket in sorted(self._histogram):
+            seen += self._histogram[bucket]
+            if seen >= rank:
+                return min(_bucket_value(bucket), self.max())
+        return self.max()
+
+    def aggregate(self, name: str) -> Optional[float]:
+        """'avg', 'max' or 'p<N>' (e.g. 'p95')"""
+        if name == 'avg':
+            return self.mean()
+        if name == 'max':
+            return self.max()
+        return self.percentile(float(name[1:]))
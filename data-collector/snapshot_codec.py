@@ -0,0 +1,311 @@
+"""
+Snapshot record codec for activity JSONL files
+
+Each line of an activity_*.jsonl file is either a full 'checkpoint' snapshot
+or a 'delta' that only holds what changed since the previous line. Lines
+written before delta encoding existed have no 'recordType' field and are
+treated as checkpoints, so old files stay readable.
+
+Readers should never json.loads a single line and treat it as the current
+state - use iter_snapshots() / snapshot_at() / last_snapshot() instead.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+RECORD_TYPE_KEY = 'recordType'
+CHECKPOINT = 'checkpoint'
+DELTA = 'delta'
+
+# Fields used to match list items (apps, hourly stats, window titles) between two snapshots
+LIST_ITEM_KEYS = ('name', 'hour', 'title')
+
+# Patch markers - snapshot dictionaries never use keys starting with '$'
+_DELETE = '$delete'
+_APPEND = '$append'
+_DROP = '$drop'
+_KEYED = '$keyed'
+_ORDER = '$order'
+_ITEMS = '$items'
+
+_UNCHANGED = object()
+
+# SnapshotEncoder records always start with the record type, so a delta line
+# can be recognised without parsing it
+_DELTA_PREFIX = json.dumps({RECORD_TYPE_KEY: DELTA})[:-1].encode('utf-8')
+
+
+def _list_item_key(prev: list, curr: list) -> Optional[str]:
+    """Find a field that uniquely identifies every item of both lists"""
+    if not prev or not curr:
+        return None
+    for key in LIST_ITEM_KEYS:
+        for items in (prev, curr):
+            if not all(isinstance(item, dict) and isinstance(item.get(key), str) for item in items):
+                break
+            if len({item[key] for item in items}) != len(items):
+                break
+        else:
+            return key
+    return None
+
+
+def _diff_value(prev: Any, curr: Any) -> Any:
+    if isinstance(prev, dict) and isinstance(curr, dict):
+        return _diff_dict(prev, curr)
+    if isinstance(prev, list) and isinstance(curr, list):
+        return _diff_list(prev, curr)
+    if type(prev) is type(curr) and prev == curr:
+        return _UNCHANGED
+    return curr
+
+
+def _diff_dict(prev: Dict, curr: Dict) -> Any:
+    patch = {}
+    for key, value in curr.items():
+        if key not in prev:
+            patch[key] = value
+            continue
+        change = _diff_value(prev[key], value)
+        if change is not _UNCHANGED:
+            patch[key] = change
+
+    removed = [key for key in prev if key not in curr]
+    if removed:
+        patch[_DELETE] = removed
+
+    return patch if patch else _UNCHANGED
+
+
+def _diff_list(prev: list, curr: list) -> Any:
+    item_key = _list_item_key(prev, curr)
+    if item_key:
+        return _diff_keyed_list(prev, curr, item_key)
+
+    # Append-only lists and ring buffers (focus switches): drop items from the
+    # head, then append new items to the tail
+    dropped = 0
+    if prev and curr and curr[0] != prev[0]:
+        dropped = next((i for i, item in enumerate(prev) if item == curr[0]), len(prev))
+    kept = len(prev) - dropped
+    if len(curr) >= kept and curr[:kept] == prev[dropped:]:
+        if not dropped and len(curr) == kept:
+            return _UNCHANGED
+        patch = {_APPEND: curr[kept:]}
+        if dropped:
+            patch[_DROP] = dropped
+        return patch
+
+    return curr
+
+
+def _diff_keyed_list(prev: list, curr: list, item_key: str) -> Any:
+    prev_items = {item[item_key]: item for item in prev}
+    changed_items = {}
+    for item in curr:
+        ident = item[item_key]
+        if ident not in prev_items:
+            changed_items[ident] = item
+            continue
+        change = _diff_dict(prev_items[ident], item)
+        if change is not _UNCHANGED:
+            changed_items[ident] = change
+
+    patch = {_KEYED: item_key}
+    order = [item[item_key] for item in curr]
+    if order != [item[item_key] for item in prev]:
+        patch[_ORDER] = order
+    if changed_items:
+        patch[_ITEMS] = changed_items
+
+    return patch if len(patch) > 1 else _UNCHANGED
+
+
+def _apply_value(state: Any, patch: Any) -> Any:
+    if isinstance(state, dict) and isinstance(patch, dict):
+        return _apply_dict(state, patch)
+    if isinstance(state, list) and isinstance(patch, dict):
+        if _APPEND in patch:
+            return state[patch.get(_DROP, 0):] + patch[_APPEND]
+        if _KEYED in patch:
+            return _apply_keyed_list(state, patch)
+    return patch
+
+
+def _apply_dict(state: Dict, patch: Dict) -> Dict:
+    result = dict(state)
+    for key in patch.get(_DELETE, ()):
+        result.pop(key, None)
+    for key, change in patch.items():
+        if key == _DELETE:
+            continue
+        result[key] = _apply_value(result[key], change) if key in result else change
+    return result
+
+
+def _apply_keyed_list(state: list, patch: Dict) -> list:
+    item_key = patch[_KEYED]
+    items = {item[item_key]: item for item in state}
+    for ident, change in patch.get(_ITEMS, {}).items():
+        if ident in items:
+            items[ident] = _apply_dict(items[ident], change)
+        elif isinstance(change, dict) and change.get(item_key) == ident:
+            items[ident] = change
+        else:
+            # A change to an item this state never had - the delta was made against another state
+            raise KeyError(ident)
+
+    order = patch[_ORDER] if _ORDER in patch else [item[item_key] for item in state]
+    return [items[ident] for ident in order]
+
+
+class SnapshotEncoder:
+    """Turns successive snapshots into checkpoint and delta records"""
+
+    def __init__(self, checkpoint_every: int = 30):
+        self.checkpoint_every = max(1, checkpoint_every)
+        self._previous = None
+        self._records_since_checkpoint = 0
+
+    def reset(self):
+        """Force the next record to be a checkpoint (e.g. when a new file is started)"""
+        self._previous = None
+        self._records_since_checkpoint = 0
+
+    def encode(self, snapshot: Dict) -> Dict:
+        """
+        Encode a snapshot as the next JSONL record.
+
+        The snapshot must not be mutated afterwards, since it is kept as the
+        base for the next delta.
+        """
+        if self._previous is None or self._records_since_checkpoint >= self.checkpoint_every:
+            record = {RECORD_TYPE_KEY: CHECKPOINT, **snapshot}
+            self._records_since_checkpoint = 0
+        else:
+            changes = _diff_dict(self._previous, snapshot)
+            changes = {} if changes is _UNCHANGED else changes
+            changes.pop('timestamp', None)
+            record = {
+                RECORD_TYPE_KEY: DELTA,
+                'timestamp': snapshot.get('timestamp'),
+                'changes': changes
+            }
+
+        self._records_since_checkpoint += 1
+        self._previous = snapshot
+        return record
+
+
+def apply_record(state: Optional[Dict], record: Dict) -> Dict:
+    """Return the full snapshot obtained by applying one record to the previous state"""
+    if record.get(RECORD_TYPE_KEY, CHECKPOINT) != DELTA:
+        snapshot = dict(record)
+        snapshot.pop(RECORD_TYPE_KEY, None)
+        return snapshot
+
+    if state is None:
+        raise ValueError("Delta record without a preceding checkpoint")
+
+    snapshot = _apply_dict(state, record.get('changes', {}))
+    snapshot['timestamp'] = record.get('timestamp')
+    return snapshot
+
+
+def iter_snapshots(lines: Iterable[str]) -> Iterator[Dict]:
+    """
+    Rebuild every full snapshot from an iterable of JSONL lines.
+
+    A line that cannot be parsed, or a delta that does not fit the state it
+    is applied to (e.g. because the line before it was lost), breaks the
+    delta chain, so the deltas that follow it are skipped until the next
+    checkpoint.
+    """
+    state = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            state = None
+            continue
+
+        if state is None and record.get(RECORD_TYPE_KEY) == DELTA:
+            continue
+
+        try:
+            state = apply_record(state, record)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            state = None
+            continue
+        yield state
+
+
+def read_snapshots(jsonl_file: Path) -> Iterator[Dict]:
+    """Rebuild every full snapshot stored in a JSONL file"""
+    with open(jsonl_file, 'r', encoding='utf-8') as f:
+        yield from iter_snapshots(f)
+
+
+def snapshot_at(jsonl_file: Path, timestamp: str = None) -> Optional[Dict]:
+    """
+    Rebuild the state as of the given ISO timestamp (the last snapshot at or
+    before it), or the latest state when no timestamp is given.
+    """
+    result = None
+    for snapshot in read_snapshots(jsonl_file):
+        if timestamp and snapshot.get('timestamp', '') > timestamp:
+            break
+        result = snapshot
+    return result
+
+
+def is_delta_line(line: bytes) -> bool:
+    """True if a raw JSONL line is a delta record (checked without parsing it)"""
+    return line.startswith(_DELTA_PREFIX)
+
+
+def _iter_lines_reversed(jsonl_file: Path, block_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Yield the lines of a file from last to first, reading backwards in blocks"""
+    with open(jsonl_file, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b'\n')
+            # The first piece may be the tail of a line that starts in an earlier block
+            remainder = lines.pop(0)
+            yield from reversed(lines)
+        if remainder:
+            yield remainder
+
+
+def last_snapshot(jsonl_file: Path) -> Optional[Dict]:
+    """
+    Rebuild the latest state stored in a JSONL file.
+
+    Reads backwards from the end of the file to the last checkpoint and only
+    replays the deltas after it. A torn final line is ignored, so the result
+    is the state of the last complete record.
+    """
+    tail = []
+    for line in _iter_lines_reversed(jsonl_file):
+        if not line.strip():
+            continue
+        tail.append(line)
+        if is_delta_line(line):
+            continue
+
+        result = None
+        for snapshot in iter_snapshots(raw.decode('utf-8', errors='replace') for raw in reversed(tail)):
+            result = snapshot
+        if result is not None:
+            return result
+
+    return None
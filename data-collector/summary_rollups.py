@@ -0,0 +1,193 @@
+"""
+Incremental daily and hourly summaries for the MongoDB collector
+
+Keeps the day's per-app, per-hour time totals and system metric sums in
+memory, so each tick only sends the increments to daily_summary and
+hourly_summary ($inc for counters, $set for derived fields such as averages
+and top apps) instead of re-aggregating app_time_tracking and system_metrics.
+load() rebuilds the state from the raw collections for periodic
+reconciliation; the next updates are then full $set documents.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+
+class SummaryRollups:
+    """In-memory daily_summary / hourly_summary state for one user and day"""
+
+    def __init__(self, user_id: str, top_apps_limit: int = 10):
+        self.user_id = user_id
+        self.top_apps_limit = top_apps_limit
+        self.reset(None)
+
+    def reset(self, date_start: Optional[datetime]):
+        """Start an empty day"""
+        self.date_start = date_start
+        # (application, hour) -> totals, mirroring app_time_tracking documents
+        self.app_hours: Dict[tuple, Dict] = {}
+        self.cpu_sum = 0.0
+        self.memory_sum = 0.0
+        self.metric_samples = 0
+
+        self._daily_inc = defaultdict(float)
+        self._metrics_changed = False
+        self._hourly_inc = defaultdict(lambda: defaultdict(float))
+        self._full_daily = False
+        self._full_hours = set()
+
+    def load(self, date_start: datetime, tracking_docs: Iterable[Dict], metric_totals: Optional[Dict] = None):
+        """Rebuild the state from app_time_tracking documents and system_metrics totals"""
+        self.reset(date_start)
+        for doc in tracking_docs:
+            self.app_hours[(doc['application'], doc['hour'])] = {
+                'application': doc['application'],
+                'hour': doc['hour'],
+                'total_time_seconds': doc.get('total_time_seconds', 0),
+                'focused_time_seconds': doc.get('focused_time_seconds', 0),
+                'category': doc.get('category', 'uncategorized'),
+                'is_focus_app': doc.get('is_focus_app', False),
+                'is_distraction_app': doc.get('is_distraction_app', False)
+            }
+        if metric_totals:
+            self.cpu_sum = metric_totals.get('cpu_sum', 0) or 0
+            self.memory_sum = metric_totals.get('memory_sum', 0) or 0
+            self.metric_samples = metric_totals.get('samples', 0) or 0
+
+        # Overwrite the stored summaries with the reconciled totals
+        self._full_daily = True
+        self._full_hours = {hour for _, hour in self.app_hours}
+
+    def add_app_time(self, application: str, hour: int, duration_seconds: float, is_focused: bool,
+                     category: str, is_focus_app: bool, is_distraction_app: bool):
+        """Record time written to app_time_tracking for one app and hour"""
+        focused_seconds = duration_seconds if is_focused else 0
+        entry = self.app_hours.setdefault((application, hour), {
+            'application': application,
+            'hour': hour,
+            'total_time_seconds': 0,
+            'focused_time_seconds': 0
+        })
+        entry['total_time_seconds'] += duration_seconds
+        entry['focused_time_seconds'] += focused_seconds
+        entry['category'] = category
+        entry['is_focus_app'] = is_focus_app
+        entry['is_distraction_app'] = is_distraction_app
+
+        daily = self._daily_inc
+        daily['total_time_seconds'] += duration_seconds
+        daily['total_focused_time_seconds'] += focused_seconds
+        if is_focus_app:
+            daily['focus_time_seconds'] += focused_seconds
+        if is_distraction_app:
+            daily['distraction_time_seconds'] += duration_seconds
+        daily[f'category_breakdown.{category}'] += duration_seconds
+
+        hourly = self._hourly_inc[hour]
+        hourly['total_time_seconds'] += duration_seconds
+        if is_focus_app:
+            hourly['focus_time_seconds'] += duration_seconds
+        if is_distraction_app:
+            hourly['distraction_time_seconds'] += duration_seconds
+
+    def add_system_metrics(self, cpu_usage: float, memory_usage_mb: float):
+        """Record one system_metrics sample"""
+        self.cpu_sum += cpu_usage
+        self.memory_sum += memory_usage_mb
+        self.metric_samples += 1
+        self._metrics_changed = True
+
+    def _daily_apps(self) -> Dict[str, Dict]:
+        apps = {}
+        for entry in self.app_hours.values():
+            app = apps.setdefault(entry['application'], {
+                'application': entry['application'],
+                'total_time_seconds': 0,
+                'focused_time_seconds': 0
+            })
+            app['total_time_seconds'] += entry['total_time_seconds']
+            app['focused_time_seconds'] += entry['focused_time_seconds']
+            app['category'] = entry['category']
+            app['is_focus_app'] = entry['is_focus_app']
+            app['is_distraction_app'] = entry['is_distraction_app']
+        return apps
+
+    def _daily_derived_fields(self, apps: Dict[str, Dict]) -> Dict:
+        samples = self.metric_samples
+        return {
+            'top_apps': sorted(apps.values(), key=lambda x: x['total_time_seconds'], reverse=True)[:self.top_apps_limit],
+            'avg_cpu_usage_percent': self.cpu_sum / samples if samples else 0,
+            'avg_memory_usage_mb': self.memory_sum / samples if samples else 0,
+            'last_updated': datetime.utcnow()
+        }
+
+    def daily_summary(self) -> Dict:
+        """The full daily_summary document for the current state"""
+        apps = self._daily_apps()
+        category_breakdown = defaultdict(float)
+        for app in apps.values():
+            category_breakdown[app['category']] += app['total_time_seconds']
+
+        return {
+            'user_id': self.user_id,
+            'date': self.date_start,
+            'total_time_seconds': sum(app['total_time_seconds'] for app in apps.values()),
+            'total_focused_time_seconds': sum(app['focused_time_seconds'] for app in apps.values()),
+            'focus_time_seconds': sum(app['focused_time_seconds'] for app in apps.values() if app['is_focus_app']),
+            'distraction_time_seconds': sum(app['total_time_seconds'] for app in apps.values() if app['is_distraction_app']),
+            'category_breakdown': dict(category_breakdown),
+            **self._daily_derived_fields(apps)
+        }
+
+    def hourly_summary(self, hour: int) -> Dict:
+        """The full hourly_summary document for one hour of the current state"""
+        apps = [entry for (_, entry_hour), entry in self.app_hours.items() if entry_hour == hour]
+        return {
+            'user_id': self.user_id,
+            'date': self.date_start,
+            'hour': hour,
+            'total_time_seconds': sum(app['total_time_seconds'] for app in apps),
+            'focus_time_seconds': sum(app['total_time_seconds'] for app in apps if app['is_focus_app']),
+            'distraction_time_seconds': sum(app['total_time_seconds'] for app in apps if app['is_distraction_app']),
+            'app_count': len(apps),
+            'last_updated': datetime.utcnow()
+        }
+
+    def take_daily_update(self) -> Optional[Dict]:
+        """Update document for daily_summary since the last call (None if nothing changed)"""
+        if not self.app_hours:
+            update = None
+        elif self._full_daily:
+            update = {'$set': self.daily_summary()}
+        elif self._daily_inc or self._metrics_changed:
+            update = {'$set': self._daily_derived_fields(self._daily_apps())}
+            if self._daily_inc:
+                update['$inc'] = dict(self._daily_inc)
+        else:
+            update = None
+
+        self._full_daily = False
+        self._metrics_changed = False
+        self._daily_inc.clear()
+        return update
+
+    def take_hourly_updates(self) -> Dict[int, Dict]:
+        """Update documents for hourly_summary since the last call, by hour"""
+        updates = {}
+        for hour in self._full_hours:
+            updates[hour] = {'$set': self.hourly_summary(hour)}
+
+        for hour, increments in self._hourly_inc.items():
+            if hour in updates:
+                continue
+            updates[hour] = {
+                '$inc': dict(increments),
+                '$set': {
+                    'app_count': sum(1 for _, entry_hour in self.app_hours if entry_hour == hour),
+                    'last_updated': datetime.utcnow()
+                }
+            }
+
+        self._full_hours.clear()
+        self._hourly_inc.clear()
+        return updates
@@ -0,0 +1,106 @@
+"""
+Cached top-level window enumeration (Windows only)
+
+EnumWindows runs once per tick and each window title is fetched once. The
+owning pid, process name and style flags of a window are cached by HWND and
+only looked up again when the window disappears or its title changes.
+"""
+import ctypes
+import logging
+from ctypes import wintypes
+from typing import Dict, List, Optional
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+GWL_EXSTYLE = -20
+GWL_STYLE = -16
+GW_OWNER = 4
+
+
+class WindowEnumerator:
+    """Enumerates visible, titled top-level windows with an HWND cache"""
+
+    def __init__(self, process_sampler=None):
+        self.user32 = ctypes.windll.user32
+        self.process_sampler = process_sampler
+        self._windows: Dict[int, Dict] = {}
+        self._enum_windows_proc = ctypes.WINFUNCTYPE(ctypes.c_bool, wintypes.HWND, wintypes.LPARAM)
+
+    def get_window_title(self, hwnd) -> str:
+        """Get a window's title text"""
+        length = self.user32.GetWindowTextLengthW(hwnd)
+        if length == 0:
+            return ''
+        buff = ctypes.create_unicode_buffer(length + 1)
+        self.user32.GetWindowTextW(hwnd, buff, length + 1)
+        return buff.value
+
+    def get_process_name(self, pid: int) -> Optional[str]:
+        """Get a process name, reusing the process sampler's handles when available"""
+        if self.process_sampler:
+            return self.process_sampler.process_name(pid)
+        try:
+            return psutil.Process(pid).name()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None
+
+    def _describe_window(self, hwnd, title: str) -> Optional[Dict]:
+        """Look up the owning process and style flags of a window"""
+        pid = wintypes.DWORD()
+        self.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+
+        process_name = self.get_process_name(pid.value)
+        if not process_name:
+            return None
+
+        return {
+            'hwnd': hwnd,
+            'pid': pid.value,
+            'name': process_name,
+            'title': title,
+            'style': self.user32.GetWindowLongW(hwnd, GWL_STYLE),
+            'ex_style': self.user32.GetWindowLongW(hwnd, GWL_EXSTYLE),
+            'has_owner': self.user32.GetWindow(hwnd, GW_OWNER) != 0
+        }
+
+    def enumerate(self) -> List[Dict]:
+        """
+        Return one entry per visible top-level window with a non-blank title:
+        hwnd, pid, name (process name), title, style, ex_style and has_owner.
+        """
+        hwnds = []
+
+        def enum_windows_callback(hwnd, lParam):
+            hwnds.append(hwnd)
+            return True
+
+        self.user32.EnumWindows(self._enum_windows_proc(enum_windows_callback), 0)
+
+        windows = []
+        cache = {}
+        for hwnd in hwnds:
+            if not hwnd or not self.user32.IsWindowVisible(hwnd):
+                continue
+
+            title = self.get_window_title(hwnd)
+            if not title.strip():
+                continue
+
+            entry = self._windows.get(hwnd)
+            if entry is None or entry['title'] != title:
+                try:
+                    entry = self._describe_window(hwnd, title)
+                except Exception as e:
+                    logger.debug(f"Error describing window {hwnd}: {e}")
+                    entry = None
+                if entry is None:
+                    continue
+
+            cache[hwnd] = entry
+            windows.append(entry)
+
+        # Windows that disappeared (or were hidden) drop out of the cache
+        self._windows = cache
+        return windows
@@ -5,15 +5,31 @@ This script creates all collections with validation schemas and sample data
 """
 
 import asyncio
+import os
+import sys
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import OperationFailure
 from datetime import datetime, timedelta
 import random
 from bson import ObjectId
 
+# Index registry derived from the routers' and collectors' query shapes
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend"))
+from app.indexes import ensure_indexes, find_collection_scans
+
 # MongoDB connection string
 MONGODB_URL = "mongodb://localhost:27017"
 DATABASE_NAME = "employee360"
 
+# Retention enforced by TTL indexes: collection -> (date field, retention in hours).
+# MongoDB's TTL monitor deletes expired documents in the background, so
+# collectors never run delete sweeps on the write path.
+RETENTION_POLICIES = {
+    "application_activity": ("timestamp", int(os.getenv("APPLICATION_ACTIVITY_RETENTION_HOURS", 24))),
+    "system_metrics": ("timestamp", int(os.getenv("SYSTEM_METRICS_RETENTION_HOURS", 7 * 24))),
+    "application_usage_buckets": ("bucket_start", int(os.getenv("APP_USAGE_BUCKET_RETENTION_HOURS", 30 * 24))),
+}
+
 async def create_collections(db):
     """Create all collections with validation schemas"""
     
@@ -95,8 +111,31 @@ async def create_indexes(db):
     await db.health_sleep.create_index([("user_id", 1), ("date", -1)])
     await db.health_activity.create_index([("user_id", 1), ("date", -1)])
     
+    # Retention
+    await create_ttl_indexes(db)
+    
+    # Indexes for every registered query shape
+    created = await ensure_indexes(db)
+    print(f"✅ Created {len(created)} query indexes")
+    for shape in await find_collection_scans(db):
+        print(f"⚠️  {shape['source']} still scans {shape['collection']}")
+    
     print("✅ Indexes created successfully!")
 
+async def create_ttl_indexes(db):
+    """Create (or update the expiry of) the TTL index of each collection in RETENTION_POLICIES"""
+    for collection_name, (field, retention_hours) in RETENTION_POLICIES.items():
+        expire_after_seconds = retention_hours * 3600
+        try:
+            await db[collection_name].create_index(field, expireAfterSeconds=expire_after_seconds)
+        except OperationFailure:
+            # An index on the field already exists with other options - change its expiry in place
+            await db.command("collMod", collection_name, index={
+                "keyPattern": {field: 1},
+                "expireAfterSeconds": expire_after_seconds
+            })
+        print(f"✅ {collection_name}: documents expire {retention_hours}h after '{field}'")
+
 async def insert_sample_data(db):
     """Insert sample data for testing"""
     
@@ -205,7 +244,8 @@ async def insert_sample_data(db):
     print("Demo login: demo@example.com")
 
 async def main():
-    """Main setup function"""
+    """Main setup function (pass --indexes-only to only create or update indexes)"""
+    indexes_only = "--indexes-only" in sys.argv
     
     print("🚀 Starting Employee360 database setup...")
     print(f"Connecting to: {MONGODB_URL}")
@@ -220,9 +260,12 @@ async def main():
         print("✅ Connected to local MongoDB!")
         
         # Setup database
-        await create_collections(db)
-        await create_indexes(db)
-        await insert_sample_data(db)
+        if indexes_only:
+            await create_indexes(db)
+        else:
+            await create_collections(db)
+            await create_indexes(db)
+            await insert_sample_data(db)
         
         print("🎉 Database setup completed successfully!")
         print(f"Database: {DATABASE_NAME}")